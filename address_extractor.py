@@ -0,0 +1,84 @@
+import re
+from collections import OrderedDict
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BASE58_INDEX = {char: index for index, char in enumerate(BASE58_ALPHABET)}
+
+# Solana public keys are 32 bytes
+PUBKEY_BYTES = 32
+
+
+def decoded_length(candidate):
+    """Number of bytes a base58 string decodes to, or -1 if it is not base58."""
+    value = 0
+    index = _BASE58_INDEX
+    try:
+        for char in candidate:
+            value = value * 58 + index[char]
+    except KeyError:
+        return -1
+    leading_zeros = len(candidate) - len(candidate.lstrip('1'))
+    return leading_zeros + (value.bit_length() + 7) // 8
+
+
+def validate_addresses(candidates):
+    """Return the candidates that decode to a 32-byte public key, in order."""
+    return [candidate for candidate in candidates if decoded_length(candidate) == PUBKEY_BYTES]
+
+
+class AddressExtractor:
+    """Finds Solana addresses in message text with a bounded memory of seen ones.
+
+    The pattern is compiled once. Texts shorter than ``min_length`` are
+    skipped without running the regex, each text's matches are deduplicated
+    and then validated together. ``extract_new`` also remembers the last
+    ``seen_capacity`` addresses (valid or not) in an LRU so repeats cost a
+    dict lookup and memory stays bounded.
+    """
+
+    def __init__(self, min_length=32, max_length=44, seen_capacity=100_000):
+        self.min_length = min_length
+        self.pattern = re.compile(rf"\b[1-9A-HJ-NP-Za-km-z]{{{min_length},{max_length}}}\b")
+        self._findall = self.pattern.findall
+        self.seen_capacity = seen_capacity
+        self.seen = OrderedDict()  # address -> is_valid
+
+    def candidates(self, text):
+        if not text or len(text) < self.min_length:
+            return []
+        matches = self._findall(text)
+        if len(matches) > 1:
+            matches = list(dict.fromkeys(matches))
+        return matches
+
+    def extract(self, text):
+        """Valid addresses in ``text``, first occurrence order."""
+        return validate_addresses(self.candidates(text))
+
+    def extract_new(self, text):
+        """Valid addresses in ``text`` that were not returned before."""
+        matches = self.candidates(text)
+        if not matches:
+            return []
+        fresh = []
+        for candidate in matches:
+            if candidate in self.seen:
+                self.seen.move_to_end(candidate)
+            else:
+                fresh.append(candidate)
+        if not fresh:
+            return []
+        valid = validate_addresses(fresh)
+        valid_set = set(valid)
+        for candidate in fresh:
+            self.remember(candidate, candidate in valid_set)
+        return valid
+
+    def remember(self, address, is_valid=True):
+        self.seen[address] = is_valid
+        self.seen.move_to_end(address)
+        while len(self.seen) > self.seen_capacity:
+            self.seen.popitem(last=False)
+
+    def __contains__(self, address):
+        return self.seen.get(address, False)
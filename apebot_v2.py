@@ -1,41 +1,136 @@
-import requests
 import json
+import math
+import os
 from datetime import datetime, timedelta
-from collections import Counter
+from collections import Counter, namedtuple
+
+import requests
+
+import metrics
+from cache import TTLCache
+from enrichment import HostPool
+from reputation import CREATOR, FUNDER, RUG_CONTRACT, ReputationIndex
+from filter_rules import RuleSetLoader, evaluate_strategies
+from rolling_stats import RollingStatsStore
+from token_store import TokenStore
+
+BOOSTS_URL = "https://api.dexscreener.com/token-boosts/latest/v1"
+TWITTER_SCORE_URL = "https://scoretwitter.com/{}"
+RUGCHECK_URL = "https://rugcheck.xyz/api/check/{}"
+
+# Pooled keep-alive sessions shared by every upstream call
+http = HostPool()
+
+# Returned when Rugcheck cannot be reached; rejected by the filter, never recorded as a rug
+UNKNOWN_VERDICT = 'unknown'
+
+# Verdicts are reused across polls; set APEBOT_CACHE_DB to survive restarts
+CACHE_DB = os.getenv("APEBOT_CACHE_DB")
+twitter_score_cache = TTLCache('twitter_score', ttl=30 * 60, negative_ttl=5 * 60, path=CACHE_DB)
+rugcheck_cache = TTLCache('rugcheck', ttl=10 * 60, negative_ttl=60, path=CACHE_DB)
+
+FETCH_SECONDS = metrics.histogram('apebot_fetch_tokens_seconds', "Time to fetch the boost feed")
+FETCH_ERRORS = metrics.counter('apebot_fetch_tokens_errors', "Failed boost feed fetches by reason")
+REMOTE_CHECK_SECONDS = metrics.histogram('apebot_remote_check_seconds', "Upstream call time per check (cache misses only)")
+REMOTE_CHECK_ERRORS = metrics.counter('apebot_remote_check_errors', "Failed upstream checks")
+FILTER_SECONDS = metrics.histogram('apebot_filter_seconds', "filter_tokens time per call")
+FILTER_TOKENS = metrics.counter('apebot_filter_tokens', "Tokens through filter_tokens by result")
+# Read on every scrape, whichever module replaced the caches
+metrics.register_stats('apebot_twitter_score_cache', lambda: twitter_score_cache.stats())
+metrics.register_stats('apebot_rugcheck_cache', lambda: rugcheck_cache.stats())
+metrics.register_stats('apebot_upstream', lambda: http.stats(), label='host')
+
+# Bad creators, funding wallets and rug contracts; shared by every worker
+REPUTATION_DB = os.getenv("APEBOT_REPUTATION_DB", "reputation.db")
+LEGACY_BLACKLIST = 'blacklist.json'
+_reputation = None
+
+def reputation_index():
+    # Opened on first use; the old JSON blacklist is imported once as creators
+    global _reputation
+    if _reputation is None:
+        index = ReputationIndex(REPUTATION_DB)
+        if len(index) == 0 and os.path.exists(LEGACY_BLACKLIST):
+            with open(LEGACY_BLACKLIST, 'r') as f:
+                imported = index.add_many((address, CREATOR, 'blacklist.json', 'import') for address in json.load(f))
+            print(f"Imported {imported} blacklisted creators into {REPUTATION_DB}.")
+        metrics.register_stats('apebot_reputation', index.stats)
+        _reputation = index
+    return _reputation
 
-# Initialize a blacklist from a file
 def load_blacklist():
-    try:
-        with open('blacklist.json', 'r') as f:
-            return set(json.load(f))
-    except FileNotFoundError:
-        return set()
+    # Supports ``in`` like the old set, without loading every address
+    return reputation_index()
 
 def save_blacklist(blacklist):
-    with open('blacklist.json', 'w') as f:
-        json.dump(list(blacklist), f)
+    # Only addresses not already in the index are written
+    index = reputation_index()
+    if blacklist is not index:
+        index.add_many((address, CREATOR, 'blacklisted', 'manual') for address in blacklist)
+
+# Token fields checked against the reputation index, with the kind they record
+REPUTATION_FIELDS = (
+    ('creator_address', CREATOR),
+    ('funding_address', FUNDER),
+    ('contract_address', RUG_CONTRACT),
+    ('tokenAddress', RUG_CONTRACT),
+)
+
+def is_blacklisted(token, blacklist):
+    return any(token.get(field) in blacklist for field, _ in REPUTATION_FIELDS if token.get(field))
+
+def record_failed_rugcheck(token, status):
+    # Contract, creator and funder of a token Rugcheck failed all go in the index
+    index = reputation_index()
+    entries = [(token.get(field), kind, f"rugcheck {status}", 'rugcheck') for field, kind in REPUTATION_FIELDS]
+    entries = [entry for entry in entries if entry[0] and entry[0] not in index]
+    if entries:
+        index.add_many(entries)
 
 # Fetch token data from Dexscreener API
+@FETCH_SECONDS.time()
 def fetch_tokens():
-    response = requests.get("https://api.dexscreener.com/token-boosts/latest/v1")
+    try:
+        response = http.get(BOOSTS_URL)
+    except requests.RequestException as e:
+        FETCH_ERRORS.inc(reason='unavailable')
+        print(f"Failed to fetch data: {e}")
+        return []
     if response.status_code != 200:
+        FETCH_ERRORS.inc(reason='status')
         print(f"Failed to fetch data: {response.status_code}")
         return []
     try:
         return response.json()
     except ValueError:
+        FETCH_ERRORS.inc(reason='json')
         print("Failed to decode JSON response")
         return []
 
+def timed_check(check, load):
+    # Wrap a cache loader so only real upstream calls are timed and counted
+    def timed():
+        with REMOTE_CHECK_SECONDS.time(check=check):
+            try:
+                return load()
+            except Exception:
+                REMOTE_CHECK_ERRORS.inc(check=check)
+                raise
+    return timed
+
 def get_twitter_score(account_name):
-    response = requests.get(f'https://scoretwitter.com/{account_name}')
-    score_data = response.json()
-    return score_data.get('score', 0)
+    def load():
+        response = http.get(TWITTER_SCORE_URL.format(account_name))
+        response.raise_for_status()
+        return response.json().get('score', 0)
+    return twitter_score_cache.get_or_load(account_name, timed_check('twitter_score', load), default=0)
 
 def check_rugcheck_status(contract_address):
-    response = requests.get(f'https://rugcheck.xyz/api/check/{contract_address}')
-    status_data = response.json()
-    return status_data.get('status', '')
+    def load():
+        response = http.get(RUGCHECK_URL.format(contract_address))
+        response.raise_for_status()
+        return response.json().get('status', '')
+    return rugcheck_cache.get_or_load(contract_address, timed_check('rugcheck', load), default=UNKNOWN_VERDICT)
 
 def detect_fraudulent_activity(token):
     trading_volume = token.get('trading_volume_24h', 0)
@@ -58,78 +153,241 @@ def detect_fraudulent_activity(token):
 
     return trading_volume > volume_threshold or market_cap > market_cap_threshold
 
-def check_supply_distribution(holders):
-    balances = [holder['balance'] for holder in holders]
-    balance_counter = Counter(balances)
-    bundle_threshold = 5  # Example: at least 5 holders having the same balance
-    for balance, count in balance_counter.items():
-        if count >= bundle_threshold:
+# Volume/market cap windows per token, updated once per poll by record_observations
+rolling_stats = RollingStatsStore()
+
+def token_key(token):
+    return token.get('tokenAddress') or token.get('contract_address', '')
+
+def record_observations(tokens):
+    for token in tokens:
+        if 'trading_volume_24h' not in token and 'market_cap' not in token:
+            continue
+        rolling_stats.observe(token_key(token), token.get('trading_volume_24h', 0), token.get('market_cap', 0))
+
+# At least this many holders with (nearly) the same balance counts as a bundle
+BUNDLE_THRESHOLD = 5
+# Balances within 0.1% of each other form one cluster. With thousands of
+# random holders, small 0.1% buckets collide by chance, so a tolerant cluster
+# only counts as a bundle when it also holds BUNDLE_MIN_SHARE of the supply.
+BUNDLE_TOLERANCE = 0.001
+BUNDLE_MIN_SHARE = 0.05
+
+BundleCluster = namedtuple('BundleCluster', ['size', 'balance', 'supply_share'])
+
+def balance_bucket(balance, width):
+    # Log-spaced buckets: balances in one bucket differ by at most the tolerance
+    if balance <= 0:
+        return None
+    return math.floor(math.log(balance) / width)
+
+def check_supply_distribution(holders, tolerance=0.0, threshold=BUNDLE_THRESHOLD):
+    """True once ``threshold`` holders share a balance, stopping at that holder.
+
+    With ``tolerance`` > 0 balances are grouped into log buckets of that
+    relative width and neighbouring buckets are counted together, so every
+    cluster within the tolerance is caught (clusters up to twice as wide may
+    also match).
+    """
+    counts = {}
+    if tolerance <= 0:
+        for holder in holders:
+            balance = holder['balance']
+            count = counts.get(balance, 0) + 1
+            if count >= threshold:
+                return True
+            counts[balance] = count
+        return False
+
+    width = math.log1p(tolerance)
+    for holder in holders:
+        bucket = balance_bucket(holder['balance'], width)
+        count = counts.get(bucket, 0) + 1
+        counts[bucket] = count
+        if bucket is None:
+            if count >= threshold:
+                return True
+        elif (count + counts.get(bucket - 1, 0) >= threshold or
+              count + counts.get(bucket + 1, 0) >= threshold):
             return True
     return False
 
-def filter_tokens(tokens, blacklist):
-    filtered = []
-    for token in tokens:
-        creation_date_raw = token.get('creation_date')
-        if isinstance(creation_date_raw, str):
-            try:
-                creation_date = datetime.fromisoformat(creation_date_raw)
-            except ValueError:
-                continue
-
-        market_cap = token.get('market_cap', 0)
-        trading_volume = token.get('trading_volume_24h', 0)
-        holder_count = token.get('holders', 0)
-        unpaid_listing = token.get('unpaid_listing', False)
-        social_media_links = token.get('social_media_links', [])
-        total_supply = token.get('total_supply', 0)
-        top_holders = token.get('top_holders', [])
-        twitter_account = token.get('twitter_account', '')
-        contract_address = token.get('contract_address', '')
-        holders = token.get('holders_data', [])
-        creator_address = token.get('creator_address', '')
-
-        if creator_address in blacklist:
+def largest_balance_cluster(holders, tolerance=0.0, total_supply=None):
+    """Size, combined balance and supply share of the biggest balance cluster.
+
+    Uses the same bucketing as check_supply_distribution. The share is taken
+    of ``total_supply`` when given, otherwise of all holder balances.
+    """
+    balances = [holder['balance'] for holder in holders]
+    if not balances:
+        return BundleCluster(0, 0.0, 0.0)
+    if tolerance > 0:
+        width = math.log1p(tolerance)
+        keys = [balance_bucket(balance, width) for balance in balances]
+    else:
+        keys = balances
+    counts = Counter(keys)
+
+    best_keys, best_size = (), 0
+    for key, count in counts.items():
+        cluster = (key,)
+        if tolerance > 0 and key is not None and key + 1 in counts:
+            cluster = (key, key + 1)
+            count += counts[key + 1]
+        if count > best_size:
+            best_keys, best_size = cluster, count
+
+    cluster_balance = sum(balance for key, balance in zip(keys, balances) if key in best_keys)
+    supply = total_supply or sum(balances)
+    return BundleCluster(best_size, cluster_balance, cluster_balance / supply if supply else 0.0)
+
+def check_bundled_supply(holders, total_supply=None, tolerance=BUNDLE_TOLERANCE,
+                         threshold=BUNDLE_THRESHOLD, min_share=BUNDLE_MIN_SHARE):
+    """True if ``threshold`` holders within ``tolerance`` hold ``min_share`` of the supply.
+
+    Catches bundles whose wallets differ by dust, which the exact check in
+    check_supply_distribution misses. The share is taken of ``total_supply``
+    when given, otherwise of all holder balances.
+    """
+    width = math.log1p(tolerance)
+    counts, balances, log, floor = {}, {}, math.log, math.floor
+    all_balances = [holder['balance'] for holder in holders]
+    for balance in all_balances:
+        if balance <= 0:
             continue
+        bucket = floor(log(balance) / width)
+        counts[bucket] = counts.get(bucket, 0) + 1
+        balances[bucket] = balances.get(bucket, 0) + balance
+    supply = total_supply or sum(all_balances)
+    if not supply:
+        return False
+    for bucket, count in counts.items():
+        # Pair each bucket with its upper neighbour, as largest_balance_cluster does
+        size = count + counts.get(bucket + 1, 0)
+        if size >= threshold and (balances[bucket] + balances.get(bucket + 1, 0)) / supply >= min_share:
+            return True
+    return False
+
+def bundled_distribution(token):
+    holders = token.get('holders_data', [])
+    return check_supply_distribution(holders) or check_bundled_supply(holders, token.get('total_supply'))
 
-        if total_supply > 0:
-            top_10_percentage = sum(holder['balance'] for holder in top_holders[:10]) / total_supply
-            twitter_score = get_twitter_score(twitter_account)
-            rugcheck_status = check_rugcheck_status(contract_address)
-            is_fraudulent = detect_fraudulent_activity(token)
-            has_bundled_distribution = check_supply_distribution(holders)
-
-            if (market_cap <= 200_000 and
-                trading_volume <= 1_000_000 and
-                (datetime.now() - creation_date) <= timedelta(hours=2) and
-                holder_count <= 10_000 and
-                not unpaid_listing and
-                social_media_links and
-                top_10_percentage <= 40 and
-                twitter_score >= 3 and
-                rugcheck_status == "Good" and
-                not is_fraudulent and
-                not has_bundled_distribution):
-                filtered.append(token)
-
-    return filtered
-
-def save_to_file(tokens, filename='filtered_tokens_2.json'):
+def token_age(token):
+    creation_date_raw = token.get('creation_date')
+    if not isinstance(creation_date_raw, str):
+        return None
+    return datetime.now() - datetime.fromisoformat(creation_date_raw)
+
+def top_10_percentage(token):
+    top_holders = token.get('top_holders', [])
+    return sum(holder['balance'] for holder in top_holders[:10]) / token.get('total_supply', 0)
+
+def rugcheck_lookup(token):
+    status = check_rugcheck_status(token.get('contract_address', ''))
+    if status and status not in ('Good', UNKNOWN_VERDICT):
+        record_failed_rugcheck(token, status)
+    return status
+
+# Remote lookups, only run for tokens that pass every local rule
+LOOKUPS = {
+    'twitter_score': lambda token: get_twitter_score(token.get('twitter_account', '')),
+    'rugcheck_status': lambda token: rugcheck_lookup(token),
+}
+
+# Values filter rules can test; anything else is read from the token field of that name
+METRICS = {
+    'market_cap': (lambda token, facts: token.get('market_cap', 0), False),
+    'age_hours': (lambda token, facts: token_age(token).total_seconds() / 3600, False),
+    'holder_count': (lambda token, facts: token.get('holders', 0), False),
+    'unpaid_listing': (lambda token, facts: token.get('unpaid_listing', False), False),
+    'blacklisted': (lambda token, facts: is_blacklisted(token, facts.get('blacklist', ())), False),
+    'trading_volume': (lambda token, facts: token.get('trading_volume_24h', 0), False),
+    'social_media_links': (lambda token, facts: token.get('social_media_links', []), False),
+    'total_supply': (lambda token, facts: token.get('total_supply', 0), False),
+    'top_10_percentage': (lambda token, facts: top_10_percentage(token), False),
+    'fraudulent_activity': (lambda token, facts: detect_fraudulent_activity(token), False),
+    'rolling_anomaly': (lambda token, facts: rolling_stats.is_anomalous(token_key(token)), False),
+    'bundled_distribution': (lambda token, facts: bundled_distribution(token), False),
+    'rugcheck_status': (lambda token, facts: facts.get('rugcheck_status'), True),
+    'twitter_score': (lambda token, facts: facts.get('twitter_score') or 0, True),
+}
+
+RULES_FILE = os.getenv("APEBOT_RULES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "filter_rules.json"))
+_rules = None
+
+def rule_set():
+    # Compiled on first use; later calls pick up edits to RULES_FILE
+    global _rules
+    if _rules is None:
+        _rules = RuleSetLoader(RULES_FILE, METRICS, LOOKUPS)
+    return _rules
+
+def rule_stats():
+    # Per-rule counters of every strategy, as {'strategy/rule': {...}}
+    if _rules is None:
+        return {}
+    return {
+        f"{name}/{row['rule']}": {key: row[key] for key in ('evaluated', 'rejected', 'seconds')}
+        for name, engine in _rules.strategies().items() for row in engine.report()
+    }
+
+metrics.register_stats('apebot_rule', rule_stats, label='rule')
+
+def filter_tokens(tokens, blacklist, engine=None, strategy='default', observe=True):
+    # observe=False re-checks tokens already seen without adding rolling-stats samples
+    tokens = list(tokens)
+    with FILTER_SECONDS.time(strategy=strategy):
+        if observe:
+            record_observations(tokens)
+        if engine is None:
+            engine = rule_set().engine(strategy)
+        passing = engine.evaluate(tokens, {'blacklist': blacklist})
+    FILTER_TOKENS.inc(len(passing), strategy=strategy, result='passed')
+    FILTER_TOKENS.inc(len(tokens) - len(passing), strategy=strategy, result='rejected')
+    return passing
+
+def filter_tokens_by_strategy(tokens, blacklist):
+    tokens = list(tokens)
+    record_observations(tokens)
+    return evaluate_strategies(rule_set().strategies(), tokens, {'blacklist': blacklist})
+
+# Filtered tokens are appended here instead of rewriting a JSON dump each run
+TOKEN_DB = os.getenv("APEBOT_TOKEN_DB", "tokens.db")
+LEGACY_TOKEN_DUMP = 'filtered_tokens_2.json'
+_token_store = None
+
+def token_store():
+    # Opened on first use; an old JSON dump is imported once into an empty store
+    global _token_store
+    if _token_store is None:
+        store = TokenStore(TOKEN_DB)
+        if store.count() == 0 and os.path.exists(LEGACY_TOKEN_DUMP):
+            imported = store.import_json_dump(LEGACY_TOKEN_DUMP, os.path.getmtime(LEGACY_TOKEN_DUMP))
+            print(f"Imported {imported} tokens from {LEGACY_TOKEN_DUMP} into {TOKEN_DB}.")
+        _token_store = store
+    return _token_store
+
+def save_to_file(tokens, filename=None, store=None):
+    # Appends to the token store; an explicit filename still gets a JSON dump
     if not tokens:
         print("No tokens to save.")
         return
-    with open(filename, 'w') as file:
-        json.dump(tokens, file, indent=4)
-    print(f"Saved {len(tokens)} tokens to {filename}.")
+    if filename is not None:
+        with open(filename, 'w') as file:
+            json.dump(tokens, file, indent=4)
+        print(f"Saved {len(tokens)} tokens to {filename}.")
+        return
+    store = store or token_store()
+    count = store.append(tokens)
+    print(f"Saved {count} tokens to {store.path}.")
 
-def save_ca_to_file():
+def save_ca_to_file(filename="contract_addresses.txt", start=None, end=None, store=None):
+    # Defaults to the latest saved batch, like the old per-run dump
     try:
-        with open("filtered_tokens_2.json", 'r') as json_file:
-            data = json.load(json_file)
-        contract_addresses = [token.get('tokenAddress', '') for token in data if 'tokenAddress' in token]
-        with open("contract_addresses.txt", 'w') as output_file:
-            for address in contract_addresses:
-                output_file.write(address + '\n')
-        print("Contract addresses saved to contract_addresses.txt")
+        store = store or token_store()
+        if start is None and end is None:
+            start = store.last_recorded_at()
+        count = store.export_addresses(filename, start, end)
+        print(f"{count} contract addresses saved to {filename}")
     except Exception as e:
         print(f"Error occurred: {e}")
@@ -1,17 +1,111 @@
-from flask import Flask, render_template, jsonify
-import requests
-from apebot_v2 import fetch_tokens, save_ca_to_file, filter_tokens, load_blacklist
+import os
+import threading
+
+from flask import Flask, Response, abort, render_template, request, stream_with_context
+import metrics
+from live_events import sse_stream
 
 app = Flask(__name__)
 
+# Kept current in the background; requests only ever read the latest payload
+FEED_INTERVAL = float(os.getenv("FEED_INTERVAL", "30"))
+FEED_MAX_AGE = float(os.getenv("FEED_MAX_AGE", "60"))
+# Each open /stream holds a worker thread for its lifetime; keep this below the
+# threads per worker (see gunicorn.conf.py) so JSON requests are always served
+MAX_STREAMS = int(os.getenv("MAX_STREAMS", "16"))
+_stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+feed = None
+_feed_lock = threading.Lock()
+
+def get_feed():
+    # Built on first use: importing the app (e.g. a gunicorn worker restart)
+    # skips apebot_v2, requests and the reputation index until they are needed
+    global feed
+    if feed is not None:
+        return feed
+    with _feed_lock:
+        if feed is None:
+            from apebot_v2 import load_blacklist
+            from poller import FeedSnapshot
+
+            snapshot = FeedSnapshot(load_blacklist(), interval=FEED_INTERVAL, max_age=FEED_MAX_AGE)
+            metrics.register_stats('apebot_feed_poller', snapshot.poller.stats)
+            metrics.register_stats('apebot_feed_events', snapshot.events.stats)
+            feed = snapshot
+    return feed
+
+# Set APEBOT_PROFILE_INTERVAL (e.g. 0.01) to sample stacks for /debug/profile
+metrics.start_profiler_from_env()
+
 @app.route('/')
 def index():
     return render_template('index4.html')
 
 @app.route('/fetch_tokens')
 def fetch_tokens_route():
-    tokens = fetch_tokens()
-    return(tokens)
+    # ?filtered=1 returns only the tokens that pass filter_tokens
+    view = 'filtered' if request.args.get('filtered', '').lower() in ('1', 'true', 'yes') else 'raw'
+    feed = get_feed()
+    payload = feed.payload(view)
+    status = feed.status
+    headers = {
+        'Cache-Control': f"max-age={int(FEED_INTERVAL)}, stale-while-revalidate={int(FEED_MAX_AGE)}",
+        'Vary': 'Accept-Encoding',
+        # 'warming' until the first poll succeeds; the body is then empty
+        'X-Feed-Status': status,
+        # Open /stream?lastEventId=<this> to get every change after this snapshot
+        'X-Last-Event-ID': payload.event_id,
+    }
+    if status == 'warming':
+        headers['Cache-Control'] = 'no-cache'
+    # The gzip and identity bodies differ byte for byte, so each gets its own ETag
+    gzipped = 'gzip' in request.accept_encodings
+    etag = f"{payload.etag}-gzip" if gzipped else payload.etag
+    if request.if_none_match.contains(etag):
+        response = Response(status=304, headers=headers)
+    elif gzipped:
+        response = Response(payload.gzipped, mimetype='application/json', headers=headers)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(payload.body, mimetype='application/json', headers=headers)
+    response.set_etag(etag)
+    return response
+
+@app.route('/stream')
+def stream_route():
+    # Server-Sent Events: passing tokens and removals as small deltas
+    if not _stream_slots.acquire(blocking=False):
+        return Response("Too many live streams", status=503, headers={'Retry-After': '30'})
+    try:
+        feed = get_feed()
+        feed.start()
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+        subscription = feed.events.subscribe(last_event_id or None)
+        response = Response(
+            stream_with_context(sse_stream(subscription)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+    except BaseException:
+        _stream_slots.release()
+        raise
+    response.call_on_close(_stream_slots.release)
+    return response
+
+@app.route('/metrics')
+def metrics_route():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/debug/profile')
+def profile_route():
+    # Folded stacks for flamegraph.pl / speedscope; ?reset=1 starts a new window
+    if metrics.profiler is None:
+        abort(404)
+    body = metrics.profiler.folded()
+    if request.args.get('reset'):
+        metrics.profiler.reset()
+    return Response(body, mimetype='text/plain')
 
 if __name__ == '__main__':
+    get_feed()
     app.run(debug=True)
@@ -0,0 +1,68 @@
+"""Sequential vs concurrent Twitter/Rugcheck enrichment against a local stub.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_enrichment --tokens 200 --delay 0.02
+"""
+import argparse
+import time
+
+import requests
+
+import apebot_v2
+from benchmarks.stub_server import StubServer
+from enrichment import HostPool, enrich_tokens
+
+
+def make_tokens(count):
+    return [
+        {'twitter_account': f'account{i}', 'contract_address': f'address{i}'}
+        for i in range(count)
+    ]
+
+
+def sequential(tokens):
+    # The pre-pool code path: bare requests.get, one lookup after another
+    results = []
+    for token in tokens:
+        score = requests.get(apebot_v2.TWITTER_SCORE_URL.format(token['twitter_account'])).json()
+        status = requests.get(apebot_v2.RUGCHECK_URL.format(token['contract_address'])).json()
+        results.append({'twitter_score': score.get('score', 0), 'rugcheck_status': status.get('status', '')})
+    return results
+
+
+def concurrent(tokens):
+    return enrich_tokens(tokens, {
+        'twitter_score': lambda token: apebot_v2.get_twitter_score(token['twitter_account']),
+        'rugcheck_status': lambda token: apebot_v2.check_rugcheck_status(token['contract_address']),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=0.02, help="stub latency per request in seconds")
+    args = parser.parse_args()
+
+    tokens = make_tokens(args.tokens)
+    with StubServer(delay=args.delay) as server:
+        apebot_v2.TWITTER_SCORE_URL = server.url + "/score/{}"
+        apebot_v2.RUGCHECK_URL = server.url + "/check/{}"
+        apebot_v2.http = HostPool()
+
+        timings = {}
+        outputs = {}
+        for name, run in (('sequential', sequential), ('concurrent', concurrent)):
+            start = time.perf_counter()
+            outputs[name] = run(tokens)
+            timings[name] = time.perf_counter() - start
+        apebot_v2.http.close()
+
+    assert outputs['sequential'] == outputs['concurrent'], "result order or content differs"
+    for name, elapsed in timings.items():
+        print(f"{name:>10}: {elapsed:8.3f}s  {len(tokens) / elapsed:9.1f} tokens/s")
+    print(f"   speedup: {timings['sequential'] / timings['concurrent']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Address extraction throughput over a corpus of Telegram message texts.
+
+Uses a recorded corpus when given (a JSON list of strings, or one message
+per line), otherwise a synthetic one mixing chatter, links, valid addresses
+and base58-looking junk. Run from the repository root:
+
+    python -m benchmarks.bench_extractor --messages 200000
+    python -m benchmarks.bench_extractor --corpus recorded_messages.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+from address_extractor import BASE58_ALPHABET, AddressExtractor, decoded_length
+
+WORDS = "gm ser wen moon lfg ape in now dev based chart looks bullish 100x send it rug pull jeet".split()
+
+
+def base58_encode(data):
+    value = int.from_bytes(data, 'big')
+    encoded = ''
+    while value:
+        value, remainder = divmod(value, 58)
+        encoded = BASE58_ALPHABET[remainder] + encoded
+    return '1' * (len(data) - len(data.lstrip(b'\0'))) + encoded
+
+
+def make_corpus(count, seed=11):
+    rng = random.Random(seed)
+    addresses = [base58_encode(rng.randbytes(32)) for _ in range(500)]
+    addresses = [address for address in addresses if len(address) == 44]
+    messages = []
+    for _ in range(count):
+        words = rng.choices(WORDS, k=rng.randint(1, 25))
+        roll = rng.random()
+        if roll < 0.15:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(addresses))
+        elif roll < 0.20:
+            words.append(f"https://pump.fun/coin/{rng.choice(addresses)}")
+        elif roll < 0.23:
+            words.append(''.join(rng.choices(BASE58_ALPHABET, k=44)))
+        messages.append(' '.join(words))
+    return messages
+
+
+def load_corpus(path):
+    with open(path, 'r') as f:
+        if path.endswith('.json'):
+            return [text for text in json.load(f) if isinstance(text, str)]
+        return [line.rstrip('\n') for line in f]
+
+
+def legacy(messages):
+    # Pre-extractor path: uncompiled findall, one validation per match, unbounded set
+    found = set()
+    for text in messages:
+        for match in re.findall(r"\b[1-9A-HJ-NP-Za-km-z]{44}\b", text):
+            if match in found:
+                continue
+            if decoded_length(match) == 32:
+                found.add(match)
+    return found
+
+
+def extractor(messages):
+    addresses = AddressExtractor(min_length=44, max_length=44)
+    found = set()
+    for text in messages:
+        found.update(addresses.extract_new(text))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200_000)
+    parser.add_argument('--corpus', help="recorded message texts (.json list or text lines)")
+    args = parser.parse_args()
+
+    if args.corpus and os.path.exists(args.corpus):
+        messages = load_corpus(args.corpus)
+    else:
+        messages = make_corpus(args.messages)
+    size_mb = sum(len(text) for text in messages) / 1e6
+
+    results = {}
+    for name, run in (('legacy', legacy), ('extractor', extractor)):
+        start = time.perf_counter()
+        results[name] = run(messages)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {elapsed:7.3f}s  {len(messages) / elapsed:>10.0f} msg/s  {size_mb / elapsed:6.1f} MB/s  "
+              f"{len(results[name])} addresses")
+    assert results['legacy'] == results['extractor'], "extractors disagree"
+
+
+if __name__ == '__main__':
+    main()
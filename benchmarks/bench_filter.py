@@ -0,0 +1,301 @@
+"""End-to-end apebot_v2 filter benchmark on boost-feed fixtures scaled to 100k tokens.
+
+Loads a boost feed and per-token holder lists (the checked-in samples under
+benchmarks/fixtures, or a capture made with --record-feed), clones them into
+``--tokens`` synthetic tokens with jittered market data, and times each
+stage of the filter: observation recording, fraud detection (scalar and
+batched), bundled-holder detection and the full filter_tokens pass. The
+Twitter and Rugcheck endpoints are served by a local stub whose latency
+follows a log-normal profile with the given median and p99. Peak traced
+memory is measured per stage in a second pass (--no-memory skips it and
+roughly halves the run time); the stub runs in its own process.
+
+Results are written as JSON; pass a previous file to --compare to see the
+change per stage. Run from the repository root:
+
+    python -m benchmarks.bench_filter --tokens 100000 --output filter_results.json
+    python -m benchmarks.bench_filter --compare filter_results.json --output new_results.json
+    python -m benchmarks.bench_filter --record-feed benchmarks/fixtures/boost_feed.json
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import apebot_v2
+from benchmarks.fake_telegram import make_addresses
+from benchmarks.stub_server import StubHandler, StubServer
+from cache import TTLCache
+from enrichment import HostPool
+from fraud_batch import detect_fraudulent_activity_batch
+from rolling_stats import RollingStatsStore
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+# Scaled tokens share this many jittered holder lists and histories per fixture token
+VARIANTS = 64
+
+
+class ProfiledStubHandler(StubHandler):
+    """Stub Twitter/Rugcheck endpoints with log-normal latency and mixed verdicts."""
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.latency())
+        if self.path.startswith('/score/'):
+            self.send_json(200, {'score': server.rng.choice((1, 3, 5, 7, 9))})
+        elif self.path.startswith('/check/'):
+            status = 'Danger' if server.rng.random() < server.danger_rate else 'Good'
+            self.send_json(200, {'status': status})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+
+def latency_profile(median_ms, p99_ms, seed=3):
+    """Sampler for a log-normal latency with the given median and p99."""
+    rng = random.Random(seed)
+    mu = math.log(max(median_ms, 1e-3) / 1000)
+    sigma = max(0.0, math.log(max(p99_ms, median_ms) / max(median_ms, 1e-3)) / 2.326)
+    return lambda: rng.lognormvariate(mu, sigma) if sigma else math.exp(mu)
+
+
+def serve_stub(latency_ms, latency_p99_ms, danger_rate, ready):
+    """Process entry point: run the profiled stub until terminated."""
+    server = StubServer(ProfiledStubHandler)
+    server.httpd.latency = latency_profile(latency_ms, latency_p99_ms)
+    server.httpd.rng = random.Random(5)
+    server.httpd.danger_rate = danger_rate
+    ready.put(server.url)
+    server.httpd.serve_forever()
+
+
+def start_stub(args):
+    # In its own process so the stub's CPU time does not count against the filter
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    process = context.Process(target=serve_stub, daemon=True,
+                              args=(args.latency_ms, args.latency_p99_ms, args.danger_rate, ready))
+    process.start()
+    return process, ready.get(timeout=30)
+
+
+def load_fixtures(feed_path, holders_path):
+    with open(feed_path) as f:
+        feed = json.load(f)
+    holders = {}
+    if holders_path and os.path.exists(holders_path):
+        with open(holders_path) as f:
+            holders = json.load(f)
+    return feed, holders
+
+
+def scale_tokens(feed, holders, count, seed=1):
+    """``count`` tokens cloned from the fixture feed with jittered market data.
+
+    Creation dates are re-anchored so the newest fixture token was created
+    as long before now as it was before the capture.
+    """
+    rng = random.Random(seed)
+    dates = [datetime.fromisoformat(token['creation_date']) for token in feed if token.get('creation_date')]
+    shift = datetime.now() - max(dates) if dates else None
+
+    variants = []
+    for template in feed:
+        holder_list = holders.get(template.get('tokenAddress'), [])
+        history = template.get('historical_data', [])
+        pool = []
+        for _ in range(VARIANTS):
+            factor = rng.uniform(0.8, 1.25)
+            scaled_holders = [dict(holder, balance=holder['balance'] * factor) for holder in holder_list]
+            pool.append((
+                scaled_holders,
+                sorted(scaled_holders, key=lambda holder: holder['balance'], reverse=True)[:10],
+                [{'volume': entry['volume'] * factor, 'market_cap': entry['market_cap'] * factor} for entry in history],
+                factor,
+            ))
+        variants.append(pool)
+
+    addresses = make_addresses(min(count, 20_000), seed=seed)
+    tokens = []
+    for index in range(count):
+        slot = rng.randrange(len(feed))
+        template = feed[slot]
+        holder_list, top_holders, history, factor = rng.choice(variants[slot])
+        address = addresses[index] if index < len(addresses) else f"{addresses[index % len(addresses)]}{index}"
+        token = dict(template)
+        token.update({
+            'tokenAddress': address,
+            'contract_address': address,
+            'twitter_account': f"{template.get('twitter_account', 'account')}{index}",
+            'market_cap': template.get('market_cap', 0) * factor * rng.uniform(0.85, 1.15),
+            'trading_volume_24h': template.get('trading_volume_24h', 0) * factor * rng.uniform(0.85, 1.15),
+            'holders': int(template.get('holders', 0) * rng.uniform(0.8, 1.2)),
+            'holders_data': holder_list,
+            'top_holders': top_holders,
+            'historical_data': history,
+        })
+        if shift is not None and template.get('creation_date'):
+            created = datetime.fromisoformat(template['creation_date']) + shift
+            token['creation_date'] = (created - (datetime.now() - created) * rng.uniform(-0.2, 0.2)).isoformat()
+        tokens.append(token)
+    return tokens
+
+
+def reset_state():
+    # Fresh in-memory caches and rolling windows so every pass does the same work
+    apebot_v2.twitter_score_cache = TTLCache('twitter_score', ttl=30 * 60, negative_ttl=5 * 60)
+    apebot_v2.rugcheck_cache = TTLCache('rugcheck', ttl=10 * 60, negative_ttl=60)
+    apebot_v2.rolling_stats = RollingStatsStore()
+
+
+def stage_functions(tokens, blacklist):
+    def filter_pass():
+        engine = apebot_v2.rule_set().engine('default')
+        engine.reset()
+        return len(apebot_v2.filter_tokens(tokens, blacklist, engine))
+
+    return {
+        'record_observations': lambda: apebot_v2.record_observations(tokens) or len(tokens),
+        'fraud_scalar': lambda: sum(map(apebot_v2.detect_fraudulent_activity, tokens)),
+        'fraud_batch': lambda: int(detect_fraudulent_activity_batch(tokens).sum()),
+        'supply_distribution': lambda: sum(
+            apebot_v2.check_supply_distribution(token['holders_data']) for token in tokens
+        ),
+        'filter_tokens': filter_pass,
+    }
+
+
+def run_stages(tokens, blacklist, measure_memory):
+    results = {}
+    for name, run in stage_functions(tokens, blacklist).items():
+        reset_state()
+        start = time.perf_counter()
+        output = run()
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            'seconds': elapsed,
+            'tokens_per_second': len(tokens) / elapsed if elapsed else 0.0,
+            'result': output,
+        }
+
+    if measure_memory:
+        for name, run in stage_functions(tokens, blacklist).items():
+            reset_state()
+            tracemalloc.start()
+            run()
+            results[name]['peak_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    print(f"\n{'stage':<22}{'before s':>12}{'after s':>12}{'change':>10}")
+    for name, stage in current['stages'].items():
+        before = previous.get('stages', {}).get(name)
+        if not before:
+            continue
+        change = (stage['seconds'] - before['seconds']) / before['seconds'] if before['seconds'] else 0.0
+        print(f"{name:<22}{before['seconds']:>12.3f}{stage['seconds']:>12.3f}{change:>+10.1%}")
+
+
+def record_feed(path):
+    tokens = apebot_v2.fetch_tokens()
+    with open(path, 'w') as f:
+        json.dump(tokens, f, indent=1)
+    print(f"Recorded {len(tokens)} boosted tokens to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=100_000)
+    parser.add_argument('--feed', default=os.path.join(FIXTURES, 'boost_feed.json'))
+    parser.add_argument('--holders', default=os.path.join(FIXTURES, 'holders.json'))
+    parser.add_argument('--blacklist', default=os.path.join(FIXTURES, 'blacklist.json'))
+    parser.add_argument('--latency-ms', type=float, default=5.0, help="median stub latency")
+    parser.add_argument('--latency-p99-ms', type=float, default=25.0, help="p99 stub latency")
+    parser.add_argument('--danger-rate', type=float, default=0.3, help="share of Rugcheck verdicts that fail")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--output', default='filter_results.json')
+    parser.add_argument('--compare', help="previous results file to diff against")
+    parser.add_argument('--record-feed', metavar='PATH', help="save the live boost feed as a fixture and exit")
+    args = parser.parse_args()
+
+    if args.record_feed:
+        record_feed(args.record_feed)
+        return
+
+    feed, holders = load_fixtures(args.feed, args.holders)
+    with open(args.blacklist) as f:
+        blacklist = set(json.load(f))
+
+    start = time.perf_counter()
+    tokens = scale_tokens(feed, holders, args.tokens)
+    scale_seconds = time.perf_counter() - start
+
+    # Failed verdicts feed the reputation index; keep the benchmark's out of the working one
+    scratch = tempfile.mkdtemp(prefix='bench_filter_')
+    apebot_v2.REPUTATION_DB = os.path.join(scratch, 'reputation.db')
+    stub, url = start_stub(args)
+    # Different host names, so each upstream gets its own connection limit as in production
+    apebot_v2.TWITTER_SCORE_URL = url.replace('127.0.0.1', 'localhost') + "/score/{}"
+    apebot_v2.RUGCHECK_URL = url + "/check/{}"
+    apebot_v2.http = HostPool()
+    try:
+        stages = run_stages(tokens, blacklist, not args.no_memory)
+        report = apebot_v2.rule_set().engine('default').report()
+    finally:
+        apebot_v2.http.close()
+        stub.terminate()
+
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'parameters': {
+            'tokens': args.tokens,
+            'fixture_tokens': len(feed),
+            'latency_ms': args.latency_ms,
+            'latency_p99_ms': args.latency_p99_ms,
+            'danger_rate': args.danger_rate,
+        },
+        'scale_seconds': scale_seconds,
+        'stages': stages,
+        'rules': report,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{args.tokens} tokens from {len(feed)} fixture tokens (scaled in {scale_seconds:.2f}s), "
+          f"stub latency p50 {args.latency_ms}ms / p99 {args.latency_p99_ms}ms")
+    print(f"{'stage':<22}{'seconds':>10}{'tokens/s':>12}{'peak MB':>10}{'result':>10}")
+    for name, stage in stages.items():
+        peak = f"{stage['peak_mb']:10.1f}" if 'peak_mb' in stage else f"{'-':>10}"
+        print(f"{name:<22}{stage['seconds']:>10.3f}{stage['tokens_per_second']:>12.0f}{peak}{stage['result']:>10}")
+    print(f"max RSS {results['max_rss_mb']:.0f} MB, results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
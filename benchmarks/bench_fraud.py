@@ -0,0 +1,70 @@
+"""Scalar vs batched detect_fraudulent_activity at 1k, 10k and 100k tokens.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_fraud
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from apebot_v2 import detect_fraudulent_activity
+from fraud_batch import detect_fraudulent_activity_batch, three_sigma_flags
+
+
+def make_tokens(count, seed=42):
+    rng = random.Random(seed)
+    tokens = []
+    for _ in range(count):
+        length = rng.choice((0, 5, 12, 24, 24, 24, 48))
+        base_volume = rng.uniform(1_000, 500_000)
+        base_market_cap = rng.uniform(10_000, 2_000_000)
+        history = [
+            {'volume': base_volume * rng.uniform(0.5, 1.5), 'market_cap': base_market_cap * rng.uniform(0.8, 1.2)}
+            for _ in range(length)
+        ]
+        spike = rng.random() < 0.05
+        tokens.append({
+            'trading_volume_24h': base_volume * (rng.uniform(3, 10) if spike else rng.uniform(0.5, 1.5)),
+            'market_cap': base_market_cap * rng.uniform(0.8, 1.2),
+            'historical_data': history,
+        })
+    return tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    # "packed s" is the array math alone, i.e. the cost once histories are kept as arrays
+    print(f"{'tokens':>8}{'scalar s':>12}{'batch s':>12}{'speedup':>10}{'packed s':>12}{'flagged':>10}")
+    for size in args.sizes:
+        tokens = make_tokens(size)
+
+        start = time.perf_counter()
+        expected = [detect_fraudulent_activity(token) for token in tokens]
+        scalar = time.perf_counter() - start
+
+        start = time.perf_counter()
+        mask = detect_fraudulent_activity_batch(tokens)
+        batch = time.perf_counter() - start
+
+        assert mask.tolist() == expected, "batched verdicts differ from scalar"
+
+        samples = 24
+        volumes = np.array([[entry['volume'] for entry in token['historical_data']] for token in tokens
+                            if len(token['historical_data']) == samples])
+        market_caps = volumes * 4
+        current = volumes[:, -1] * 2
+        start = time.perf_counter()
+        three_sigma_flags(volumes, market_caps, current, current)
+        packed = (time.perf_counter() - start) * len(tokens) / len(volumes)
+
+        print(f"{size:>8}{scalar:>12.3f}{batch:>12.3f}{scalar / batch:>9.1f}x{packed:>12.4f}{int(mask.sum()):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Cold import time of the entry-point modules, each in a fresh interpreter.
+
+Every module is imported ``--runs`` times in a new ``python -X importtime``
+process and the median cumulative import time is reported, with the
+slowest modules it pulled in. It also checks that the heavy dependencies
+meant to load lazily (Telethon, solders, SQLAlchemy, and apebot_v2/requests
+for the Flask app and the Telegram monitor) were not imported. With
+``--max-ms`` it exits non-zero when a module is slower than the limit or
+imports something it should not, so it can gate startup regressions. Run
+from the repository root:
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --module app --runs 10 --max-ms 300
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Modules that must not be loaded just by importing each entry point
+LAZY = ('telethon', 'solders', 'solana', 'sqlalchemy', 'flask_sqlalchemy')
+TARGETS = {
+    'app': LAZY + ('apebot_v2', 'requests', 'poller'),
+    'telegram_monitor': LAZY + ('apebot_v2', 'requests', 'config', 'buy_program', 'main'),
+    'apebot_v2': LAZY,
+}
+
+_SCRIPT = "import sys; import {module}; print(','.join(sorted(name for name in {lazy!r} if name in sys.modules)))"
+
+
+def import_once(module, lazy):
+    """``(cumulative microseconds, {imported module: self microseconds}, loaded lazy modules)``."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _SCRIPT.format(module=module, lazy=lazy)],
+        capture_output=True, text=True, check=True,
+    )
+    own, total = {}, 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        own[name.strip()] = int(self_us)
+        if name.strip() == module:
+            total = int(cumulative_us)
+    loaded = [name for name in result.stdout.strip().split(',') if name]
+    return total, own, loaded
+
+
+def measure(module, runs):
+    totals, own, loaded = [], {}, set()
+    for _ in range(runs):
+        total, own, run_loaded = import_once(module, TARGETS[module])
+        totals.append(total)
+        loaded.update(run_loaded)
+    return statistics.median(totals) / 1000, own, sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', choices=sorted(TARGETS), action='append')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=5, help="slowest imported modules to list")
+    parser.add_argument('--max-ms', type=float, help="fail if a module's median import time exceeds this")
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.module or TARGETS:
+        try:
+            median_ms, own, loaded = measure(module, args.runs)
+        except subprocess.CalledProcessError as e:
+            failures.append(f"{module} failed to import: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{module:>18}: {median_ms:7.1f}ms median over {args.runs} runs, {len(own)} modules")
+        for name, self_us in sorted(own.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"{'':>20}{self_us / 1000:7.1f}ms  {name}")
+        if loaded:
+            failures.append(f"{module} imports {', '.join(loaded)} eagerly")
+        if args.max_ms is not None and median_ms > args.max_ms:
+            failures.append(f"{module} imports in {median_ms:.1f}ms > {args.max_ms}ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Boost feed poller against a local fake Dexscreener server.
+
+Mutates the fake feed between polls and checks that only new or changed
+tokens are reported, and that unchanged feeds cost a 304. Run from the
+repository root:
+
+    python -m benchmarks.bench_poller --tokens 500 --polls 20
+"""
+import argparse
+import random
+import time
+
+from benchmarks.stub_server import FakeDexscreenerHandler, StubServer
+from poller import BoostFeedPoller
+
+
+def make_token(index):
+    return {'tokenAddress': f'Token{index:040d}', 'chainId': 'solana', 'amount': 10, 'totalAmount': 10}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=500)
+    parser.add_argument('--polls', type=int, default=20)
+    parser.add_argument('--churn', type=float, default=0.02, help="fraction of tokens added/changed per poll")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    feed = [make_token(i) for i in range(args.tokens)]
+    deltas = []
+    with StubServer(FakeDexscreenerHandler, feed=feed) as server:
+        poller = BoostFeedPoller(lambda *delta: None, url=server.url + "/token-boosts/latest/v1")
+        start = time.perf_counter()
+        for poll in range(args.polls):
+            expected = 0
+            if poll == 0:
+                expected = len(feed)
+            elif poll % 2:
+                # Odd polls see churn; even polls see an identical feed and must get a 304
+                for _ in range(int(args.tokens * args.churn)):
+                    index = rng.randrange(len(feed))
+                    feed[index] = dict(feed[index], totalAmount=feed[index]['totalAmount'] + 1)
+                    feed.append(make_token(len(feed)))
+                expected = len({t['tokenAddress'] for t in feed}) - len(poller.snapshot)
+                expected += sum(1 for t in feed if t['tokenAddress'] in poller.snapshot
+                                and poller.snapshot[t['tokenAddress']] != t)
+            new, changed, removed = poller.poll_once()
+            assert len(new) + len(changed) == expected, (poll, len(new), len(changed), expected)
+            deltas.append(len(new) + len(changed))
+        elapsed = time.perf_counter() - start
+        requests_served = server.httpd.requests
+
+    full = args.tokens * args.polls
+    print(f"polls: {poller.polls}  304s: {poller.not_modified}  errors: {poller.errors}  requests: {requests_served}")
+    print(f"tokens passed to filter: {sum(deltas)} (vs {full}+ reprocessing every poll)")
+    print(f"elapsed: {elapsed:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
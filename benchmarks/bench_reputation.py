@@ -0,0 +1,75 @@
+"""Blacklist as a JSON-loaded set vs the SQLite + Bloom reputation index.
+
+Measures startup (json.load into a set vs opening the index), the memory
+each holds in-process, and lookup cost for absent and present addresses.
+Run from the repository root:
+
+    python -m benchmarks.bench_reputation --addresses 1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fake_telegram import make_addresses
+from reputation import CREATOR, ReputationIndex
+
+
+def per_lookup_us(container, keys, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for key in keys:
+            key in container
+    return (time.perf_counter() - start) / (repeat * len(keys)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--addresses', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    # Cheap unique keys for the bulk, real-looking addresses for the probes
+    known = [f"{index:044d}" for index in range(args.addresses)]
+    absent = make_addresses(2_000)
+    present = known[::max(1, args.addresses // 2_000)][:2_000]
+
+    with tempfile.TemporaryDirectory() as directory:
+        dump = os.path.join(directory, 'blacklist.json')
+        with open(dump, 'w') as f:
+            json.dump(known, f)
+        path = os.path.join(directory, 'reputation.db')
+        start = time.perf_counter()
+        index = ReputationIndex(path, capacity=max(args.addresses, 1_000))
+        index.add_many((address, CREATOR, '', 'bench') for address in known)
+        index.close()
+        print(f"built index for {args.addresses} addresses in {time.perf_counter() - start:.1f}s")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with open(dump) as f:
+            blacklist = set(json.load(f))
+        set_seconds = time.perf_counter() - start
+        set_mb = tracemalloc.get_traced_memory()[0] / 2 ** 20
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        index = ReputationIndex(path, capacity=max(args.addresses, 1_000))
+        index_seconds = time.perf_counter() - start
+        index_mb = tracemalloc.get_traced_memory()[0] / 2 ** 20
+        tracemalloc.stop()
+
+        print(f"{'':>8}{'load s':>10}{'heap MB':>10}{'absent us':>12}{'present us':>12}")
+        print(f"{'set':>8}{set_seconds:>10.3f}{set_mb:>10.1f}"
+              f"{per_lookup_us(blacklist, absent):>12.2f}{per_lookup_us(blacklist, present):>12.2f}")
+        print(f"{'index':>8}{index_seconds:>10.3f}{index_mb:>10.1f}"
+              f"{per_lookup_us(index, absent):>12.2f}{per_lookup_us(index, present):>12.2f}")
+        print(f"bloom file {os.path.getsize(path + '.bloom') / 2 ** 20:.1f} MB (shared page cache), "
+              f"index stats {index.stats()}")
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Bundled-holder detection on synthetic holder lists.
+
+Compares the original full-Counter check with the streaming exact and
+tolerance-bucketed checks, the supply-share guarded check the filter rule
+uses, and the largest-cluster report. With thousands of random balances,
+0.1% buckets collide by chance and the unguarded tolerant check also fires on
+the "none" lists.
+Run from the repository root:
+
+    python -m benchmarks.bench_supply --holders 10000 50000
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from apebot_v2 import BUNDLE_TOLERANCE, check_bundled_supply, check_supply_distribution, largest_balance_cluster
+
+
+def counter_check(holders):
+    # The pre-streaming implementation
+    balance_counter = Counter(holder['balance'] for holder in holders)
+    return any(count >= 5 for count in balance_counter.values())
+
+
+def make_holders(count, bundle_at=None, seed=7):
+    rng = random.Random(seed)
+    holders = [{'balance': round(10 ** rng.uniform(2, 9), 6)} for _ in range(count)]
+    if bundle_at is not None:
+        # Six bundled wallets that differ only by dust, about 2% of the supply each
+        share = sum(holder['balance'] for holder in holders) / 50
+        bundle = [{'balance': share + rng.uniform(0, 1000)} for _ in range(6)]
+        position = int(bundle_at * count)
+        holders[position:position] = bundle
+    return holders
+
+
+def timed(fn, holders, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(holders)
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--holders', type=int, nargs='+', default=[10_000, 50_000])
+    args = parser.parse_args()
+
+    checks = {
+        'counter': counter_check,
+        'exact': check_supply_distribution,
+        'tolerant': lambda holders: check_supply_distribution(holders, BUNDLE_TOLERANCE),
+        'guarded': check_bundled_supply,
+        'report': lambda holders: largest_balance_cluster(holders, BUNDLE_TOLERANCE).size,
+    }
+    print(f"{'holders':>8} {'bundle':<8}" + "".join(f"{name:>16}" for name in checks))
+    for count in args.holders:
+        for label, bundle_at in (('none', None), ('early', 0.05), ('late', 0.95)):
+            holders = make_holders(count, bundle_at)
+            cells = []
+            for fn in checks.values():
+                elapsed, result = timed(fn, holders)
+                cells.append(f"{elapsed:9.2f}ms {str(result):<5}")
+            print(f"{count:>8} {label:<8}" + "".join(f"{cell:>16}" for cell in cells))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Per-run cost of keeping token history: JSON dump rewrite vs TokenStore append.
+
+Each run saves a batch of filtered tokens and exports the contract
+addresses. The JSON path rewrites and re-parses the whole history, as
+save_to_file/save_ca_to_file would have to in order to keep it; the store
+appends the batch and exports from the address index. Run from the
+repository root:
+
+    python -m benchmarks.bench_token_store --runs 200 --batch 500
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.fake_telegram import make_addresses
+from token_store import TokenStore
+
+
+def make_batch(addresses, run, size):
+    return [
+        {'tokenAddress': addresses[(run * size + index) % len(addresses)], 'chainId': 'solana',
+         'market_cap': 50_000 + index, 'links': [{'type': 'twitter', 'url': 'https://x.com/example'}]}
+        for index in range(size)
+    ]
+
+
+def json_run(directory, history, batch):
+    history.extend(batch)
+    dump = os.path.join(directory, 'filtered_tokens.json')
+    with open(dump, 'w') as f:
+        json.dump(history, f, indent=4)
+    with open(dump) as f:
+        data = json.load(f)
+    with open(os.path.join(directory, 'contract_addresses.txt'), 'w') as f:
+        for token in data:
+            f.write(token['tokenAddress'] + '\n')
+
+
+def store_run(directory, store, batch):
+    recorded_at = time.time()
+    store.append(batch, recorded_at)
+    store.export_addresses(os.path.join(directory, 'contract_addresses.txt'), start=recorded_at)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=500)
+    args = parser.parse_args()
+
+    addresses = make_addresses(5_000)
+    with tempfile.TemporaryDirectory() as directory:
+        history = []
+        store = TokenStore(os.path.join(directory, 'tokens.db'))
+        print(f"{'history':>10}{'json ms/run':>14}{'store ms/run':>14}")
+        for run in range(args.runs):
+            batch = make_batch(addresses, run, args.batch)
+            start = time.perf_counter()
+            json_run(directory, history, batch)
+            json_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            store_run(directory, store, batch)
+            store_ms = (time.perf_counter() - start) * 1000
+            if run % max(1, args.runs // 10) == 0 or run == args.runs - 1:
+                print(f"{len(history):>10}{json_ms:>14.1f}{store_ms:>14.1f}")
+        start = time.perf_counter()
+        window = store.window(time.time() - 1, None)
+        print(f"last-second window query: {len(window)} rows in {(time.perf_counter() - start) * 1000:.1f}ms")
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Drive the shared upstream client through injected faults and check it copes.
+
+Each scenario points apebot_v2 at a fault-injecting stub, runs a batch of
+Twitter/Rugcheck lookups and asserts the expected outcome: throttling is
+absorbed by the adaptive rate limit, transient errors, hangs and dropped
+connections by retries, and an outage opens the circuit breaker so lookups
+fail fast with cached or unknown verdicts until the host recovers. Run from
+the repository root:
+
+    python -m benchmarks.chaos_upstream
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import apebot_v2
+import metrics
+from benchmarks.stub_server import FaultInjectingHandler, StubServer
+from cache import TTLCache
+from enrichment import HostPool
+from upstream import CircuitOpenError
+
+
+def fresh_client(server, **kwargs):
+    apebot_v2.http.close()
+    apebot_v2.http = HostPool(**kwargs)
+    apebot_v2.TWITTER_SCORE_URL = server.url + "/score/{}"
+    apebot_v2.RUGCHECK_URL = server.url + "/check/{}"
+    apebot_v2.twitter_score_cache = TTLCache('twitter_score', ttl=30 * 60, negative_ttl=5 * 60)
+    apebot_v2.rugcheck_cache = TTLCache('rugcheck', ttl=10 * 60, negative_ttl=60)
+
+
+def run_lookups(count, prefix, workers=16):
+    with ThreadPoolExecutor(workers) as executor:
+        return list(executor.map(apebot_v2.check_rugcheck_status, (f"{prefix}{index}" for index in range(count))))
+
+
+def host_stats(server):
+    return apebot_v2.http.stats().get(server.url.split('//', 1)[1], {})
+
+
+def throttling(server, args):
+    server.httpd.faults = {'throttle_rps': 40, 'retry_after': 1}
+    fresh_client(server, rate=200.0, retries=4)
+    start = time.perf_counter()
+    verdicts = run_lookups(args.requests, 'throttle')
+    elapsed = time.perf_counter() - start
+    good = verdicts.count('Good')
+    stats = host_stats(server)
+    assert stats['throttled'] > 0, "no 429 reached the rate limiter"
+    assert good >= 0.95 * len(verdicts), f"only {good}/{len(verdicts)} succeeded under throttling"
+    return f"{good}/{len(verdicts)} good in {elapsed:.1f}s, rate adapted to {stats['rate']:.1f}/s"
+
+
+def transient_errors(server, args):
+    server.httpd.faults = {'error_rate': 0.3}
+    fresh_client(server)
+    verdicts = run_lookups(args.requests, 'flaky')
+    good = verdicts.count('Good')
+    # Three attempts at 30% errors: about 2.7% of lookups still fail
+    assert good >= 0.9 * len(verdicts), f"only {good}/{len(verdicts)} succeeded with 30% errors"
+    return f"{good}/{len(verdicts)} good with 30% injected 500s"
+
+
+def hangs_and_drops(server, args):
+    server.httpd.faults = {'hang_rate': 0.1, 'hang_seconds': 2.0, 'drop_rate': 0.1}
+    fresh_client(server, timeout=(0.5, 0.5))
+    start = time.perf_counter()
+    verdicts = run_lookups(args.requests // 2, 'hang')
+    elapsed = time.perf_counter() - start
+    good = verdicts.count('Good')
+    assert good >= 0.9 * len(verdicts), f"only {good}/{len(verdicts)} succeeded with hangs and drops"
+    return f"{good}/{len(verdicts)} good with 10% hangs and 10% drops in {elapsed:.1f}s"
+
+
+def outage(server, args):
+    server.httpd.faults = {}
+    fresh_client(server, failure_threshold=5, reset_timeout=1.0, retries=1)
+    apebot_v2.rugcheck_cache = TTLCache('rugcheck', ttl=0.5, negative_ttl=60)
+    assert apebot_v2.check_rugcheck_status('cached') == 'Good'
+    time.sleep(0.6)  # let the cached verdict expire
+
+    server.httpd.faults = {'outage': True}
+    run_lookups(20, 'outage', workers=4)
+    stats = host_stats(server)
+    assert stats['circuit_open'], "circuit did not open during the outage"
+
+    start = time.perf_counter()
+    try:
+        apebot_v2.http.get(apebot_v2.RUGCHECK_URL.format('direct'))
+        raise AssertionError("request went through an open circuit")
+    except CircuitOpenError:
+        pass
+    fail_fast_ms = (time.perf_counter() - start) * 1000
+    stale = apebot_v2.check_rugcheck_status('cached')
+    unknown = apebot_v2.check_rugcheck_status('never-seen')
+    assert stale == 'Good', f"expected the stale cached verdict, got {stale!r}"
+    assert unknown == apebot_v2.UNKNOWN_VERDICT, f"expected an unknown verdict, got {unknown!r}"
+
+    server.httpd.faults = {}
+    time.sleep(1.1)
+    assert apebot_v2.check_rugcheck_status('recovered') == 'Good', "no recovery after the outage"
+    assert not host_stats(server)['circuit_open'], "circuit still open after recovery"
+    return f"circuit opened, fail-fast in {fail_fast_ms:.2f}ms, stale={stale!r} unknown={unknown!r}, recovered"
+
+
+SCENARIOS = {
+    'throttling': throttling,
+    'transient_errors': transient_errors,
+    'hangs_and_drops': hangs_and_drops,
+    'outage': outage,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append')
+    args = parser.parse_args()
+
+    with StubServer(FaultInjectingHandler) as server:
+        for name in args.scenario or SCENARIOS:
+            print(f"{name:>18}: {SCENARIOS[name](server, args)}")
+    lines = [line for line in metrics.render().splitlines()
+             if line.startswith(('upstream_requests_total', 'apebot_upstream_'))]
+    print("\n".join(lines))
+
+
+if __name__ == '__main__':
+    main()
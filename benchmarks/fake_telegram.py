@@ -0,0 +1,149 @@
+"""Fake Telegram clients for exercising the ingestion code without an account."""
+import asyncio
+import os
+import random
+import sys
+import types
+from datetime import datetime, timezone
+
+from address_extractor import BASE58_ALPHABET
+from shard_supervisor import ShardFloodWait
+
+
+def base58_encode(data):
+    value = int.from_bytes(data, 'big')
+    encoded = ''
+    while value:
+        value, remainder = divmod(value, 58)
+        encoded = BASE58_ALPHABET[remainder] + encoded
+    return '1' * (len(data) - len(data.lstrip(b'\0'))) + encoded
+
+
+def make_addresses(count, seed=5):
+    """Deterministic 44-character addresses that decode to 32 bytes."""
+    rng = random.Random(seed)
+    addresses = []
+    while len(addresses) < count:
+        address = base58_encode(rng.randbytes(32))
+        if len(address) == 44:
+            addresses.append(address)
+    return addresses
+
+
+class FakeShardClient:
+    """Shard client stub that posts synthetic shill messages to its groups.
+
+    The session name picks a behaviour: names containing ``crash`` exit after
+    ``FAKE_CRASH_AFTER`` seconds, names containing ``flood`` report a flood
+    wait the first time they are asked to watch groups.
+    """
+
+    addresses = make_addresses(50)
+
+    def __init__(self, session_name):
+        self.session_name = session_name
+        self.groups = []
+        self.on_message = None
+        self.flooded = False
+        self.rng = random.Random(session_name)
+        self._stopped = asyncio.Event()
+
+    async def start(self):
+        pass
+
+    async def watch(self, groups, on_message):
+        if 'flood' in self.session_name and not self.flooded and groups:
+            self.flooded = True
+            raise ShardFloodWait(float(os.getenv('FAKE_FLOOD_SECONDS', '2')))
+        self.groups = list(groups)
+        self.on_message = on_message
+
+    async def run(self):
+        crash_after = float(os.getenv('FAKE_CRASH_AFTER', '1.5'))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        while not self._stopped.is_set():
+            if 'crash' in self.session_name and loop.time() - started > crash_after:
+                os._exit(1)
+            for group in self.groups:
+                address = self.rng.choice(self.addresses)
+                await self.on_message(group, f"new gem {address} lfg")
+            await asyncio.sleep(0.05)
+
+    async def stop(self):
+        self._stopped.set()
+
+
+class FakeMessage:
+    """The attributes of a Telethon Message that the ingestion handlers read."""
+
+    def __init__(self, message_id, text, chat_id=1, media=None, entities=None, fwd_from=None):
+        self.id = message_id
+        self.raw_text = text
+        self.text = text
+        self.message = text
+        self.date = datetime.now(timezone.utc)
+        self.chat_id = chat_id
+        self.media = media
+        self.entities = entities
+        self.fwd_from = fwd_from
+
+
+class FakeChat:
+    def __init__(self, chat_id, title):
+        self.id = chat_id
+        self.title = title
+
+
+class FakeEvent:
+    """A NewMessage event carrying a FakeMessage."""
+
+    def __init__(self, message, chat):
+        self.message = message
+        self.chat = chat
+        self.chat_id = chat.id
+        self.text = message.raw_text
+
+    async def get_chat(self):
+        return self.chat
+
+
+class _SocketIOStub:
+    def emit(self, *args, **kwargs):
+        pass
+
+
+def install_stub_modules(groups_file, buy_token):
+    """Register stand-ins for modules the Telegram code imports but this repo
+    does not ship (config, buy_program, main, models), plus Telethon and
+    python-dotenv when they are not installed."""
+
+    def module(name, **attributes):
+        stub = types.ModuleType(name)
+        stub.__dict__.update(attributes)
+        sys.modules[name] = stub
+        return stub
+
+    settings = types.SimpleNamespace(groups_file=groups_file, api_id=0, api_hash='')
+    module('config', settings=settings)
+    module('buy_program', buy_token=buy_token)
+    module('main', socketio=_SocketIOStub(), db=None, app=None, Contract=None)
+    module('models', MonitoringSource=types.SimpleNamespace)
+
+    try:
+        import telethon  # noqa: F401
+    except ImportError:
+        class FloodWaitError(Exception):
+            def __init__(self, seconds=0):
+                super().__init__(f"flood wait of {seconds}s")
+                self.seconds = seconds
+
+        module('telethon', TelegramClient=object,
+               events=types.SimpleNamespace(NewMessage=lambda **kwargs: None))
+        module('telethon.errors', FloodWaitError=FloodWaitError, SessionPasswordNeededError=Exception)
+        module('telethon.tl')
+        module('telethon.tl.types', Channel=object, Chat=object, User=object)
+    try:
+        import dotenv  # noqa: F401
+    except ImportError:
+        module('dotenv', load_dotenv=lambda *args, **kwargs: None)
@@ -0,0 +1,296 @@
+"""Replay a message stream through the Telegram handlers and measure ingestion.
+
+Messages come from a recorded corpus (a JSON list of strings, or one message
+per line) or are generated. They are delivered as fake Telethon NewMessage
+events at the requested rate and shape, one task per event like Telethon
+does, into either ``telegram_monitor`` (process_contract and the detection
+pipeline) or ``telegram_monitor_sample`` (check_message_for_tokens).
+``buy_token``, the Rugcheck lookup and the contract database are stubbed
+with configurable latencies, so no account or network is needed.
+
+Reports throughput, detection latency (message delivered -> buy_token
+called, first sighting of each address) and event-loop lag. With any of
+the ``--max-*``/``--min-*`` limits it exits non-zero when a limit is
+broken, so it can gate changes to the ingestion path. Run from the
+repository root:
+
+    python -m benchmarks.replay_ingestion --rate 500 --duration 10
+    python -m benchmarks.replay_ingestion --shape burst --burst-factor 20 --max-p99-ms 250
+    python -m benchmarks.replay_ingestion --target sample --corpus recorded_messages.json --json out.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_extractor import load_corpus, make_corpus
+from benchmarks.fake_telegram import FakeChat, FakeEvent, FakeMessage, install_stub_modules
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency_summary(samples):
+    return {
+        'count': len(samples),
+        'p50_ms': percentile(samples, 0.5) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'max_ms': max(samples, default=0.0) * 1000,
+    }
+
+
+def arrival_offsets(count, rate, shape, burst_factor=10.0, burst_every=5.0, burst_length=0.5, peak_rate=None):
+    """Send offsets (seconds from start) for ``count`` messages.
+
+    ``constant`` sends at ``rate``; ``burst`` multiplies the rate by
+    ``burst_factor`` for ``burst_length`` seconds every ``burst_every``;
+    ``ramp`` climbs linearly from ``rate`` to ``peak_rate`` over the run.
+    """
+    peak_rate = peak_rate or rate * burst_factor
+    expected_duration = count / rate
+    offsets = []
+    now = 0.0
+    for _ in range(count):
+        offsets.append(now)
+        if shape == 'burst':
+            current = rate * burst_factor if now % burst_every < burst_length else rate
+        elif shape == 'ramp':
+            current = rate + (peak_rate - rate) * min(1.0, now / expected_duration)
+        else:
+            current = rate
+        now += 1.0 / current
+    return offsets
+
+
+class Recorder:
+    """Collects detection latencies: first delivery of an address -> buy."""
+
+    def __init__(self):
+        self.first_sent = {}
+        self.latencies = []
+        self.buys = 0
+
+    def sent(self, text, addresses, at):
+        for address in addresses:
+            if address in text:
+                self.first_sent.setdefault(address, at)
+
+    def detected(self, address):
+        sent_at = self.first_sent.get(address)
+        if sent_at is not None:
+            self.latencies.append(time.perf_counter() - sent_at)
+
+
+class MemoryContractWriter:
+    """In-memory stand-in for ContractWriter."""
+
+    def __init__(self):
+        self.known = set()
+
+    def add(self, address, group, timestamp=None):
+        if address in self.known:
+            return False
+        self.known.add(address)
+        return True
+
+    def forget(self, address):
+        self.known.discard(address)
+
+    async def stop(self):
+        pass
+
+    def stats(self):
+        return {'known': len(self.known)}
+
+
+async def measure_loop_lag(samples, interval=0.01):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - start - interval))
+
+
+def make_buy_token(recorder, latency):
+    async def buy_token(contract_address, group_name):
+        recorder.detected(contract_address)
+        recorder.buys += 1
+        if latency:
+            await asyncio.sleep(latency)
+    return buy_token
+
+
+def install(args, recorder):
+    groups_file = os.path.join(tempfile.mkdtemp(prefix='replay_'), 'groups.txt')
+    with open(groups_file, 'w') as f:
+        f.write('\n'.join(f"group{index}" for index in range(args.groups)))
+    install_stub_modules(groups_file, make_buy_token(recorder, args.buy_latency))
+
+    import apebot_v2
+    apebot_v2.REPUTATION_DB = os.path.join(os.path.dirname(groups_file), 'reputation.db')
+
+    def check_rugcheck_status(contract_address):
+        time.sleep(args.rugcheck_latency)
+        return "Good"
+
+    apebot_v2.check_rugcheck_status = check_rugcheck_status
+
+
+async def build_handler(target, recorder):
+    """An ``async handler(event)`` equivalent to the target's NewMessage handler."""
+    if target == 'sample':
+        from address_extractor import AddressExtractor
+        from telegram_monitor_sample import TelegramMonitor
+
+        # Skip __init__: it would build a real client from .env credentials
+        monitor = TelegramMonitor.__new__(TelegramMonitor)
+        monitor.token_extractor = AddressExtractor(min_length=32, max_length=44)
+        monitor.set_token_handler(make_buy_token(recorder, 0.0))
+
+        async def handler(event):
+            await monitor.check_message_for_tokens(event.message.raw_text or "", event.chat.title)
+
+        async def drain():
+            pass
+
+        return handler, drain, lambda: {}
+
+    import telegram_monitor
+
+    telegram_monitor._contract_writer = MemoryContractWriter()
+    pipeline = await telegram_monitor.get_detection_pipeline()
+
+    async def handler(event):
+        group_name = event.chat.title or f"Group {event.chat_id}"
+        await telegram_monitor.process_contract(None, event.message, group_name, is_new=True)
+
+    async def drain():
+        await pipeline.stop()
+
+    return handler, drain, pipeline.stats
+
+
+async def replay(args, messages, addresses):
+    recorder = Recorder()
+    install(args, recorder)
+    handler, drain, pipeline_stats = await build_handler(args.target, recorder)
+
+    chats = [FakeChat(-100 - index, f"group{index}") for index in range(args.groups)]
+    offsets = arrival_offsets(len(messages), args.rate, args.shape, args.burst_factor,
+                              args.burst_every, args.burst_length, args.peak_rate)
+    rng = random.Random(args.seed)
+    lag = []
+    lag_task = asyncio.create_task(measure_loop_lag(lag))
+    tasks = set()
+
+    start = time.perf_counter()
+    for index, (text, offset) in enumerate(zip(messages, offsets)):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        chat = rng.choice(chats)
+        event = FakeEvent(FakeMessage(index, text, chat_id=chat.id), chat)
+        recorder.sent(text, addresses, time.perf_counter())
+        task = asyncio.create_task(handler(event))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    send_seconds = time.perf_counter() - start
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    await drain()
+    total_seconds = time.perf_counter() - start
+    lag_task.cancel()
+
+    return {
+        'target': args.target,
+        'shape': args.shape,
+        'messages': len(messages),
+        'offered_rate': args.rate,
+        'send_seconds': send_seconds,
+        'total_seconds': total_seconds,
+        'throughput': len(messages) / total_seconds if total_seconds else 0.0,
+        'buys': recorder.buys,
+        'detection_latency': latency_summary(recorder.latencies),
+        'loop_lag': latency_summary(lag),
+        'pipeline': pipeline_stats(),
+    }
+
+
+def check_limits(result, args):
+    failures = []
+    if args.max_p99_ms is not None and result['detection_latency']['p99_ms'] > args.max_p99_ms:
+        failures.append(f"detection p99 {result['detection_latency']['p99_ms']:.1f}ms > {args.max_p99_ms}ms")
+    if args.max_lag_ms is not None and result['loop_lag']['p99_ms'] > args.max_lag_ms:
+        failures.append(f"loop lag p99 {result['loop_lag']['p99_ms']:.1f}ms > {args.max_lag_ms}ms")
+    if args.min_throughput is not None and result['throughput'] < args.min_throughput:
+        failures.append(f"throughput {result['throughput']:.0f}/s < {args.min_throughput}/s")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=('monitor', 'sample'), default='monitor')
+    parser.add_argument('--corpus', help="recorded messages: JSON list of strings or one per line")
+    parser.add_argument('--rate', type=float, default=200.0, help="messages per second")
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds of synthetic traffic at --rate")
+    parser.add_argument('--shape', choices=('constant', 'burst', 'ramp'), default='constant')
+    parser.add_argument('--burst-factor', type=float, default=10.0)
+    parser.add_argument('--burst-every', type=float, default=5.0)
+    parser.add_argument('--burst-length', type=float, default=0.5)
+    parser.add_argument('--peak-rate', type=float, help="final rate of a ramp (default rate * burst factor)")
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--buy-latency', type=float, default=0.05, help="seconds per stubbed buy_token call")
+    parser.add_argument('--rugcheck-latency', type=float, default=0.1, help="seconds per stubbed Rugcheck lookup")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--max-p99-ms', type=float, help="fail if detection p99 exceeds this")
+    parser.add_argument('--max-lag-ms', type=float, help="fail if event-loop lag p99 exceeds this")
+    parser.add_argument('--min-throughput', type=float, help="fail if messages/s falls below this")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.corpus:
+        messages = load_corpus(args.corpus)
+    else:
+        messages = make_corpus(int(args.rate * args.duration), seed=args.seed)
+    from address_extractor import AddressExtractor
+    extractor = AddressExtractor(min_length=32, max_length=44)
+    addresses = {address for text in messages for address in extractor.extract(text)}
+
+    # The handlers print every message; keep that out of the timings' way
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        result = asyncio.run(replay(args, messages, addresses))
+
+    detection, lag = result['detection_latency'], result['loop_lag']
+    print(f"{result['target']}: {result['messages']} messages ({result['shape']}, {args.rate:.0f}/s offered) "
+          f"in {result['total_seconds']:.2f}s -> {result['throughput']:.0f} msg/s, {result['buys']} buys")
+    print(f"detection latency  p50 {detection['p50_ms']:8.1f}ms  p99 {detection['p99_ms']:8.1f}ms  "
+          f"max {detection['max_ms']:8.1f}ms  ({detection['count']} addresses)")
+    print(f"event-loop lag     p50 {lag['p50_ms']:8.1f}ms  p99 {lag['p99_ms']:8.1f}ms  max {lag['max_ms']:8.1f}ms")
+    for name, stage in result['pipeline'].items():
+        if isinstance(stage, dict) and 'dropped' in stage:
+            print(f"  stage {name:8s} processed {stage['processed']:6d}  dropped {stage['dropped']:5d}  "
+                  f"errors {stage['errors']:3d}  handle p99 {stage['handle']['p99'] * 1000:7.1f}ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    failures = check_limits(result, args)
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Run the shard supervisor against fake clients, including a crash and a flood wait.
+
+Run from the repository root:
+
+    python -m benchmarks.run_shards --duration 10
+"""
+import argparse
+import logging
+
+from benchmarks.fake_telegram import FakeShardClient
+from shard_supervisor import ShardSupervisor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--groups', type=int, default=12)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    detections = []
+    supervisor = ShardSupervisor(
+        ['fake_a', 'fake_b', 'fake_crash', 'fake_flood'],
+        [f"group{index}" for index in range(args.groups)],
+        lambda address, group: detections.append((address, group)),
+        client_factory=FakeShardClient,
+        heartbeat=0.5,
+        heartbeat_timeout=3.0,
+        restart_delay=2.0,
+    )
+    supervisor.start()
+    try:
+        supervisor.run(duration=args.duration)
+    finally:
+        supervisor.stop()
+
+    stats = supervisor.stats()
+    assert len(detections) == len({address for address, _ in detections}), "duplicate detections delivered"
+    for shard_id, shard in stats['shards'].items():
+        print(f"shard {shard_id}: {shard}")
+    print(f"unique detections: {stats['unique_detections']}  duplicates dropped: {stats['duplicates']}  "
+          f"rebalances: {stats['rebalances']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers the Twitter score and Rugcheck endpoints with canned JSON."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        if self.path.startswith('/score/'):
+            self.send_json(200, {'score': 5})
+        elif self.path.startswith('/check/'):
+            self.send_json(200, {'status': 'Good'})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeDexscreenerHandler(StubHandler):
+    """Serves ``server.feed`` as the boost feed, honouring If-None-Match."""
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        self.server.requests += 1
+        if not self.path.startswith('/token-boosts/latest/v1'):
+            return super().do_GET()
+        body = json.dumps(self.server.feed, sort_keys=True)
+        etag = '"' + hashlib.sha1(body.encode()).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_json(200, self.server.feed, headers={'ETag': etag})
+
+
+class FaultInjectingHandler(StubHandler):
+    """StubHandler behind configurable faults, read from ``server.faults`` per request.
+
+    ``outage`` answers every request with 503; ``throttle_rps`` answers 429
+    with ``retry_after`` once more than that many requests arrive in a
+    second; ``error_rate``, ``hang_rate`` (sleep ``hang_seconds`` first) and
+    ``drop_rate`` (close the connection without answering) apply at random.
+    """
+
+    def do_GET(self):
+        server = self.server
+        faults = server.faults
+        with server.fault_lock:
+            server.requests += 1
+            now = time.monotonic()
+            if now - server.window_start >= 1.0:
+                server.window_start, server.window_count = now, 0
+            server.window_count += 1
+            over_limit = faults.get('throttle_rps') and server.window_count > faults['throttle_rps']
+            roll = server.rng.random()
+        if faults.get('outage'):
+            return self.send_json(503, {'error': 'outage'})
+        if over_limit:
+            return self.send_json(429, {'error': 'slow down'},
+                                  headers={'Retry-After': str(faults.get('retry_after', 1))})
+        error_rate, hang_rate, drop_rate = (faults.get(name, 0.0) for name in ('error_rate', 'hang_rate', 'drop_rate'))
+        if roll < drop_rate:
+            self.close_connection = True
+            self.connection.shutdown(2)
+            return
+        if roll < drop_rate + hang_rate:
+            time.sleep(faults.get('hang_seconds', 5.0))
+        elif roll < drop_rate + hang_rate + error_rate:
+            return self.send_json(500, {'error': 'injected'})
+        try:
+            super().do_GET()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on a hung request
+            self.close_connection = True
+
+
+class StubServer:
+    """Run a handler class on a local port in a background thread."""
+
+    def __init__(self, handler=StubHandler, delay=0.0, feed=None):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.delay = delay
+        self.httpd.feed = feed if feed is not None else []
+        self.httpd.requests = 0
+        self.httpd.faults = {}
+        self.httpd.fault_lock = threading.Lock()
+        self.httpd.window_start = 0.0
+        self.httpd.window_count = 0
+        self.httpd.rng = random.Random(13)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
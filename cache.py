@@ -0,0 +1,174 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+
+class _Flight:
+    """A load in progress that concurrent callers for the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+
+
+class TTLCache:
+    """Thread-safe TTL + LRU cache with negative caching and request coalescing.
+
+    Values returned by ``loader`` live for ``ttl`` seconds. When the loader
+    raises, ``default`` is cached for ``negative_ttl`` seconds instead so a
+    failing upstream is not hammered. At most ``max_entries`` are kept; the
+    least recently used entry is evicted first. Concurrent misses for the same
+    key share a single loader call. If a reload fails within ``stale_ttl``
+    seconds of a good value expiring, that value is served again (for
+    ``negative_ttl``) instead of ``default``. With ``path`` set, entries are written
+    through to a SQLite file and reloaded on start so a restart is not cold.
+    """
+
+    def __init__(self, name, ttl, negative_ttl=60, max_entries=10_000, path=None, stale_ttl=3600):
+        self.name = name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, negative, value)
+        self._flights = {}
+        self._lock = threading.Lock()
+        # Disk writes take their own lock so cache hits never wait on SQLite
+        self._db_lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.load_errors = 0
+        self.stale_served = 0
+        if path:
+            self._open(path)
+
+    def get_or_load(self, key, loader, default=None):
+        now = time.time()
+        stale = _MISSING
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, negative, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    if negative:
+                        self.negative_hits += 1
+                    else:
+                        self.hits += 1
+                    return value
+                if not negative and now - expires_at < self.stale_ttl:
+                    stale = value
+                del self._entries[key]
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = self._flights[key] = _Flight()
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            return flight.value
+
+        ttl = None
+        try:
+            value, negative = loader(), False
+        except Exception as e:
+            print(f"{self.name} lookup failed for {key}: {e}")
+            if stale is _MISSING:
+                value, negative = default, True
+            else:
+                # Upstream is failing: keep the last good value a little longer
+                value, negative, ttl = stale, False, self.negative_ttl
+                with self._lock:
+                    self.load_errors += 1
+                    self.stale_served += 1
+        try:
+            self._store(key, value, negative, ttl)
+        finally:
+            flight.value = value
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return value
+
+    def _store(self, key, value, negative, ttl=None):
+        if ttl is None:
+            ttl = self.negative_ttl if negative else self.ttl
+        expires_at = time.time() + ttl
+        with self._lock:
+            if negative:
+                self.load_errors += 1
+            self._entries[key] = (expires_at, negative, value)
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self.evictions += 1
+        with self._db_lock:
+            if self._db is not None:
+                self._db.executemany(
+                    "DELETE FROM cache WHERE name = ? AND key = ?",
+                    [(self.name, old_key) for old_key in evicted],
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (name, key, expires_at, negative, value) VALUES (?, ?, ?, ?, ?)",
+                    (self.name, key, expires_at, negative, json.dumps(value)),
+                )
+                self._db.commit()
+
+    def _open(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "name TEXT, key TEXT, expires_at REAL, negative INTEGER, value TEXT, "
+            "PRIMARY KEY (name, key))"
+        )
+        now = time.time()
+        self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT key, expires_at, negative, value FROM cache WHERE name = ? "
+            "ORDER BY expires_at DESC LIMIT ?",
+            (self.name, self.max_entries),
+        ).fetchall()
+        for key, expires_at, negative, value in reversed(rows):
+            self._entries[key] = (expires_at, bool(negative), json.loads(value))
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache WHERE name = ? AND key = ?", (self.name, key))
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'load_errors': self.load_errors,
+                'stale_served': self.stale_served,
+            }
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
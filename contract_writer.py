@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import metrics
+
+FLUSH_SECONDS = metrics.histogram('contract_writer_flush_seconds', "Time per batched contract write")
+ROWS_WRITTEN = metrics.counter('contract_writer_rows', "Contract rows inserted")
+FLUSH_FAILURES = metrics.counter('contract_writer_flush_failures', "Batches that failed and were requeued")
+ROWS_DROPPED = metrics.counter('contract_writer_dropped_rows', "Contract rows that could not be written on their own")
+
+# Queued by stop(): the background task writes what it holds and exits
+_STOP = object()
+
+
+class ContractWriter:
+    """Write-behind queue for detected contracts.
+
+    ``add`` answers "first time we see this address?" from an in-memory index
+    primed from the database, and queues new rows without touching the DB.
+    A background task drains the queue in batches and writes each batch in a
+    single transaction on a dedicated thread, so the event loop never blocks
+    on SQLAlchemy. A failed batch is retried with backoff up to
+    ``max_retries`` times, then written one row at a time so a single bad row
+    is logged and dropped instead of blocking every later flush.
+    """
+
+    def __init__(self, app, db, model, batch_size=200, flush_interval=0.5, max_retries=5):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.known = set()
+        self.queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='contract-writer')
+        self._task = None
+        self.flushes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.dropped = 0
+        self._attempts = {}  # address -> failed writes so far
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    async def start(self):
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self.known.update(await loop.run_in_executor(self._executor, self._load_known))
+        logging.info(f"Contract index primed with {len(self.known)} addresses")
+        self._task = asyncio.create_task(self._run())
+
+    def _load_known(self):
+        with self.app.app_context():
+            return [address for (address,) in self.db.session.query(self.model.address)]
+
+    def add(self, address, group, timestamp=None):
+        """Queue ``address`` for insertion; returns False if it is already known."""
+        if address in self.known:
+            return False
+        self.known.add(address)
+        self.queue.put_nowait({
+            'address': address,
+            'group': group,
+            'status': "found",
+            'timestamp': timestamp or datetime.now(),
+        })
+        return True
+
+    def forget(self, address):
+        """Let the next ``add`` of ``address`` count as a first sighting again.
+
+        The queued row stays queued; writes are insert-if-absent, so queueing
+        it a second time is harmless.
+        """
+        self.known.discard(address)
+
+    async def _run(self):
+        stopping = False
+        while not stopping:
+            row = await self.queue.get()
+            stopping = row is _STOP
+            batch = [] if stopping else [row]
+            deadline = time.monotonic() + self.flush_interval
+            while not stopping and len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                stopping = row is _STOP
+                if not stopping:
+                    batch.append(row)
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            written = await loop.run_in_executor(self._executor, self._write_batch, batch)
+        except Exception as e:
+            self.failures += 1
+            FLUSH_FAILURES.inc()
+            logging.error(f"Failed to write {len(batch)} contracts: {e}", exc_info=True)
+            attempts = max(self._attempts.get(row['address'], 0) for row in batch) + 1
+            if attempts > self.max_retries:
+                written = await loop.run_in_executor(self._executor, self._write_rows, batch)
+            else:
+                # Put the rows back so a later flush retries them
+                for row in batch:
+                    self._attempts[row['address']] = attempts
+                    self.queue.put_nowait(row)
+                await asyncio.sleep(min(self.flush_interval * 2 ** (attempts - 1), 30.0))
+                return
+        for row in batch:
+            self._attempts.pop(row['address'], None)
+        elapsed = time.perf_counter() - start
+        FLUSH_SECONDS.observe(elapsed)
+        ROWS_WRITTEN.inc(written)
+        self.flushes += 1
+        self.rows_written += written
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+    def _write_rows(self, batch):
+        # Last resort for a batch that keeps failing: isolate and drop the bad rows
+        written = 0
+        for row in batch:
+            try:
+                written += self._write_batch([row])
+            except Exception as e:
+                self.dropped += 1
+                ROWS_DROPPED.inc()
+                logging.error(f"Dropping contract {row['address']} after {self.max_retries} retries: {e}")
+        return written
+
+    def _write_batch(self, batch):
+        # Insert-if-absent for the whole batch in one transaction
+        with self.app.app_context():
+            session = self.db.session
+            try:
+                addresses = [row['address'] for row in batch]
+                existing = {
+                    address for (address,) in
+                    session.query(self.model.address).filter(self.model.address.in_(addresses))
+                }
+                rows = [row for row in batch if row['address'] not in existing]
+                if rows:
+                    session.bulk_insert_mappings(self.model, rows)
+                session.commit()
+                return len(rows)
+            except Exception:
+                session.rollback()
+                raise
+
+    async def flush(self):
+        """Write everything queued so far; used on shutdown."""
+        batch = []
+        while not self.queue.empty():
+            row = self.queue.get_nowait()
+            if row is not _STOP:
+                batch.append(row)
+        for start in range(0, len(batch), self.batch_size):
+            await self._flush(batch[start:start + self.batch_size])
+
+    async def stop(self):
+        # A sentinel rather than cancel(): rows the task already took off the
+        # queue for its current batch are written before it exits
+        if self._task is not None:
+            self.queue.put_nowait(_STOP)
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'known': len(self.known),
+            'flushes': self.flushes,
+            'rows_written': self.rows_written,
+            'failures': self.failures,
+            'dropped': self.dropped,
+            'last_flush_seconds': self.last_flush_seconds,
+            'max_flush_seconds': self.max_flush_seconds,
+        }
@@ -0,0 +1,179 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from upstream import (RETRY_STATUSES, CircuitBreaker, CircuitOpenError, RateLimitedError, TokenBucket,
+                      backoff_delay, retry_after_seconds)
+
+# (connect, read) timeout applied to every upstream request
+DEFAULT_TIMEOUT = (3.05, 10)
+# Maximum number of in-flight requests (and pooled connections) per host
+PER_HOST_LIMIT = 8
+# Upper bound on worker threads used by enrich_tokens
+MAX_WORKERS = 32
+# Starting requests per second per host; well above normal use, it only bites after 429s
+DEFAULT_RATE = 500.0
+# Extra attempts for timeouts, connection errors, 429 and 5xx responses
+RETRIES = 2
+# Longer Retry-After or backoff waits are not slept through; the response is returned
+MAX_RETRY_WAIT = 10.0
+
+REQUEST_SECONDS = metrics.histogram('upstream_request_seconds', "Upstream request time per host")
+REQUESTS = metrics.counter('upstream_requests', "Upstream requests per host by outcome")
+
+
+class _Host:
+    def __init__(self, per_host_limit, rate, failure_threshold, reset_timeout):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=per_host_limit)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.limit = threading.BoundedSemaphore(per_host_limit)
+        self.bucket = TokenBucket(rate)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+
+class HostPool:
+    """Shared upstream client: per host keep-alive sessions, a request timeout,
+    a concurrency cap, an adaptive rate limit and a circuit breaker.
+
+    ``get`` retries timeouts, connection errors, 429 and 5xx with jittered
+    exponential backoff, honouring Retry-After. 429s also slow the host's
+    token bucket down. When retries are exhausted the last response is
+    returned (or the last error raised) and counted against the host's
+    breaker; once it opens, calls raise CircuitOpenError at once so callers
+    fall back to cached or unknown verdicts. ``rates`` overrides the request
+    rate for particular hosts.
+    """
+
+    def __init__(self, per_host_limit=PER_HOST_LIMIT, timeout=DEFAULT_TIMEOUT, rate=DEFAULT_RATE, rates=None,
+                 retries=RETRIES, max_retry_wait=MAX_RETRY_WAIT, failure_threshold=5, reset_timeout=30.0):
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.rate = rate
+        self.rates = rates or {}
+        self.retries = retries
+        self.max_retry_wait = max_retry_wait
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _for_host(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _Host(self.per_host_limit, self.rates.get(host, self.rate),
+                                                  self.failure_threshold, self.reset_timeout)
+            return state
+
+    def get(self, url, **kwargs):
+        host = urlsplit(url).netloc
+        state = self._for_host(host)
+        kwargs.setdefault('timeout', self.timeout)
+        if not state.breaker.allow():
+            REQUESTS.inc(host=host, outcome='circuit_open')
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        succeeded = False
+        try:
+            response, error = None, None
+            for attempt in range(self.retries + 1):
+                if not state.bucket.acquire(self.max_retry_wait):
+                    REQUESTS.inc(host=host, outcome='rate_limited')
+                    error = RateLimitedError(f"Rate limit for {host} exhausted")
+                    break
+                start = time.perf_counter()
+                try:
+                    with state.limit:
+                        response, error = state.session.get(url, **kwargs), None
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    response, error = None, e
+                REQUEST_SECONDS.observe(time.perf_counter() - start, host=host)
+
+                retry_after = None
+                if response is None:
+                    REQUESTS.inc(host=host, outcome=type(error).__name__)
+                elif response.status_code not in RETRY_STATUSES:
+                    REQUESTS.inc(host=host, outcome=str(response.status_code))
+                    state.bucket.succeeded()
+                    succeeded = True
+                    return response
+                else:
+                    REQUESTS.inc(host=host, outcome=str(response.status_code))
+                    retry_after = retry_after_seconds(response)
+                    if response.status_code == 429:
+                        state.bucket.throttle(retry_after)
+
+                if attempt == self.retries:
+                    break
+                delay = max(backoff_delay(attempt), retry_after or 0.0)
+                if delay > self.max_retry_wait:
+                    break
+                REQUESTS.inc(host=host, outcome='retry')
+                time.sleep(delay)
+
+            if error is not None:
+                raise error
+            return response
+        finally:
+            if succeeded:
+                state.breaker.record_success()
+            else:
+                state.breaker.record_failure()
+
+    def stats(self):
+        with self._lock:
+            hosts = list(self._hosts.items())
+        return {
+            host: {
+                'rate': state.bucket.rate,
+                'throttled': state.bucket.throttled,
+                'circuit_open': int(state.breaker.state == CircuitBreaker.OPEN),
+                'circuit_half_open': int(state.breaker.state == CircuitBreaker.HALF_OPEN),
+                'circuit_opens': state.breaker.opens,
+                'consecutive_failures': state.breaker.failures,
+            }
+            for host, state in hosts
+        }
+
+    def close(self):
+        with self._lock:
+            for state in self._hosts.values():
+                state.session.close()
+            self._hosts.clear()
+
+
+def enrich_tokens(tokens, lookups, max_workers=MAX_WORKERS):
+    """Run every lookup for every token concurrently.
+
+    ``lookups`` maps a result name to a callable taking the token. Returns one
+    dict per token, in input order. A lookup that raises yields ``None``.
+    """
+    tokens = list(tokens)
+    if not tokens or not lookups:
+        return [{} for _ in tokens]
+
+    def run(lookup, token):
+        try:
+            return lookup(token)
+        except Exception as e:
+            print(f"Enrichment lookup failed: {e}")
+            return None
+
+    results = [{} for _ in tokens]
+    workers = min(max_workers, len(tokens) * len(lookups))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (index, name, executor.submit(run, lookup, token))
+            for index, token in enumerate(tokens)
+            for name, lookup in lookups.items()
+        ]
+        for index, name, future in futures:
+            results[index][name] = future.result()
+    return results
@@ -0,0 +1,297 @@
+import json
+import logging
+import operator
+import os
+import threading
+import time
+
+from enrichment import enrich_tokens
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    '<=': operator.le,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '>': operator.gt,
+    '==': operator.eq,
+    '!=': operator.ne,
+    'in': lambda actual, expected: actual in expected,
+    'not_in': lambda actual, expected: actual not in expected,
+    'truthy': lambda actual, expected: bool(actual),
+    'falsy': lambda actual, expected: not actual,
+}
+
+
+class Rule:
+    """A named token predicate with rejection and timing counters.
+
+    ``predicate(token, facts)`` returns True to keep the token. ``facts`` holds
+    the results of remote lookups, or the evaluation context for local rules. A rule marked
+    ``remote`` only runs after enrichment, on tokens every local rule kept.
+    A token whose data makes the predicate raise is rejected and counted in
+    ``errors``; the first such error per rule is logged with its traceback.
+    Counters are shared by every thread evaluating the rule.
+    """
+
+    def __init__(self, name, predicate, remote=False, metric=None):
+        self.name = name
+        self.predicate = predicate
+        self.remote = remote
+        self.metric = metric
+        self._lock = threading.Lock()
+        self.evaluated = 0
+        self.rejected = 0
+        self.errors = 0
+        self.seconds = 0.0
+
+    def __call__(self, token, facts):
+        start = time.perf_counter()
+        error = None
+        try:
+            passed = bool(self.predicate(token, facts))
+        except (AttributeError, KeyError, TypeError, ValueError, ZeroDivisionError) as e:
+            passed, error = False, e
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.seconds += elapsed
+            self.evaluated += 1
+            if not passed:
+                self.rejected += 1
+            if error is not None:
+                self.errors += 1
+                first_error = self.errors == 1
+        if error is not None and first_error:
+            logger.warning(f"Rule {self.name} raised; counting it as a rejection", exc_info=error)
+        return passed
+
+    def reset(self):
+        with self._lock:
+            self.evaluated = 0
+            self.rejected = 0
+            self.errors = 0
+            self.seconds = 0.0
+
+
+class RuleEngine:
+    """Ordered short-circuit evaluation: local rules, then enrichment, then remote rules.
+
+    Local rules run in list order and stop at the first rejection, so the
+    cheapest and most selective checks belong first. Only tokens passing every
+    local rule are enriched through ``lookups`` (see ``enrich_tokens``).
+    """
+
+    def __init__(self, rules, lookups=None):
+        self.rules = list(rules)
+        self.local_rules = [rule for rule in self.rules if not rule.remote]
+        self.remote_rules = [rule for rule in self.rules if rule.remote]
+        self.lookups = lookups or {}
+        needed = {rule.metric for rule in self.remote_rules}
+        if None not in needed:
+            # Skip lookups no remote rule reads
+            self.lookups = {name: lookup for name, lookup in self.lookups.items() if name in needed}
+        self._lock = threading.Lock()
+        self.enriched = 0
+        self.enrichment_seconds = 0.0
+
+    def record_enrichment(self, count, seconds):
+        with self._lock:
+            self.enriched += count
+            self.enrichment_seconds += seconds
+
+    def evaluate(self, tokens, context=None):
+        """Return the tokens passing every rule.
+
+        ``context`` is handed to local rules as their ``facts`` (for example
+        the blacklist); remote rules get the token's lookup results.
+        """
+        context = context or {}
+        survivors = [token for token in tokens if self.passes_local(token, context)]
+        if not self.remote_rules:
+            return survivors
+
+        start = time.perf_counter()
+        facts = enrich_tokens(survivors, self.lookups)
+        self.record_enrichment(len(survivors), time.perf_counter() - start)
+
+        return [
+            token for token, token_facts in zip(survivors, facts)
+            if self.passes_remote(token, token_facts)
+        ]
+
+    def passes_local(self, token, context):
+        return self._passes(self.local_rules, token, context)
+
+    def passes_remote(self, token, facts):
+        return self._passes(self.remote_rules, token, facts)
+
+    @staticmethod
+    def _passes(rules, token, facts):
+        for rule in rules:
+            if not rule(token, facts):
+                return False
+        return True
+
+    def report(self):
+        rows = []
+        for rule in self.rules:
+            rows.append({
+                'rule': rule.name,
+                'remote': rule.remote,
+                'evaluated': rule.evaluated,
+                'rejected': rule.rejected,
+                'errors': rule.errors,
+                'rejection_rate': rule.rejected / rule.evaluated if rule.evaluated else 0.0,
+                'seconds': rule.seconds,
+            })
+        rows.append({
+            'rule': 'enrichment',
+            'remote': True,
+            'evaluated': self.enriched,
+            'rejected': 0,
+            'errors': 0,
+            'rejection_rate': 0.0,
+            'seconds': self.enrichment_seconds,
+        })
+        return rows
+
+    def format_report(self):
+        lines = [f"{'rule':<24}{'evaluated':>10}{'rejected':>10}{'rate':>8}{'ms':>10}"]
+        for row in self.report():
+            lines.append(
+                f"{row['rule']:<24}{row['evaluated']:>10}{row['rejected']:>10}"
+                f"{row['rejection_rate']:>8.1%}{row['seconds'] * 1000:>10.2f}"
+            )
+        return "\n".join(lines)
+
+    def reset(self):
+        for rule in self.rules:
+            rule.reset()
+        with self._lock:
+            self.enriched = 0
+            self.enrichment_seconds = 0.0
+
+
+def compile_rule(spec, metrics):
+    """Compile one rule spec into a Rule made of plain closures.
+
+    A spec looks like ``{"name": "market_cap", "metric": "market_cap",
+    "op": "<=", "value": 200000}``. ``metrics`` maps metric names to
+    ``(getter(token, facts), remote)``; unknown metrics read the token field
+    of the same name.
+    """
+    metric = spec['metric']
+    op = spec.get('op', '==')
+    if op not in OPERATORS:
+        raise ValueError(f"Unknown operator {op!r} in rule {spec}")
+    compare = OPERATORS[op]
+    expected = spec.get('value')
+    if op in ('in', 'not_in'):
+        expected = frozenset(expected)
+    if metric in metrics:
+        getter, remote = metrics[metric]
+    else:
+        default = spec.get('default')
+        getter, remote = (lambda token, facts: token.get(metric, default)), False
+
+    def predicate(token, facts):
+        return compare(getter(token, facts), expected)
+
+    return Rule(spec.get('name', metric), predicate, remote=remote, metric=metric)
+
+
+def compile_strategies(config, metrics, lookups):
+    """Build one RuleEngine per named strategy in a parsed rules config."""
+    strategies = {}
+    for name, specs in config['strategies'].items():
+        strategies[name] = RuleEngine([compile_rule(spec, metrics) for spec in specs], lookups)
+    return strategies
+
+
+def evaluate_strategies(strategies, tokens, context=None):
+    """Run several strategies over one batch, enriching each token at most once.
+
+    Returns a dict of strategy name to the tokens that strategy kept.
+    """
+    context = context or {}
+    passed_local = {name: [] for name in strategies}
+    to_enrich = []
+    for index, token in enumerate(tokens):
+        needs_lookup = False
+        for name, engine in strategies.items():
+            if engine.passes_local(token, context):
+                passed_local[name].append(index)
+                needs_lookup = needs_lookup or bool(engine.remote_rules)
+        if needs_lookup:
+            to_enrich.append(index)
+
+    lookups = {}
+    for engine in strategies.values():
+        if engine.remote_rules:
+            lookups.update(engine.lookups)
+    facts = {}
+    if to_enrich:
+        start = time.perf_counter()
+        results = enrich_tokens([tokens[index] for index in to_enrich], lookups)
+        elapsed = time.perf_counter() - start
+        facts = dict(zip(to_enrich, results))
+        for engine in strategies.values():
+            if engine.remote_rules:
+                engine.record_enrichment(len(to_enrich), elapsed)
+
+    return {
+        name: [
+            tokens[index] for index in passed_local[name]
+            if engine.passes_remote(tokens[index], facts.get(index, {}))
+        ]
+        for name, engine in strategies.items()
+    }
+
+
+def load_rules_file(path):
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            import yaml  # Optional, only needed for YAML rule files
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class RuleSetLoader:
+    """Compiled strategies from a rules file, recompiled when the file changes.
+
+    ``strategies()`` stats the file at most every ``check_interval`` seconds.
+    A reload swaps in a new dict of engines, so evaluations already holding the
+    previous one finish on it undisturbed. A broken file keeps the last good set.
+    """
+
+    def __init__(self, path, metrics, lookups, check_interval=2.0):
+        self.path = path
+        self.metrics = metrics
+        self.lookups = lookups
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._strategies = {}
+        self.reload()
+
+    def reload(self):
+        self._mtime = os.stat(self.path).st_mtime_ns
+        strategies = compile_strategies(load_rules_file(self.path), self.metrics, self.lookups)
+        with self._lock:
+            self._strategies = strategies
+
+    def strategies(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            try:
+                if os.stat(self.path).st_mtime_ns != self._mtime:
+                    self.reload()
+                    print(f"Reloaded filter rules from {self.path}")
+            except Exception as e:
+                print(f"Keeping previous filter rules, failed to reload {self.path}: {e}")
+        return self._strategies
+
+    def engine(self, name='default'):
+        return self.strategies()[name]
@@ -0,0 +1,68 @@
+from collections import defaultdict
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
+
+from apebot_v2 import detect_fraudulent_activity
+
+# detect_fraudulent_activity ignores tokens with fewer samples than this
+MIN_HISTORY = 10
+# Tokens whose value lies this close (relatively) to a threshold are re-checked
+# with the scalar function, so float summation order can never flip a verdict
+TIE_TOLERANCE = 1e-9
+
+
+def detect_fraudulent_activity_batch(tokens):
+    """Vectorised detect_fraudulent_activity over a whole poll.
+
+    Histories are grouped by length so each group packs into a dense
+    (tokens x samples) array without padding. Returns a boolean mask aligned
+    with ``tokens`` that matches the scalar function token for token.
+    """
+    mask = np.zeros(len(tokens), dtype=bool)
+    by_length = defaultdict(list)
+    for index, token in enumerate(tokens):
+        length = len(token.get('historical_data', []))
+        if length >= MIN_HISTORY:
+            by_length[length].append(index)
+
+    for length, indices in by_length.items():
+        group = [tokens[index] for index in indices]
+        count = len(group) * length
+        entries = list(chain.from_iterable(token['historical_data'] for token in group))
+        volumes = np.fromiter(map(itemgetter('volume'), entries), np.float64, count).reshape(len(group), length)
+        market_caps = np.fromiter(map(itemgetter('market_cap'), entries), np.float64, count).reshape(len(group), length)
+        current_volume = np.fromiter((token.get('trading_volume_24h', 0) for token in group), np.float64, len(group))
+        current_market_cap = np.fromiter((token.get('market_cap', 0) for token in group), np.float64, len(group))
+
+        flagged, ties = three_sigma_flags(volumes, market_caps, current_volume, current_market_cap)
+        for position in np.flatnonzero(ties):
+            flagged[position] = detect_fraudulent_activity(group[position])
+
+        mask[indices] = flagged
+    return mask
+
+
+def three_sigma_flags(volumes, market_caps, current_volume, current_market_cap):
+    """3-sigma checks over already packed (tokens x samples) arrays.
+
+    Returns ``(flagged, ties)``; ``ties`` marks rows within TIE_TOLERANCE of a
+    threshold whose verdict should be confirmed with the scalar function.
+    """
+    volume_threshold = _three_sigma(volumes)
+    market_cap_threshold = _three_sigma(market_caps)
+    flagged = (current_volume > volume_threshold) | (current_market_cap > market_cap_threshold)
+    ties = _near(current_volume, volume_threshold) | _near(current_market_cap, market_cap_threshold)
+    return flagged, ties
+
+
+def _three_sigma(values):
+    mean = values.mean(axis=1)
+    std = np.sqrt(((values - mean[:, None]) ** 2).mean(axis=1))
+    return mean + 3 * std
+
+
+def _near(actual, threshold):
+    scale = np.maximum(np.maximum(np.abs(actual), np.abs(threshold)), 1.0)
+    return np.abs(actual - threshold) <= TIE_TOLERANCE * scale
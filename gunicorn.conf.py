@@ -0,0 +1,16 @@
+# gunicorn reads this file from the working directory: gunicorn app:app
+#
+# /stream keeps a Server-Sent Events connection open for as long as a dashboard
+# tab is, which pins a whole process under the default sync workers. Threaded
+# workers serve each connection on a thread instead; app.MAX_STREAMS caps the
+# streams per process below the thread count so /fetch_tokens always has
+# threads left.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '32'))
+# gthread workers heartbeat from their main loop, so long-lived streams do not trip this
+timeout = 60
+keepalive = 5
@@ -0,0 +1,146 @@
+import json
+import os
+import queue
+import threading
+from collections import deque, namedtuple
+
+Event = namedtuple('Event', ['id', 'type', 'data'])
+
+# Sentinel put on a subscriber's queue when it fell too far behind
+_OVERFLOW = object()
+
+
+class Subscription:
+    """One connected client: replayed events followed by live ones."""
+
+    def __init__(self, hub, replay, maxsize):
+        self.hub = hub
+        self.replay = deque(replay)
+        self.queue = queue.Queue(maxsize)
+
+    def events(self, heartbeat=15.0):
+        """Yield events, or ``None`` every ``heartbeat`` seconds of silence.
+
+        Stops after a ``resync`` event when the client could not keep up; it
+        is expected to reconnect with Last-Event-ID.
+        """
+        while self.replay:
+            yield self.replay.popleft()
+        while True:
+            try:
+                event = self.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield None
+                continue
+            if event is _OVERFLOW:
+                yield self.hub.resync_event()
+                return
+            yield event
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    """Fan-out of small state-change events to Server-Sent Events clients.
+
+    The last ``history`` events are kept so a reconnecting client replays
+    from its Last-Event-ID. Each client has a bounded queue; a client that
+    lets it fill up is dropped with a ``resync`` event instead of slowing
+    the publisher or growing memory.
+
+    Clients see ids as ``<epoch>-<n>``, where the epoch is random per hub.
+    Every worker process has its own hub, and one restarts from 1, so an id
+    from another epoch gets a ``resync`` rather than a replay.
+    """
+
+    def __init__(self, history=1000, client_queue=256):
+        self.client_queue = client_queue
+        self.history = deque(maxlen=history)
+        self.epoch = os.urandom(4).hex()
+        self.last_id = 0
+        self.dropped = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self.last_id += 1
+            event = Event(self.last_id, event_type, data)
+            self.history.append(event)
+            for subscription in list(self._subscribers):
+                try:
+                    subscription.queue.put_nowait(event)
+                except queue.Full:
+                    self._drop(subscription)
+        return event
+
+    def _drop(self, subscription):
+        self._subscribers.discard(subscription)
+        self.dropped += 1
+        # Make room for the sentinel so the client's generator ends promptly
+        while True:
+            try:
+                subscription.queue.put_nowait(_OVERFLOW)
+                return
+            except queue.Full:
+                try:
+                    subscription.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def format_id(self, event_id):
+        return f"{self.epoch}-{event_id}"
+
+    @property
+    def last_event_id(self):
+        """The client-facing id of the last published event."""
+        return self.format_id(self.last_id)
+
+    def parse_id(self, last_event_id):
+        """The sequence number in a client's id, or None if it is from another hub."""
+        epoch, _, sequence = last_event_id.rpartition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def resync_event(self):
+        return Event(self.last_id, 'resync', {})
+
+    def subscribe(self, last_event_id=None):
+        """Subscribe, replaying everything after the client id ``last_event_id``."""
+        with self._lock:
+            replay = []
+            if last_event_id is not None:
+                seen = self.parse_id(last_event_id)
+                oldest = self.history[0].id if self.history else self.last_id + 1
+                if seen is None or seen > self.last_id or seen + 1 < oldest:
+                    # Another worker's or a restarted hub's id, or the gap is
+                    # no longer in history; the client must reload
+                    replay = [self.resync_event()]
+                else:
+                    replay = [event for event in self.history if event.id > seen]
+            subscription = Subscription(self, replay, self.client_queue)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def stats(self):
+        with self._lock:
+            return {'clients': len(self._subscribers), 'last_id': self.last_id, 'dropped': self.dropped}
+
+
+def sse_stream(subscription, heartbeat=15.0):
+    """Format a subscription as a text/event-stream body."""
+    try:
+        yield "retry: 3000\n\n"
+        for event in subscription.events(heartbeat):
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"id: {subscription.hub.format_id(event.id)}\nevent: {event.type}\ndata: {json.dumps(event.data, separators=(',', ':'))}\n\n"
+    finally:
+        subscription.close()
@@ -0,0 +1,378 @@
+import bisect
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+from functools import wraps
+
+# Upper bounds (seconds) of the latency histogram buckets, shared with pipeline
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help=''):
+        self.name = name
+        self.help = help
+        self._values = collections.defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name + '_total', key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, Prometheus style."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help='', buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2) + [0.0]
+            series[index] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def time(self, **labels):
+        """Context manager and decorator observing elapsed seconds."""
+        return _Timer(self, labels)
+
+    def count(self, **labels):
+        series = self._series.get(_label_key(labels))
+        return series[-2] if series else 0
+
+    def samples(self):
+        rows = []
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), series):
+                    cumulative += count
+                    rows.append((self.name + '_bucket', key, cumulative, (('le', _format_value(bound)),)))
+                rows.append((self.name + '_count', key, series[-2]))
+                rows.append((self.name + '_sum', key, series[-1]))
+        return rows
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+    def __call__(self, fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self:
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def flatten_stats(stats, prefix=''):
+    """``{'a': {'b': 1}}`` -> ``[('a_b', 1)]``; non-numeric values are skipped."""
+    rows = []
+    for key, value in stats.items():
+        name = f"{prefix}_{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            rows.extend(flatten_stats(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            rows.append((name, value))
+        elif isinstance(value, bool):
+            rows.append((name, int(value)))
+    return rows
+
+
+class Registry:
+    """Named metrics plus ``stats()`` callables, rendered in the Prometheus text format.
+
+    Metrics are created on first use and shared afterwards. Components that
+    already keep their own counters (caches, the contract writer, pipelines)
+    are registered with ``register_stats``; their numeric values are read
+    when /metrics is scraped and exported as gauges named
+    ``<prefix>_<key>``. With ``label`` set, nested dicts at the top level
+    become that label instead of part of the name.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name, help=''):
+        return self._get(Counter, name, help)
+
+    def gauge(self, name, help=''):
+        return self._get(Gauge, name, help)
+
+    def histogram(self, name, help='', buckets=LATENCY_BUCKETS):
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def register_stats(self, prefix, stats, label=None):
+        """Export ``stats()`` on every scrape; re-registering a prefix replaces it."""
+        with self._lock:
+            self._collectors[prefix] = (stats, label)
+
+    def unregister_stats(self, prefix):
+        with self._lock:
+            self._collectors.pop(prefix, None)
+
+    def _collect(self, prefix, stats, label):
+        try:
+            values = stats()
+        except Exception as e:
+            logging.error(f"Metrics collector {prefix} failed: {e}")
+            return {}
+        series = collections.defaultdict(list)
+        for key, value in values.items():
+            if label and isinstance(value, dict):
+                for name, number in flatten_stats(value):
+                    series[f"{prefix}_{name}"].append((((label, key),), number))
+            else:
+                for name, number in flatten_stats({key: value}):
+                    series[f"{prefix}_{name}"].append(((), number))
+        return series
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        lines = []
+        for metric in sorted(metrics, key=lambda metric: metric.name):
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample in metric.samples():
+                name, key, value = sample[:3]
+                extra = sample[3] if len(sample) > 3 else ()
+                lines.append(f"{name}{_format_labels(key, extra)} {_format_value(value)}")
+        for prefix, (stats, label) in sorted(collectors, key=lambda item: item[0]):
+            for name, rows in sorted(self._collect(prefix, stats, label).items()):
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in rows:
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+register_stats = REGISTRY.register_stats
+render = REGISTRY.render
+
+
+class _RateLimit:
+    __slots__ = ('window_start', 'emitted', 'suppressed')
+
+    def __init__(self):
+        self.window_start = 0.0
+        self.emitted = 0
+        self.suppressed = 0
+
+
+_log_limits = collections.defaultdict(_RateLimit)
+_log_limits_lock = threading.Lock()
+
+
+def log_event(logger, level, event, per_second=5, **fields):
+    """Structured ``event key=value ...`` log line, at most ``per_second`` per event.
+
+    Returns immediately when ``level`` is disabled for ``logger``, so hot
+    paths pay almost nothing by default. Lines over the limit are counted and
+    the count is reported on the next line that gets through.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    now = time.monotonic()
+    with _log_limits_lock:
+        limit = _log_limits[event]
+        if now - limit.window_start >= 1.0:
+            limit.window_start = now
+            limit.emitted = 0
+        if limit.emitted >= per_second:
+            limit.suppressed += 1
+            return
+        limit.emitted += 1
+        suppressed, limit.suppressed = limit.suppressed, 0
+    if suppressed:
+        fields['suppressed'] = suppressed
+    parts = [event]
+    for key, value in fields.items():
+        text = str(value)
+        if not text or ' ' in text or '"' in text or '=' in text:
+            text = '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+        parts.append(f"{key}={text}")
+    logger.log(level, ' '.join(parts))
+
+
+class SamplingProfiler:
+    """Samples every thread's stack every ``interval`` seconds.
+
+    Stacks are aggregated in the folded format flame graph tools read
+    (``frame;frame;frame count``). Cheap enough to leave on for a while in
+    production; started by ``start_profiler_from_env`` when
+    APEBOT_PROFILE_INTERVAL is set.
+    """
+
+    def __init__(self, interval=0.01, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            sampled = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                sampled.append(';'.join(reversed(stack)))
+            with self._lock:
+                self.stacks.update(sampled)
+                self.samples += 1
+
+    def folded(self):
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return '\n'.join(f"{stack} {count}" for stack, count in stacks) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+
+
+profiler = None
+
+
+def start_profiler_from_env():
+    """Start the shared profiler if APEBOT_PROFILE_INTERVAL (seconds) is set."""
+    global profiler
+    interval = os.getenv("APEBOT_PROFILE_INTERVAL")
+    if interval and profiler is None:
+        profiler = SamplingProfiler(float(interval)).start()
+    return profiler
+
+
+def start_http_server(port, host='0.0.0.0'):
+    """Serve /metrics from a background thread, for processes without Flask."""
+    # http.server pulls in http.client and ssl; only processes serving metrics pay for it
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
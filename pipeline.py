@@ -0,0 +1,184 @@
+import asyncio
+import bisect
+import logging
+import time
+
+from metrics import LATENCY_BUCKETS
+
+DROP_POLICIES = ('block', 'drop_newest', 'drop_oldest')
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with approximate percentiles."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of samples."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+
+class _Envelope:
+    __slots__ = ('item', 'created_at', 'enqueued_at')
+
+    def __init__(self, item, created_at):
+        self.item = item
+        self.created_at = created_at
+        self.enqueued_at = created_at
+
+
+class Stage:
+    """One pipeline step: ``workers`` tasks draining a bounded queue.
+
+    ``handler(item)`` is awaited for each item and returns the item(s) for
+    the next stage: a single item, a list of items, or None to stop here.
+    ``drop_policy`` decides what a full queue does to producers: ``block``
+    applies backpressure, ``drop_newest`` discards the incoming item and
+    ``drop_oldest`` discards the head of the queue to make room.
+    """
+
+    def __init__(self, name, handler, workers=1, queue_size=100, drop_policy='block'):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy {drop_policy!r}")
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.queue = None
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.wait_latency = LatencyHistogram()
+        self.handle_latency = LatencyHistogram()
+
+    async def put(self, envelope):
+        envelope.enqueued_at = time.monotonic()
+        if self.drop_policy == 'block':
+            await self.queue.put(envelope)
+            return True
+        if self.drop_policy == 'drop_oldest' and self.queue.full():
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+        try:
+            self.queue.put_nowait(envelope)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'wait': self.wait_latency.summary(),
+            'handle': self.handle_latency.summary(),
+        }
+
+
+class Pipeline:
+    """Stages joined by bounded asyncio queues, with end-to-end latency.
+
+    ``submit`` feeds the first stage. Items that leave the last stage are
+    counted in ``completed`` and their time since submission is recorded.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.end_to_end = LatencyHistogram()
+        self.completed = 0
+        self._tasks = []
+
+    async def start(self):
+        if self._tasks:
+            return
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(stage.queue_size)
+        for index, stage in enumerate(self.stages):
+            following = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for worker in range(stage.workers):
+                self._tasks.append(asyncio.create_task(
+                    self._work(stage, following), name=f"pipeline-{stage.name}-{worker}"
+                ))
+
+    async def submit(self, item):
+        """Hand an item to the first stage; False if its drop policy refused it."""
+        return await self.stages[0].put(_Envelope(item, time.monotonic()))
+
+    async def _work(self, stage, following):
+        while True:
+            envelope = await stage.queue.get()
+            try:
+                started = time.monotonic()
+                stage.wait_latency.observe(started - envelope.enqueued_at)
+                try:
+                    result = await stage.handler(envelope.item)
+                except Exception as e:
+                    stage.errors += 1
+                    logging.error(f"Pipeline stage {stage.name} failed: {e}", exc_info=True)
+                    result = None
+                stage.handle_latency.observe(time.monotonic() - started)
+                stage.processed += 1
+
+                if result is None:
+                    continue
+                results = result if isinstance(result, list) else [result]
+                for item in results:
+                    if following is None:
+                        self.completed += 1
+                        self.end_to_end.observe(time.monotonic() - envelope.created_at)
+                    else:
+                        await following.put(_Envelope(item, envelope.created_at))
+            finally:
+                # Only after forwarding, so join() never sees an item in between stages
+                stage.queue.task_done()
+
+    async def join(self):
+        """Wait until every queued item has gone through every stage."""
+        for stage in self.stages:
+            await stage.queue.join()
+
+    async def stop(self, drain=True):
+        if drain and self._tasks:
+            await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self):
+        stats = {stage.name: stage.stats() for stage in self.stages}
+        stats['end_to_end'] = self.end_to_end.summary()
+        stats['completed'] = self.completed
+        return stats
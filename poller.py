@@ -0,0 +1,302 @@
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import namedtuple
+
+import requests
+
+import apebot_v2
+from live_events import EventHub
+
+
+class BoostFeedPoller:
+    """Background poller for the Dexscreener boost feed that only reports deltas.
+
+    Every ``interval`` seconds (+/- ``jitter`` as a fraction) the feed is
+    requested with If-None-Match / If-Modified-Since when the last response
+    carried an ETag or Last-Modified header. The body is diffed against the
+    previous snapshot keyed by ``tokenAddress`` and ``on_delta(new, changed,
+    removed)`` is called with the tokens that differ, so unchanged tokens never
+    reach filter_tokens again. With ``notify_unchanged`` it is also called
+    (with empty lists) after successful polls that found no change, for
+    callers that re-check time-dependent state every cycle. ``first_poll`` is
+    set once the first poll has finished, successful or not.
+    """
+
+    def __init__(self, on_delta, url=None, interval=30.0, jitter=0.2, http=None, notify_unchanged=False):
+        self.on_delta = on_delta
+        self.notify_unchanged = notify_unchanged
+        self.url = url or apebot_v2.BOOSTS_URL
+        self.interval = interval
+        self.jitter = jitter
+        self.http = http or apebot_v2.http
+        self.snapshot = {}
+        self.incoming = self.snapshot  # the feed on_delta is applying, else the snapshot
+        self.etag = None
+        self.last_modified = None
+        self.last_success = None
+        self.polls = 0
+        self.not_modified = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._background = threading.Lock()  # held while a refresh_async thread runs
+        self.first_poll = threading.Event()
+
+    def poll_once(self):
+        """Fetch the feed once; returns ``(new, changed, removed)`` token lists."""
+        with self._lock:
+            fetched = self._fetch()
+            if fetched is None:
+                return [], [], []
+            current, headers = fetched
+            delta = self._diff(current)
+            self._commit(current, headers)
+            return delta
+
+    def _fetch(self):
+        """The feed keyed by address and the response headers, or None if unchanged or failed."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
+        self.polls += 1
+        try:
+            # Same series as fetch_tokens: this is how the running app fetches the feed
+            with apebot_v2.FETCH_SECONDS.time():
+                response = self.http.get(self.url, headers=headers)
+        except requests.RequestException as e:
+            self.errors += 1
+            apebot_v2.FETCH_ERRORS.inc(reason='unavailable')
+            print(f"Boost feed poll failed: {e}")
+            return None
+
+        if response.status_code == 304:
+            self.not_modified += 1
+            self.last_success = time.time()
+            return None
+        if response.status_code != 200:
+            self.errors += 1
+            apebot_v2.FETCH_ERRORS.inc(reason='status')
+            print(f"Failed to fetch data: {response.status_code}")
+            return None
+        try:
+            tokens = response.json()
+        except ValueError:
+            self.errors += 1
+            apebot_v2.FETCH_ERRORS.inc(reason='json')
+            print("Failed to decode JSON response")
+            return None
+
+        current = {}
+        for token in tokens:
+            address = token.get('tokenAddress')
+            if address:
+                current[address] = token
+        return current, response.headers
+
+    def _diff(self, current):
+        new = [token for address, token in current.items() if address not in self.snapshot]
+        changed = [
+            token for address, token in current.items()
+            if address in self.snapshot and self.snapshot[address] != token
+        ]
+        removed = [token for address, token in self.snapshot.items() if address not in current]
+        return new, changed, removed
+
+    def _commit(self, current, headers):
+        self.snapshot = self.incoming = current
+        self.etag = headers.get('ETag')
+        self.last_modified = headers.get('Last-Modified')
+        self.last_success = time.time()
+
+    def refresh(self):
+        """Poll once and pass the delta to ``on_delta``.
+
+        The new snapshot and validators are only kept once ``on_delta`` has
+        returned, so a delta it fails on is delivered again by the next poll.
+        The whole sequence runs under one lock, so concurrent refreshes apply
+        their deltas in order.
+        """
+        try:
+            with self._lock:
+                last_success = self.last_success
+                fetched = self._fetch()
+                if fetched is None:
+                    if self.notify_unchanged and self.last_success != last_success:
+                        self.on_delta([], [], [])
+                    return
+                current, headers = fetched
+                new, changed, removed = self._diff(current)
+                if new or changed or removed or self.notify_unchanged:
+                    self.incoming = current
+                    try:
+                        self.on_delta(new, changed, removed)
+                    finally:
+                        self.incoming = self.snapshot
+                self._commit(current, headers)
+        finally:
+            self.first_poll.set()
+
+    def refresh_async(self):
+        """Start a one-off refresh in the background unless one is running."""
+        if self._lock.locked() or not self._background.acquire(blocking=False):
+            return
+        threading.Thread(target=self._background_refresh, name='boost-feed-refresh', daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self._safe_refresh()
+        finally:
+            self._background.release()
+
+    def _safe_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Boost feed poller error: {e}")
+
+    def run(self):
+        while not self._stop.is_set():
+            self._safe_refresh()
+            delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+            self._stop.wait(max(delay, 0))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name='boost-feed-poller', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            'polls': self.polls,
+            'not_modified': self.not_modified,
+            'errors': self.errors,
+            'tokens': len(self.snapshot),
+        }
+
+
+# A pre-serialised response body, its gzip form, the ETag clients revalidate with
+# and the id of the last event already reflected in it
+Payload = namedtuple('Payload', ['body', 'gzipped', 'etag', 'event_id'])
+
+
+def make_payload(tokens, event_id):
+    body = json.dumps(tokens, separators=(',', ':')).encode()
+    return Payload(body, gzip.compress(body, compresslevel=6), hashlib.sha1(body).hexdigest(), event_id)
+
+
+def card_fields(token):
+    # Only what a dashboard token card renders
+    return {key: token[key] for key in ('tokenAddress', 'chainId', 'icon', 'links') if key in token}
+
+
+class FeedSnapshot:
+    """Raw boost feed plus filter_tokens results, kept current by a poller.
+
+    Readers never wait on Dexscreener once a first poll has finished: when the
+    snapshot is older than ``max_age`` the stale payload is served and a
+    background refresh is kicked off (stale-while-revalidate). Before that,
+    requests wait at most ``warmup_wait`` seconds for the first poll and then
+    get the empty snapshot with ``status`` 'warming'. Payloads are serialised
+    and gzipped once per change, not once per request, and carry the id of the
+    last event they include so a client can open ``events`` from exactly that
+    point. Every successful poll
+    re-checks the tokens that passed before, since rules such as token age
+    change with time; tokens that start or stop passing the filter are
+    published to ``events``.
+    """
+
+    def __init__(self, blacklist, interval=30.0, max_age=60.0, events=None, warmup_wait=2.0, **poller_kwargs):
+        self.blacklist = blacklist
+        self.max_age = max_age
+        self.warmup_wait = warmup_wait
+        self.events = events or EventHub()
+        self.poller = BoostFeedPoller(self.apply, interval=interval, notify_unchanged=True, **poller_kwargs)
+        self.filtered = {}
+        self.payloads = {
+            'raw': make_payload([], self.events.last_event_id),
+            'filtered': make_payload([], self.events.last_event_id),
+        }
+        self._lock = threading.Lock()
+        self._apply_lock = threading.Lock()
+        self._started = False
+
+    def apply(self, new, changed, removed):
+        with self._apply_lock:
+            updated = {token.get('tokenAddress') for token in changed + removed}
+            retained = [token for address, token in self.filtered.items() if address not in updated]
+            passing = apebot_v2.filter_tokens(new + changed, self.blacklist)
+            passing += apebot_v2.filter_tokens(retained, self.blacklist, observe=False)
+            filtered = {token.get('tokenAddress'): token for token in passing}
+            with self._lock:
+                for address, token in filtered.items():
+                    previous = self.filtered.get(address)
+                    if previous is None or card_fields(previous) != card_fields(token):
+                        self.events.publish('token', card_fields(token))
+                for address in self.filtered:
+                    if address not in filtered:
+                        self.events.publish('remove', {'tokenAddress': address})
+                self.filtered = filtered
+                event_id = self.events.last_event_id
+                self.payloads = {
+                    'raw': make_payload(list(self.poller.incoming.values()), event_id),
+                    'filtered': make_payload(list(self.filtered.values()), event_id),
+                }
+        return passing
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.poller.start()
+
+    @property
+    def status(self):
+        """'warming' until a poll has succeeded, then 'ready'."""
+        return 'warming' if self.poller.last_success is None else 'ready'
+
+    def payload(self, view='raw'):
+        self.start()
+        if self.poller.last_success is None:
+            # Cold start: wait briefly for the poller thread's first poll instead
+            # of polling from every request; a slow or failing upstream gets the
+            # empty snapshot and the caller can check status
+            if self.poller.first_poll.is_set():
+                self.poller.refresh_async()
+            else:
+                self.poller.first_poll.wait(self.warmup_wait)
+        elif time.time() - self.poller.last_success > self.max_age:
+            self.poller.refresh_async()
+        return self.payloads[view]
+
+
+if __name__ == '__main__':
+    blacklist = apebot_v2.load_blacklist()
+
+    def print_passing(new, changed, removed):
+        passing = apebot_v2.filter_tokens(new + changed, blacklist)
+        print(f"{len(new)} new, {len(changed)} changed, {len(removed)} removed, {len(passing)} passing")
+        for token in passing:
+            print(f"Passing token: {token.get('tokenAddress')}")
+
+    poller = BoostFeedPoller(print_passing).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        poller.stop()
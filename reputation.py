@@ -0,0 +1,226 @@
+import logging
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, and no preforked workers sharing the file either
+    fcntl = None
+
+# Address kinds the index tracks
+CREATOR = 'creator'
+FUNDER = 'funder'
+RUG_CONTRACT = 'rug_contract'
+
+_crc32 = zlib.crc32
+# Second CRC seed, so each key gets two independent 32-bit hashes
+_SEED = 0x9E3779B9
+# Spreads the 32-bit first hash over filters larger than 2**32 bits
+_SPREAD = 0x9E3779B97F4A7C15
+
+_BLOOM_MAGIC = b'APRB'
+_BLOOM_HEADER = struct.Struct('<4sQI')  # magic, bit count, hash count
+
+
+def bloom_size(capacity, error_rate):
+    """Bit and hash counts for ``capacity`` items at ``error_rate`` false positives."""
+    bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    """Bloom filter whose bits live in a memory-mapped file.
+
+    The mapping is shared, so every process opening the same file reads the
+    same pages and sees bits set by the others. Bits are only ever set, so a
+    lookup can give a false positive but never a false negative. Setting a
+    bit rewrites its whole byte, so writers hold an exclusive ``flock`` on
+    the file; otherwise two processes could each drop the other's bit.
+    """
+
+    def __init__(self, path, capacity=2_000_000, error_rate=0.001):
+        self.path = path
+        if not os.path.exists(path):
+            self._create(path, *bloom_size(capacity, error_rate))
+        self._file = open(path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        magic, self.bits, self.hashes = _BLOOM_HEADER.unpack_from(self._map, 0)
+        if magic != _BLOOM_MAGIC:
+            raise ValueError(f"{path} is not a bloom filter file")
+        self._offset = _BLOOM_HEADER.size
+        self._write_lock = threading.Lock()  # flock does not exclude threads sharing the file
+
+    @staticmethod
+    def _create(path, bits, hashes):
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(_BLOOM_HEADER.pack(_BLOOM_MAGIC, bits, hashes))
+            f.truncate(_BLOOM_HEADER.size + (bits + 7) // 8)
+        os.replace(temporary, path)
+
+    def _probes(self, data, low):
+        # Double hashing: the first probe needs one CRC, the rest a second one
+        step = ((_crc32(data, _SEED) << 32) | low) | 1
+        first, bits, offset = low * _SPREAD, self.bits, self._offset
+        for index in range(self.hashes):
+            position = (first + index * step) % bits
+            yield offset + (position >> 3), 1 << (position & 7)
+
+    def add(self, key):
+        self.update([key])
+
+    def update(self, keys):
+        """Set the bits of every key under one lock and flush them."""
+        mapped = self._map
+        with self._write_lock:
+            if fcntl is not None:
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            try:
+                for key in keys:
+                    data = key.encode()
+                    for byte, mask in self._probes(data, _crc32(data)):
+                        mapped[byte] |= mask
+                mapped.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def __contains__(self, key):
+        # Inlined first probe: most absent keys stop here after a single CRC
+        data = key.encode()
+        low = _crc32(data)
+        position = (low * _SPREAD) % self.bits
+        mapped = self._map
+        if not mapped[self._offset + (position >> 3)] & (1 << (position & 7)):
+            return False
+        for byte, mask in self._probes(data, low):
+            if not mapped[byte] & mask:
+                return False
+        return True
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class ReputationIndex:
+    """Known-bad creators, funding wallets and rug contracts.
+
+    Entries live in SQLite (``path``) and a Bloom filter file next to it
+    (``path + '.bloom'``) answers most "never seen" lookups without touching
+    the database. Both load instantly and are shared between processes
+    through the OS page cache instead of a Python set per worker. ``add``
+    can be called at any time; new entries are visible to other processes
+    at once. ``in`` checks any kind.
+    """
+
+    def __init__(self, path='reputation.db', capacity=2_000_000, error_rate=0.001):
+        self.path = path
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS reputation ("
+            "address TEXT PRIMARY KEY, kind TEXT NOT NULL, reason TEXT, source TEXT, added_at REAL) WITHOUT ROWID"
+        )
+        self._db.commit()
+        bloom_path = f"{path}.bloom"
+        rebuild = not os.path.exists(bloom_path)
+        self.bloom = BloomFilter(bloom_path, capacity, error_rate)
+        if rebuild:
+            self.bloom.update(address for (address,) in self._db.execute("SELECT address FROM reputation"))
+        self.bloom_negatives = 0
+        self.db_lookups = 0
+        self.false_positives = 0
+
+    def add(self, address, kind, reason='', source=''):
+        """Record ``address``; returns False if it was already known."""
+        return self.add_many([(address, kind, reason, source)]) == 1
+
+    def add_many(self, entries):
+        """Record ``(address, kind, reason, source)`` tuples; returns how many were new."""
+        now = time.time()
+        rows = [(address, kind, reason, source, now) for address, kind, reason, source in entries if address]
+        with self._lock:
+            # Bloom bits first: a crash before the commit leaves at worst a false
+            # positive, never an entry the bloom filter would wrongly rule out
+            self.bloom.update(row[0] for row in rows)
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO reputation (address, kind, reason, source, added_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._db.commit()
+            added = self._db.total_changes - before
+            count = self._db.execute("SELECT COUNT(*) FROM reputation").fetchone()[0] if added else 0
+        if count > self.capacity:
+            logging.warning(f"Reputation index holds {count} addresses, over its bloom capacity of "
+                            f"{self.capacity}; delete {self.bloom.path} to rebuild it larger")
+        return added
+
+    def lookup(self, address):
+        """``{'kind', 'reason', 'source', 'added_at'}`` for a known address, else None."""
+        if not address or address not in self.bloom:
+            self.bloom_negatives += 1
+            return None
+        row = self._select(address)
+        return dict(zip(('kind', 'reason', 'source', 'added_at'), row)) if row else None
+
+    def __contains__(self, address):
+        if not address or address not in self.bloom:
+            self.bloom_negatives += 1
+            return False
+        return self._select(address) is not None
+
+    def _select(self, address):
+        # The bloom filter said maybe: SQLite has the answer
+        with self._lock:
+            self.db_lookups += 1
+            row = self._db.execute(
+                "SELECT kind, reason, source, added_at FROM reputation WHERE address = ?", (address,)
+            ).fetchone()
+            if row is None:
+                self.false_positives += 1
+        return row
+
+    def remove(self, address):
+        # The bloom bits stay set; the database lookup answers for it from now on
+        with self._lock:
+            self._db.execute("DELETE FROM reputation WHERE address = ?", (address,))
+            self._db.commit()
+
+    def addresses(self, kind=None):
+        with self._lock:
+            if kind is None:
+                return [address for (address,) in self._db.execute("SELECT address FROM reputation")]
+            return [address for (address,) in
+                    self._db.execute("SELECT address FROM reputation WHERE kind = ?", (kind,))]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM reputation").fetchone()[0]
+
+    def stats(self):
+        return {
+            'addresses': len(self),
+            'bloom_negatives': self.bloom_negatives,
+            'db_lookups': self.db_lookups,
+            'false_positives': self.false_positives,
+        }
+
+    def close(self):
+        with self._lock:
+            self.bloom.flush()
+            self.bloom.close()
+            self._db.close()
@@ -0,0 +1,138 @@
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# filter_tokens only cares about tokens younger than this
+WINDOW_SECONDS = 2 * 60 * 60
+# Same minimum history detect_fraudulent_activity requires
+MIN_SAMPLES = 10
+
+
+class TokenStats:
+    """Windowed online mean/variance of volume and market cap for one token.
+
+    Samples live in fixed-size ring buffers; adding or expiring a sample
+    updates the running mean and sum of squared deviations (Welford) in O(1).
+    """
+
+    __slots__ = ('capacity', 'timestamps', 'volumes', 'market_caps', 'head', 'count',
+                 'volume_mean', 'volume_m2', 'market_cap_mean', 'market_cap_m2', 'anomalous')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.volumes = array('d', bytes(8 * capacity))
+        self.market_caps = array('d', bytes(8 * capacity))
+        self.head = 0  # index of the oldest sample
+        self.count = 0
+        self.volume_mean = 0.0
+        self.volume_m2 = 0.0
+        self.market_cap_mean = 0.0
+        self.market_cap_m2 = 0.0
+        self.anomalous = False
+
+    def add(self, timestamp, volume, market_cap):
+        if self.count == self.capacity:
+            self.pop_oldest()
+        slot = (self.head + self.count) % self.capacity
+        self.timestamps[slot] = timestamp
+        self.volumes[slot] = volume
+        self.market_caps[slot] = market_cap
+        self.count += 1
+        self.volume_mean, self.volume_m2 = _push(self.volume_mean, self.volume_m2, self.count, volume)
+        self.market_cap_mean, self.market_cap_m2 = _push(self.market_cap_mean, self.market_cap_m2, self.count, market_cap)
+
+    def pop_oldest(self):
+        slot = self.head
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+        self.volume_mean, self.volume_m2 = _pop(self.volume_mean, self.volume_m2, self.count, self.volumes[slot])
+        self.market_cap_mean, self.market_cap_m2 = _pop(self.market_cap_mean, self.market_cap_m2, self.count, self.market_caps[slot])
+
+    def expire(self, cutoff):
+        while self.count and self.timestamps[self.head] < cutoff:
+            self.pop_oldest()
+
+    def thresholds(self):
+        volume_std = (self.volume_m2 / self.count) ** 0.5
+        market_cap_std = (self.market_cap_m2 / self.count) ** 0.5
+        return self.volume_mean + 3 * volume_std, self.market_cap_mean + 3 * market_cap_std
+
+    def is_anomalous(self, volume, market_cap, min_samples=MIN_SAMPLES):
+        if self.count < min_samples:
+            return False
+        volume_threshold, market_cap_threshold = self.thresholds()
+        return volume > volume_threshold or market_cap > market_cap_threshold
+
+
+def _push(mean, m2, count, value):
+    delta = value - mean
+    mean += delta / count
+    return mean, m2 + delta * (value - mean)
+
+
+def _pop(mean, m2, count, value):
+    if count == 0:
+        return 0.0, 0.0
+    old_mean = mean
+    mean -= (value - old_mean) / count
+    return mean, max(m2 - (value - old_mean) * (value - mean), 0.0)
+
+
+class RollingStatsStore:
+    """Per-token rolling statistics, fed one observation per token per poll.
+
+    ``observe`` checks the new sample against the token's current window (the
+    same 3-sigma rule as detect_fraudulent_activity) and then adds it, all in
+    O(1). Samples older than ``window`` seconds expire, and tokens not observed
+    within the window are evicted, so memory stays bounded. Safe to call from
+    several threads; observations are serialised under one lock.
+    """
+
+    def __init__(self, window=WINDOW_SECONDS, max_samples=240, min_samples=MIN_SAMPLES):
+        self.window = window
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        self._tokens = OrderedDict()  # address -> TokenStats, least recently observed first
+        self._last_seen = {}
+        self._lock = threading.Lock()
+
+    def observe(self, address, volume, market_cap, timestamp=None):
+        now = time.time() if timestamp is None else timestamp
+        with self._lock:
+            stats = self._tokens.get(address)
+            if stats is None:
+                stats = self._tokens[address] = TokenStats(self.max_samples)
+            else:
+                self._tokens.move_to_end(address)
+            stats.expire(now - self.window)
+            stats.anomalous = stats.is_anomalous(volume, market_cap, self.min_samples)
+            stats.add(now, volume, market_cap)
+            self._last_seen[address] = now
+            self._evict(now)
+            return stats.anomalous
+
+    def is_anomalous(self, address):
+        """Verdict from the token's most recent observation."""
+        stats = self._tokens.get(address)
+        return stats.anomalous if stats is not None else False
+
+    def evict_expired(self, now=None):
+        with self._lock:
+            self._evict(time.time() if now is None else now)
+
+    def _evict(self, now):
+        cutoff = now - self.window
+        while self._tokens:
+            address = next(iter(self._tokens))
+            if self._last_seen[address] >= cutoff:
+                break
+            del self._tokens[address]
+            del self._last_seen[address]
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __contains__(self, address):
+        return address in self._tokens
@@ -0,0 +1,319 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import time
+from collections import OrderedDict
+
+from address_extractor import AddressExtractor
+from telegram_messages import message_text
+
+
+class ShardFloodWait(Exception):
+    """Raised by a shard client when Telegram asks it to back off."""
+
+    def __init__(self, seconds):
+        super().__init__(f"flood wait of {seconds}s")
+        self.seconds = seconds
+
+
+class TelethonShardClient:
+    """Adapter giving one Telethon session the small interface a shard needs.
+
+    Flood waits are not slept through inside Telethon (threshold 0): ``watch``
+    resolves its chats itself, so a FloodWaitError reaches the supervisor as
+    ShardFloodWait and the groups can be moved to another shard. Resolved
+    entities are cached across rebalances.
+    """
+
+    def __init__(self, session_name):
+        from telethon import TelegramClient
+        from config import settings
+        self.client = TelegramClient(session_name, settings.api_id, settings.api_hash)
+        self.client.flood_sleep_threshold = 0
+        self.entities = {}
+        self._handler = None
+
+    async def start(self):
+        await self.client.connect()
+        if not await self.client.is_user_authorized():
+            raise RuntimeError("Client not authorized. Regenerate the session file with generate_session.py.")
+
+    async def watch(self, groups, on_message):
+        from telethon import events
+        from telethon.errors import FloodWaitError
+
+        if self._handler is not None:
+            self.client.remove_event_handler(self._handler)
+            self._handler = None
+        if not groups:
+            return
+
+        async def handler(event):
+            group_name = getattr(event.chat, 'title', None) or f"Group {event.chat_id}"
+            text = await message_text(self.client, event.message, group_name)
+            if text:
+                await on_message(group_name, text)
+
+        try:
+            for group in groups:
+                if group not in self.entities:
+                    self.entities[group] = await self.client.get_entity(group)
+        except FloodWaitError as e:
+            raise ShardFloodWait(e.seconds)
+        chats = [self.entities[group] for group in groups]
+        self.client.add_event_handler(handler, events.NewMessage(chats=chats))
+        self._handler = handler
+
+    async def run(self):
+        await self.client.run_until_disconnected()
+
+    async def stop(self):
+        await self.client.disconnect()
+
+
+def shard_groups(groups, shard_ids):
+    """Spread groups round-robin over the given shards, deterministically."""
+    shard_ids = sorted(shard_ids)
+    assignment = {shard_id: [] for shard_id in shard_ids}
+    if not shard_ids:
+        return assignment
+    for index, group in enumerate(sorted(groups)):
+        assignment[shard_ids[index % len(shard_ids)]].append(group)
+    return assignment
+
+
+def run_shard(shard_id, session_name, groups, client_factory, events, control, heartbeat=5.0):
+    """Process entry point: monitor ``groups`` with one session and report back."""
+    asyncio.run(_shard_main(shard_id, session_name, groups, client_factory, events, control, heartbeat))
+
+
+async def _shard_main(shard_id, session_name, groups, client_factory, events, control, heartbeat):
+    extractor = AddressExtractor(min_length=44, max_length=44)
+
+    async def on_message(group_name, text):
+        for address in extractor.extract_new(text):
+            events.put(('detection', shard_id, address, group_name, time.time()))
+
+    client = client_factory(session_name)
+    try:
+        await client.start()
+        await client.watch(groups, on_message)
+    except ShardFloodWait as e:
+        events.put(('flood', shard_id, e.seconds))
+        return
+    except Exception as e:
+        events.put(('error', shard_id, str(e)))
+        return
+
+    async def control_loop():
+        while True:
+            events.put(('heartbeat', shard_id, time.time()))
+            deadline = time.monotonic() + heartbeat
+            while time.monotonic() < deadline:
+                try:
+                    command, payload = control.get_nowait()
+                except queue.Empty:
+                    await asyncio.sleep(0.2)
+                    continue
+                if command == 'stop':
+                    await client.stop()
+                    return
+                if command == 'assign':
+                    try:
+                        await client.watch(payload, on_message)
+                    except ShardFloodWait as e:
+                        events.put(('flood', shard_id, e.seconds))
+                    except Exception as e:
+                        # Keep heartbeating; the supervisor moves the groups to another shard
+                        logging.error(f"Shard {shard_id} could not watch {len(payload)} groups: {e}", exc_info=True)
+                        events.put(('error', shard_id, str(e)))
+
+    control_task = asyncio.create_task(control_loop())
+    try:
+        await client.run()
+    finally:
+        control_task.cancel()
+
+
+class _Shard:
+    def __init__(self, shard_id, session_name):
+        self.id = shard_id
+        self.session_name = session_name
+        self.process = None
+        self.control = None
+        self.groups = []
+        self.last_heartbeat = 0.0
+        self.unavailable_until = 0.0
+
+    def healthy(self, now, heartbeat_timeout):
+        return (self.process is not None and self.process.is_alive() and
+                now >= self.unavailable_until and now - self.last_heartbeat <= heartbeat_timeout)
+
+
+class ShardSupervisor:
+    """Runs one monitoring process per session file and merges their detections.
+
+    Groups are split across the healthy shards. When a shard dies, stops
+    sending heartbeats or reports a flood wait or an error, its groups are
+    moved to the others; it is restarted after ``restart_delay`` (or once the
+    flood wait is over) and the groups are spread out again. Detections arrive over a
+    multiprocessing queue and ``on_detection(address, group_name)`` is called
+    once per address, however many shards saw it.
+    """
+
+    def __init__(self, session_names, groups, on_detection, client_factory=TelethonShardClient,
+                 heartbeat=5.0, heartbeat_timeout=30.0, restart_delay=30.0, seen_capacity=100_000):
+        self.groups = list(groups)
+        self.on_detection = on_detection
+        self.client_factory = client_factory
+        self.heartbeat = heartbeat
+        self.heartbeat_timeout = heartbeat_timeout
+        self.restart_delay = restart_delay
+        self.seen_capacity = seen_capacity
+        self.seen = OrderedDict()
+        self.duplicates = 0
+        self.rebalances = 0
+        self._context = multiprocessing.get_context('spawn')
+        self.events = self._context.Queue()
+        self.shards = {index: _Shard(index, name) for index, name in enumerate(session_names)}
+        self._stopping = False
+
+    def _spawn(self, shard, groups):
+        shard.control = self._context.Queue()
+        shard.groups = list(groups)
+        shard.last_heartbeat = time.time()
+        shard.process = self._context.Process(
+            target=run_shard,
+            args=(shard.id, shard.session_name, shard.groups, self.client_factory,
+                  self.events, shard.control, self.heartbeat),
+            name=f"telegram-shard-{shard.id}",
+            daemon=True,
+        )
+        shard.process.start()
+        logging.info(f"Started shard {shard.id} ({shard.session_name}) with {len(groups)} groups")
+
+    def start(self):
+        assignment = shard_groups(self.groups, self.shards)
+        for shard_id, shard in self.shards.items():
+            self._spawn(shard, assignment[shard_id])
+
+    def target_assignment(self):
+        now = time.time()
+        healthy = [shard_id for shard_id, shard in self.shards.items() if shard.healthy(now, self.heartbeat_timeout)]
+        return shard_groups(self.groups, healthy)
+
+    def rebalance(self):
+        assignment = self.target_assignment()
+        if not assignment:
+            logging.error("No healthy Telegram shards left")
+            return
+        for shard_id, groups in assignment.items():
+            shard = self.shards[shard_id]
+            if sorted(shard.groups) != groups:
+                shard.groups = groups
+                shard.control.put(('assign', groups))
+        self.rebalances += 1
+
+    def check_health(self):
+        now = time.time()
+        changed = False
+        for shard in self.shards.values():
+            alive = shard.process is not None and shard.process.is_alive()
+            if shard.groups and not shard.healthy(now, self.heartbeat_timeout):
+                logging.warning(f"Shard {shard.id} unhealthy, moving its groups")
+                if alive and now - shard.last_heartbeat > self.heartbeat_timeout:
+                    shard.process.terminate()
+                elif alive:
+                    shard.control.put(('assign', []))
+                shard.groups = []
+                shard.unavailable_until = max(shard.unavailable_until, now + self.restart_delay)
+                changed = True
+            elif not alive and now >= shard.unavailable_until:
+                # Restart with no groups; the rebalance below hands some back
+                self._spawn(shard, [])
+                changed = True
+        # Also spread groups back out once a flooded or restarted shard is usable
+        if changed or any(sorted(self.shards[shard_id].groups) != groups
+                          for shard_id, groups in self.target_assignment().items()):
+            self.rebalance()
+
+    def handle(self, event):
+        kind, shard_id = event[0], event[1]
+        shard = self.shards[shard_id]
+        if kind == 'detection':
+            _, _, address, group_name, detected_at = event
+            if address in self.seen:
+                self.duplicates += 1
+                self.seen.move_to_end(address)
+                return
+            self.seen[address] = detected_at
+            if len(self.seen) > self.seen_capacity:
+                self.seen.popitem(last=False)
+            self.on_detection(address, group_name)
+        elif kind == 'heartbeat':
+            shard.last_heartbeat = event[2]
+        elif kind == 'flood':
+            logging.warning(f"Shard {shard_id} hit a flood wait of {event[2]}s")
+            self._sideline(shard, event[2])
+        elif kind == 'error':
+            logging.error(f"Shard {shard_id} failed: {event[2]}")
+            self._sideline(shard, self.restart_delay)
+
+    def _sideline(self, shard, seconds):
+        # Hand the shard's groups to the others until ``seconds`` have passed
+        shard.unavailable_until = max(shard.unavailable_until, time.time() + seconds)
+        if shard.groups and shard.process is not None and shard.process.is_alive():
+            shard.control.put(('assign', []))
+        shard.groups = []
+        self.rebalance()
+
+    def run(self, duration=None):
+        """Consume shard events until ``stop`` is called or ``duration`` passes."""
+        deadline = None if duration is None else time.monotonic() + duration
+        next_check = time.monotonic() + self.heartbeat
+        while not self._stopping and (deadline is None or time.monotonic() < deadline):
+            try:
+                self.handle(self.events.get(timeout=0.5))
+            except queue.Empty:
+                pass
+            if time.monotonic() >= next_check:
+                self.check_health()
+                next_check = time.monotonic() + self.heartbeat
+
+    def stop(self, timeout=5.0):
+        self._stopping = True
+        for shard in self.shards.values():
+            if shard.process is not None and shard.process.is_alive():
+                shard.control.put(('stop', None))
+        for shard in self.shards.values():
+            if shard.process is not None:
+                shard.process.join(timeout)
+                if shard.process.is_alive():
+                    shard.process.terminate()
+
+    def stats(self):
+        now = time.time()
+        return {
+            'shards': {
+                shard.id: {
+                    'alive': shard.process is not None and shard.process.is_alive(),
+                    'healthy': shard.healthy(now, self.heartbeat_timeout),
+                    'groups': len(shard.groups),
+                }
+                for shard in self.shards.values()
+            },
+            'unique_detections': len(self.seen),
+            'duplicates': self.duplicates,
+            'rebalances': self.rebalances,
+        }
+
+
+def session_files(directory='.', prefix='telegram_monitor_session'):
+    """Session names (without .session) found in ``directory``."""
+    names = sorted(
+        name[:-len('.session')] for name in os.listdir(directory)
+        if name.startswith(prefix) and name.endswith('.session')
+    )
+    return [os.path.join(directory, name) for name in names]
@@ -1,12 +1,102 @@
 document.getElementById('fetch-tokens-button').addEventListener('click', fetchTokens);
 
+// Token cards currently on the page, keyed by contract address
+const tokenCards = new Map();
+
+function renderTokenCard(token) {
+    const tokenCard = document.createElement('div');
+    tokenCard.classList.add('token-card');
+    tokenCard.dataset.address = token.tokenAddress;
+
+    // Masked Contract Address
+    const maskedAddress = `${token.tokenAddress.slice(0, 6)}...${token.tokenAddress.slice(-6)}`;
+    const addressElement = document.createElement('p');
+    addressElement.classList.add('contract-address');
+    addressElement.textContent = `Contract Address: ${maskedAddress}`;
+    tokenCard.appendChild(addressElement);
+
+    // Copy Button
+    const copyButton = document.createElement('button');
+    copyButton.textContent = 'Copy';
+    copyButton.classList.add('copy-button');
+    copyButton.onclick = () => {
+        navigator.clipboard.writeText(token.tokenAddress);
+        copyButton.textContent = 'Copied';
+        setTimeout(() => {
+            copyButton.textContent = 'Copy';
+        }, 2000); // Revert back to "Copy" after 2 seconds
+    };
+    tokenCard.appendChild(copyButton);
+
+    // Token Icon
+    if (token.icon) {
+        const iconElement = document.createElement('img');
+        iconElement.classList.add('token-icon');
+        iconElement.src = token.icon;
+        tokenCard.appendChild(iconElement);
+    }
+
+    // Display Chain ID
+    if (token.chainId) {
+        const chainIdElement = document.createElement('p');
+        chainIdElement.textContent = `Chain ID: ${token.chainId}`;
+        tokenCard.appendChild(chainIdElement);
+    }
+
+    // Hyperlinks
+    if (token.links && typeof token.links === 'object') {
+        for (const [type, url] of Object.entries(token.links)) {
+            const linkElement = document.createElement('a');
+            linkElement.href = url;
+            linkElement.textContent = type;
+            linkElement.classList.add('token-link');
+            linkElement.target = '_blank';
+            tokenCard.appendChild(linkElement);
+        }
+    }
+
+    return tokenCard;
+}
+
+function showEmptyState() {
+    const tokensContainer = document.getElementById('tokens-container');
+    if (tokenCards.size === 0) {
+        tokensContainer.textContent = 'No tokens found';
+    }
+}
+
+// Insert or replace a single card without touching the others
+function upsertToken(token) {
+    const tokensContainer = document.getElementById('tokens-container');
+    if (tokenCards.size === 0) {
+        tokensContainer.textContent = '';
+    }
+    const tokenCard = renderTokenCard(token);
+    const existing = tokenCards.get(token.tokenAddress);
+    if (existing) {
+        existing.replaceWith(tokenCard);
+    } else {
+        tokensContainer.prepend(tokenCard);
+    }
+    tokenCards.set(token.tokenAddress, tokenCard);
+}
+
+function removeToken(address) {
+    const existing = tokenCards.get(address);
+    if (existing) {
+        existing.remove();
+        tokenCards.delete(address);
+    }
+    showEmptyState();
+}
+
+// Resolves with the id of the last live event the snapshot already includes
 function fetchTokens() {
     const progressBar = document.getElementById('progress-bar');
     const tokensContainer = document.getElementById('tokens-container');
 
     // Reset UI
     progressBar.style.width = '0%';
-    tokensContainer.innerHTML = '';
 
     // Simulate the progress bar filling up
     let progress = 0;
@@ -16,72 +106,49 @@ function fetchTokens() {
         if (progress >= 100) clearInterval(interval);
     }, 100);
 
-    fetch('/fetch_tokens')
-        .then(response => response.json())
-        .then(tokens => {
+    return fetch('/fetch_tokens?filtered=1')
+        .then(response => response.json().then(tokens => [tokens, response.headers.get('X-Last-Event-ID')]))
+        .then(([tokens, lastEventId]) => {
             progressBar.style.width = '100%';
 
-            if (tokens.length > 0) {
-                tokens.forEach(token => {
-                    const tokenCard = document.createElement('div');
-                    tokenCard.classList.add('token-card');
-
-                    // Masked Contract Address
-                    const maskedAddress = `${token.tokenAddress.slice(0, 6)}...${token.tokenAddress.slice(-6)}`;
-                    const addressElement = document.createElement('p');
-                    addressElement.classList.add('contract-address');
-                    addressElement.textContent = `Contract Address: ${maskedAddress}`;
-                    tokenCard.appendChild(addressElement);
-
-                    // Copy Button
-                    const copyButton = document.createElement('button');
-                    copyButton.textContent = 'Copy';
-                    copyButton.classList.add('copy-button');
-                    copyButton.onclick = () => {
-                        navigator.clipboard.writeText(token.tokenAddress);
-                        copyButton.textContent = 'Copied';
-                        setTimeout(() => {
-                            copyButton.textContent = 'Copy';
-                        }, 2000); // Revert back to "Copy" after 2 seconds
-                    };
-                    tokenCard.appendChild(copyButton);
-
-                    // Token Icon
-                    if (token.icon) {
-                        const iconElement = document.createElement('img');
-                        iconElement.classList.add('token-icon');
-                        iconElement.src = token.icon;
-                        tokenCard.appendChild(iconElement);
-                    }
-
-                    // Display Chain ID
-                    if (token.chainId) {
-                        const chainIdElement = document.createElement('p');
-                        chainIdElement.textContent = `Chain ID: ${token.chainId}`;
-                        tokenCard.appendChild(chainIdElement);
-                    }
-
-                    // Hyperlinks
-                    if (token.links && typeof token.links === 'object') {
-                        for (const [type, url] of Object.entries(token.links)) {
-                            const linkElement = document.createElement('a');
-                            linkElement.href = url;
-                            linkElement.textContent = type;
-                            linkElement.classList.add('token-link');
-                            linkElement.target = '_blank';
-                            tokenCard.appendChild(linkElement);
-                        }
-                    }
-
-                    tokensContainer.appendChild(tokenCard);
-                });
-            } else {
-                tokensContainer.textContent = 'No tokens found';
-            }
+            tokensContainer.innerHTML = '';
+            tokenCards.clear();
+            tokens.forEach(token => {
+                const tokenCard = renderTokenCard(token);
+                tokensContainer.appendChild(tokenCard);
+                tokenCards.set(token.tokenAddress, tokenCard);
+            });
+            showEmptyState();
+            return lastEventId;
         })
         .catch(error => {
             clearInterval(interval);
             progressBar.style.width = '0%';
             console.error('Error fetching tokens:', error);
+            return null;
         });
 }
+
+// Live updates from the snapshot's event id on; the browser resumes from
+// Last-Event-ID on reconnect. A resync means the server could not replay from
+// that id (another worker served the snapshot, or it restarted): reload the
+// snapshot but keep the stream, which carries on live from the resync's id.
+let tokenSource = null;
+
+function subscribeToTokens(lastEventId) {
+    if (!window.EventSource) return;
+    if (tokenSource) tokenSource.close();
+    const url = lastEventId ? `/stream?lastEventId=${encodeURIComponent(lastEventId)}` : '/stream';
+    const source = tokenSource = new EventSource(url);
+    source.addEventListener('token', event => upsertToken(JSON.parse(event.data)));
+    source.addEventListener('remove', event => removeToken(JSON.parse(event.data).tokenAddress));
+    source.addEventListener('resync', () => fetchTokens());
+    source.addEventListener('error', () => {
+        // Closed for good (e.g. 503 when the server is at its stream limit): retry later
+        if (source.readyState === EventSource.CLOSED && tokenSource === source) {
+            setTimeout(() => fetchTokens().then(subscribeToTokens), 30000);
+        }
+    });
+}
+
+fetchTokens().then(subscribeToTokens);
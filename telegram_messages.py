@@ -0,0 +1,37 @@
+import logging
+
+from metrics import log_event
+
+logger = logging.getLogger(__name__)
+
+
+async def message_text(client, message, group_name):
+    """The text to scan for contract addresses in a Telegram message.
+
+    Falls back from the raw text to a link preview's URL, a media caption,
+    text-URL entities and finally the forwarded original, which is fetched
+    with ``client``. Returns an empty string when there is nothing to scan.
+    """
+    message_text = message.raw_text or message.text or message.message or ""
+    if not message_text and message.media:
+        if hasattr(message.media, 'webpage') and message.media.webpage:
+            message_text = message.media.webpage.url or ""
+            log_event(logger, logging.DEBUG, "webpage_url", group=group_name, url=message_text)
+        elif hasattr(message.media, 'document') and message.media.document:
+            message_text = message.message or ""
+            log_event(logger, logging.DEBUG, "media_caption", group=group_name)
+        elif str(message.media) == 'MessageMediaUnsupported()':
+            message_text = message.raw_text or ""
+            if message.entities:
+                for entity in message.entities:
+                    if entity.__class__.__name__ == 'MessageEntityTextUrl':
+                        message_text = message.get_entity(entity).url or message_text
+                        log_event(logger, logging.DEBUG, "entity_url", group=group_name, url=message_text)
+            if not message_text and message.fwd_from:
+                try:
+                    forwarded = await client.get_messages(message.chat_id, ids=message.fwd_from.message_id)
+                    message_text = forwarded.raw_text or forwarded.text or ""
+                except Exception as e:
+                    log_event(logger, logging.ERROR, "forwarded_fetch_failed", group=group_name, error=e)
+            log_event(logger, logging.DEBUG, "unsupported_media_fallback", group=group_name, media=message.media)
+    return message_text
@@ -1,14 +1,37 @@
-import re
 import logging
-from telethon import TelegramClient, events
 from datetime import datetime
-from config import settings
-from buy_program import buy_token
 import asyncio
+import functools
+import importlib
 import os
 import traceback
+from address_extractor import AddressExtractor
+from contract_writer import ContractWriter
+import metrics
+from metrics import log_event
+from pipeline import Pipeline, Stage
+from shard_supervisor import ShardSupervisor, session_files
+import telegram_messages
+
+logger = logging.getLogger(__name__)
+
+MESSAGES = metrics.counter('telegram_messages', "Messages handed to process_contract by outcome")
+PROCESS_SECONDS = metrics.histogram('telegram_process_contract_seconds', "process_contract time until the message is queued")
+DETECTIONS = metrics.counter('telegram_detections', "Contract addresses extracted from messages")
+BUYS = metrics.counter('telegram_buys', "buy_token calls by outcome")
+
+@functools.cache
+def lazy(name):
+    """Import ``name`` on first use and reuse it afterwards.
+
+    Telethon, buy_program (solders), main (SQLAlchemy) and apebot_v2
+    (requests) are slow to import and only needed once monitoring starts;
+    importing this module, e.g. in every spawned shard worker, stays cheap.
+    """
+    return importlib.import_module(name)
 
 def load_groups():
+    settings = lazy('config').settings
     try:
         with open(settings.groups_file, "r") as file:
             groups = [line.strip() for line in file.readlines() if line.strip()]
@@ -26,97 +49,228 @@ def load_groups():
         print(f"Error loading groups: {e}")
         return []
 
-group_links = load_groups()
+# Filled by init() at startup, not on import
+group_links = []
+
+def init():
+    """Load config and the monitored groups; returns the group list."""
+    global group_links
+    group_links = load_groups()
+    return group_links
 
 async def process_contract(client, message, group_name, is_new=True):
-    from main import socketio, db, app, Contract
-    
-    message_text = message.raw_text or message.text or message.message or ""
-    timestamp = message.date
-    if not message_text and message.media:
-        if hasattr(message.media, 'webpage') and message.media.webpage:
-            message_text = message.media.webpage.url or ""
-            print(f"Extracted webpage URL: {message_text}")
-        elif hasattr(message.media, 'document') and message.media.document:
-            message_text = message.message or ""
-            print(f"Media caption: {message_text}")
-        elif str(message.media) == 'MessageMediaUnsupported()':
-            message_text = message.raw_text or ""
-            if message.entities:
-                for entity in message.entities:
-                    if entity.__class__.__name__ == 'MessageEntityTextUrl':
-                        message_text = message.get_entity(entity).url or message_text
-                        print(f"Extracted URL from entity: {message_text}")
-            if not message_text and message.fwd_from:
-                try:
-                    forwarded = await client.get_messages(message.chat_id, ids=message.fwd_from.message_id)
-                    message_text = forwarded.raw_text or forwarded.text or ""
-                except Exception as e:
-                    logging.error(f"Failed to fetch forwarded message: {e}")
-            print(f"Fallback using raw_text, entities, or forwarded: '{message_text}', full media: {message.media}")
-            logging.info(f"Fallback raw_text: {message_text}, full media: {message.media}")
+    with PROCESS_SECONDS.time():
+        await _process_contract(client, message, group_name, is_new)
 
+async def _process_contract(client, message, group_name, is_new):
+    message_text = await telegram_messages.message_text(client, message, group_name)
     if not message_text:
-        print(f"Empty message from {group_name}")
+        MESSAGES.inc(outcome='empty')
+        log_event(logger, logging.DEBUG, "empty_message", group=group_name)
         return
 
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    matches = re.findall(PUMP_FUN_ADDRESS_PATTERN, message_text)
-    print(f"Regex matches for '{message_text}': {matches}")
+    pipeline = await get_detection_pipeline()
+    if await pipeline.submit({'text': message_text, 'group': group_name, 'is_new': is_new}):
+        MESSAGES.inc(outcome='queued')
+    else:
+        MESSAGES.inc(outcome='dropped')
+        log_event(logger, logging.WARNING, "detection_queue_full", group=group_name)
+
+async def extract_stage(item):
+    message_text, group_name = item['text'], item['group']
+    matches = pump_fun_addresses.extract(message_text)
     if not matches:
-        logging.info(f"No Pump.fun contract detected in {group_name}.")
-        print(f"No contracts found in {group_name} message: '{message_text}'")
-        return
+        log_event(logger, logging.DEBUG, "no_contract", group=group_name)
+        return None
+
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    detections = []
+    DETECTIONS.inc(len(matches))
+    for contract_address in matches:
+        log_event(logger, logging.INFO, "contract_detected", group=group_name, address=contract_address)
+        detections.append({'address': contract_address, 'group': group_name,
+                           'is_new': item['is_new'], 'time': current_time})
+    return detections
+
+async def dedupe_stage(item):
+    contract_address, group_name = item['address'], item['group']
+    writer = await get_contract_writer()
+    first_seen = writer.add(contract_address, group_name)
+    log_event(logger, logging.DEBUG, "contract_queued" if first_seen else "contract_known", address=contract_address)
+
+    lazy('main').socketio.emit("contract", {
+        "contract": contract_address,
+        "group": group_name,
+        "timestamp": item['time']
+    })
+
+    # Only new contracts on first detection go on to be bought
+    return item if item['is_new'] and first_seen else None
+
+async def filter_stage(item):
+    contract_address = item['address']
+    token = {'tokenAddress': contract_address, 'contract_address': contract_address}
+    loop = asyncio.get_running_loop()
+    passing = await loop.run_in_executor(
+        None, lazy('apebot_v2').filter_tokens, [token], _detection_blacklist, None, 'telegram'
+    )
+    if not passing:
+        if await loop.run_in_executor(None, verdict_unknown, token):
+            # Rugcheck was down or did not know the token yet: judge it again
+            # when it is next seen instead of rejecting it for good
+            (await get_contract_writer()).forget(contract_address)
+            log_event(logger, logging.INFO, "contract_undecided", address=contract_address)
+            return None
+        log_event(logger, logging.INFO, "contract_rejected", address=contract_address)
+        return None
+    return item
+
+def verdict_unknown(token):
+    # Only tokens past the blacklist reach Rugcheck; by now their verdict is cached
+    apebot_v2 = lazy('apebot_v2')
+    if apebot_v2.is_blacklisted(token, _detection_blacklist):
+        return False
+    return apebot_v2.check_rugcheck_status(token['contract_address']) == apebot_v2.UNKNOWN_VERDICT
+
+async def act_stage(item):
+    contract_address, group_name = item['address'], item['group']
+    log_event(logger, logging.INFO, "buy_started", group=group_name, address=contract_address)
+    try:
+        await lazy('buy_program').buy_token(contract_address, group_name)
+    except Exception:
+        BUYS.inc(outcome='failed')
+        raise
+    BUYS.inc(outcome='completed')
+    log_event(logger, logging.INFO, "buy_completed", address=contract_address)
+    return item
+
+# (workers, queue size, drop policy) per stage. Stale messages are shed first
+# under load; once a contract is extracted it is never dropped.
+PIPELINE_STAGES = {
+    'extract': (1, 1000, 'drop_oldest'),
+    'dedupe': (1, 1000, 'block'),
+    'filter': (8, 100, 'block'),
+    'act': (2, 20, 'block'),
+}
+
+_detection_pipeline = None
+_detection_blacklist = set()
+_detection_pipeline_lock = asyncio.Lock()
+
+async def get_detection_pipeline():
+    # extract -> dedupe -> filter -> act, started once per process
+    global _detection_pipeline, _detection_blacklist
+    async with _detection_pipeline_lock:
+        if _detection_pipeline is None:
+            _detection_blacklist = lazy('apebot_v2').load_blacklist()
+            handlers = {'extract': extract_stage, 'dedupe': dedupe_stage,
+                        'filter': filter_stage, 'act': act_stage}
+            pipeline = Pipeline([
+                Stage(name, handlers[name], workers, queue_size, drop_policy)
+                for name, (workers, queue_size, drop_policy) in PIPELINE_STAGES.items()
+            ])
+            await pipeline.start()
+            _detection_pipeline = pipeline
+            metrics.register_stats('telegram_pipeline', pipeline.stats, label='stage')
+    return _detection_pipeline
+
+_contract_writer = None
+_contract_writer_lock = asyncio.Lock()
+
+async def get_contract_writer():
+    # One write-behind queue per process, primed from the database on first use
+    global _contract_writer
+    async with _contract_writer_lock:
+        if _contract_writer is None:
+            main = lazy('main')
+            writer = ContractWriter(main.app, main.db, main.Contract)
+            await writer.start()
+            _contract_writer = writer
+            metrics.register_stats('contract_writer', writer.stats)
+    return _contract_writer
+
+class RecentMessageBackfill:
+    """Periodically re-reads recent messages from every group, concurrently.
 
-    for match in matches:
-        contract_address = match
-        log_message = f"Detected Pump.fun contract in {group_name}: {contract_address}"
-        logging.info(log_message)
-        print(f"Found contract: {contract_address} in {group_name} at {current_time}")
-
-        try:
-            with app.app_context():
-                existing = db.session.query(Contract).filter_by(address=contract_address).first()
-                if not existing:
-                    new_contract = Contract(
-                        address=contract_address,
-                        group=group_name,
-                        status="found",
-                        timestamp=datetime.now()
-                    )
-                    db.session.add(new_contract)
-                    db.session.commit()
-                    contract_id = new_contract.id
-                    print(f"Added contract {contract_address} to database with ID {contract_id}, status: found")
-                else:
-                    contract_id = existing.id
-                    print(f"Contract {contract_address} already in database with ID {contract_id}")
-
-                socketio.emit("contract", {
-                    "contract": contract_address,
-                    "group": group_name,
-                    "timestamp": current_time
-                })
-                print(f"Emitted contract event: {contract_address}")
-                logging.info(f"Emitted contract event: {contract_address}")
-
-                if is_new and not existing:  # Only buy new contracts on first detection
-                    print(f"Attempting to buy token: {contract_address}")
-                    await buy_token(contract_address, group_name)
-                    print(f"Buy transaction completed for {contract_address}")
-
-        except Exception as e:
-            with app.app_context():
-                db.session.rollback()
-            logging.error(f"Error processing contract {contract_address} in {group_name}: {e}", exc_info=True)
-            print(f"Failed to process {contract_address}: {e}")
-
-        await asyncio.sleep(1)
+    Entities are resolved once and cached. Each chat remembers the highest
+    message id already processed; the first cycle reads the newest ``limit``
+    messages, later ones page forward from that mark, ``limit`` messages at a
+    time and oldest first, until caught up or ``max_pages`` were read.
+    A FloodWaitError pauses every fetch until Telegram's wait has passed.
+    """
+
+    def __init__(self, client, groups, interval=60, concurrency=4, limit=5, max_pages=20):
+        self.client = client
+        self.groups = groups
+        self.interval = interval
+        self.limit = limit
+        self.max_pages = max_pages
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.entities = {}
+        self.high_water = {}
+        self.flood_until = 0.0
+
+    async def resolve(self, group):
+        entity = self.entities.get(group)
+        if entity is None:
+            entity = self.entities[group] = await self.client.get_entity(group)
+        return entity
+
+    async def wait_for_flood(self):
+        loop = asyncio.get_running_loop()
+        while loop.time() < self.flood_until:
+            await asyncio.sleep(self.flood_until - loop.time())
+
+    async def fetch_group(self, group):
+        for _ in range(self.max_pages):
+            async with self.semaphore:
+                await self.wait_for_flood()
+                try:
+                    entity = await self.resolve(group)
+                    min_id = self.high_water.get(entity.id)
+                    if min_id is None:
+                        # First cycle: the newest messages, not the whole history
+                        page = [message async for message in self.client.iter_messages(entity, limit=self.limit)]
+                        page.reverse()
+                    else:
+                        page = [
+                            message async for message in
+                            self.client.iter_messages(entity, limit=self.limit, min_id=min_id, reverse=True)
+                        ]
+                except lazy('telethon.errors').FloodWaitError as e:
+                    logging.warning(f"Flood wait of {e.seconds}s while fetching {group}")
+                    self.flood_until = max(self.flood_until, asyncio.get_running_loop().time() + e.seconds)
+                    return
+
+            group_name = getattr(entity, 'title', None) or f"Group {group}"
+            # Oldest first, so the high-water mark only moves past processed messages
+            for message in page:
+                await process_contract(self.client, message, group_name, is_new=False)
+                self.high_water[entity.id] = max(self.high_water.get(entity.id, 0), message.id)
+            if min_id is None or len(page) < self.limit:
+                return
+
+    async def run_once(self):
+        results = await asyncio.gather(*(self.fetch_group(group) for group in self.groups), return_exceptions=True)
+        for group, result in zip(self.groups, results):
+            if isinstance(result, Exception):
+                logging.error(f"Recent message fetch error for {group}: {result}", exc_info=result)
+                print(f"Recent message fetch error: {result}")
+
+    async def run(self):
+        while True:
+            print("Fetching recent messages...")
+            logging.info("Starting recent message fetch cycle")
+            await self.run_once()
+            await asyncio.sleep(self.interval)
 
 async def start_monitoring(session_name="telegram_monitor_session"):
-    from main import socketio, db, app, Contract
+    if not group_links:
+        init()
+    telethon = lazy('telethon')
+    settings = lazy('config').settings
 
-    client = TelegramClient(session_name, settings.api_id, settings.api_hash)
+    client = telethon.TelegramClient(session_name, settings.api_id, settings.api_hash)
     if not group_links:
         logging.error("No groups to monitor. Exiting.")
         print("No groups to monitor. Exiting.")
@@ -143,10 +297,10 @@ async def start_monitoring(session_name="telegram_monitor_session"):
             if str(chat_id) in [str(chat.id) if hasattr(chat, 'id') else chat.split('/')[-1] for chat in group_links]:
                 print(f"Monitoring chat: {dialog.title} (ID: {chat_id})")
 
-        @client.on(events.NewMessage(chats=group_links))
+        @client.on(telethon.events.NewMessage(chats=group_links))
         async def new_message_handler(event):
             group_name = event.chat.title or f"Group {event.chat_id}"
-            print(f"New message received from {event.chat_id} at {event.message.date}: '{event.message.raw_text or event.message.text}'")
+            log_event(logger, logging.DEBUG, "message_received", group=group_name, chat_id=event.chat_id)
             await process_contract(client, event.message, group_name, is_new=True)
 
         async def keep_alive(client):
@@ -165,23 +319,9 @@ async def start_monitoring(session_name="telegram_monitor_session"):
                 print("Telegram client still alive...")
                 await asyncio.sleep(10)
 
-        async def fetch_recent_messages(client):
-            while True:
-                print("Fetching recent messages...")
-                logging.info("Starting recent message fetch cycle")
-                try:
-                    for group in group_links:
-                        async for message in client.iter_messages(group, limit=5):
-                            group_name = (await client.get_entity(group)).title or f"Group {group}"
-                            await process_contract(client, message, group_name, is_new=False)
-                except Exception as e:
-                    logging.error(f"Recent message fetch error: {e}", exc_info=True)
-                    print(f"Recent message fetch error: {e}")
-                await asyncio.sleep(60)
-
         asyncio.create_task(keep_alive(client))
         asyncio.create_task(keepalive())
-        asyncio.create_task(fetch_recent_messages(client))
+        asyncio.create_task(RecentMessageBackfill(client, group_links).run())
         logging.info("Starting Telegram client event loop.")
         await client.run_until_disconnected()
     except Exception as e:
@@ -190,8 +330,53 @@ async def start_monitoring(session_name="telegram_monitor_session"):
     finally:
         logging.info("Disconnecting Telegram client.")
         await client.disconnect()
+        if _detection_pipeline is not None:
+            await _detection_pipeline.stop()
+        if _contract_writer is not None:
+            await _contract_writer.stop()
+
+async def start_sharded_monitoring(session_names):
+    """Monitor group_links with one process per session file.
+
+    Detections from every shard are deduplicated by the supervisor and fed
+    into this process's detection pipeline.
+    """
+    if not group_links:
+        init()
+    if not group_links:
+        logging.error("No groups to monitor. Exiting.")
+        print("No groups to monitor. Exiting.")
+        return
+
+    loop = asyncio.get_running_loop()
+    pipeline = await get_detection_pipeline()
+
+    def on_detection(address, group_name):
+        item = {'text': address, 'group': group_name, 'is_new': True}
+        asyncio.run_coroutine_threadsafe(pipeline.submit(item), loop)
+
+    supervisor = ShardSupervisor(session_names, group_links, on_detection)
+    supervisor.start()
+    try:
+        await loop.run_in_executor(None, supervisor.run)
+    finally:
+        supervisor.stop()
+        await pipeline.stop()
+        if _contract_writer is not None:
+            await _contract_writer.stop()
 
-PUMP_FUN_ADDRESS_PATTERN = r"\b[1-9A-HJ-NP-Za-km-z]{44}\b"
+# Compiled once; only matches that decode to a 32-byte key are returned
+pump_fun_addresses = AddressExtractor(min_length=44, max_length=44)
 
 if __name__ == "__main__":
-    asyncio.run(start_monitoring())
+    # TELEGRAM_METRICS_PORT serves /metrics when running without the Flask app
+    if os.getenv("TELEGRAM_METRICS_PORT"):
+        metrics.start_http_server(int(os.getenv("TELEGRAM_METRICS_PORT")))
+    metrics.start_profiler_from_env()
+    init()
+    # Several telegram_monitor_session*.session files: shard groups across them
+    sessions = session_files()
+    if len(sessions) > 1:
+        asyncio.run(start_sharded_monitoring(sessions))
+    else:
+        asyncio.run(start_monitoring())
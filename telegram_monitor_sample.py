@@ -1,6 +1,5 @@
 
 import os
-import re
 import asyncio
 import logging
 import time
@@ -13,6 +12,8 @@ from telethon.errors import SessionPasswordNeededError, FloodWaitError
 from dotenv import load_dotenv
 
 from models import MonitoringSource
+from address_extractor import AddressExtractor
+from metrics import log_event
 
 # Load environment variables
 load_dotenv()
@@ -45,9 +46,8 @@ class TelegramMonitor:
 
         self.sources: Dict[str, MonitoringSource] = {}
         self.source_entities: Dict[str, any] = {}
-        self.token_pattern = re.compile(r'([A-HJ-NP-Za-km-z1-9]{32,44})')
+        self.token_extractor = AddressExtractor(min_length=32, max_length=44)
         self.token_handler: Optional[Callable[[str, str], Awaitable[None]]] = None
-        self.found_tokens = set()
         self.connection_requests: Dict[str, Dict] = {}
 
     async def start(self):
@@ -138,20 +138,8 @@ class TelegramMonitor:
             logger.error(f"Error connecting to source {source.name}: {e}")
 
     async def check_message_for_tokens(self, text: str, source_name: str):
-        if not text:
-            return
-        matches = self.token_pattern.findall(text)
-        for token_address in matches:
-            if token_address in self.found_tokens:
-                continue
-            from solders.pubkey import Pubkey
-            try:
-                Pubkey.from_string(token_address)
-            except ValueError:
-                logger.warning(f"Invalid token address found: {token_address} in {source_name}")
-                continue
-            logger.info(f"Found potential token address: {token_address} in {source_name}")
-            self.found_tokens.add(token_address)
+        for token_address in self.token_extractor.extract_new(text):
+            log_event(logger, logging.INFO, "token_found", source=source_name, address=token_address)
             if self.token_handler:
                 await self.token_handler(token_address, source_name)
 
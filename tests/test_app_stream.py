@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+import apebot_v2
+import app as webapp
+from live_events import EventHub, sse_stream
+from poller import FeedSnapshot
+from tests.test_feed_snapshot import FakeHttp, token
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    monkeypatch.setattr(apebot_v2, 'filter_tokens', lambda tokens, blacklist, observe=True: list(tokens))
+    snapshot = FeedSnapshot(set(), http=FakeHttp([token('A'), token('B')]))
+    snapshot.poller.refresh()
+    monkeypatch.setattr(webapp, 'feed', snapshot)
+    yield snapshot
+    snapshot.poller.stop()
+
+
+def test_snapshot_carries_last_event_id(feed):
+    response = webapp.app.test_client().get('/fetch_tokens?filtered=1')
+    assert response.headers['X-Feed-Status'] == 'ready'
+    assert response.headers['X-Last-Event-ID'] == f"{feed.events.epoch}-2"
+
+
+def test_stream_from_snapshot_id_misses_nothing(feed):
+    snapshot_id = webapp.app.test_client().get('/fetch_tokens?filtered=1').headers['X-Last-Event-ID']
+    # Published after the snapshot was served, before the stream was opened
+    feed.events.publish('remove', {'tokenAddress': 'A'})
+    subscription = feed.events.subscribe(snapshot_id)
+    event = next(subscription.events())
+    assert (event.type, event.data) == ('remove', {'tokenAddress': 'A'})
+    subscription.close()
+
+
+def test_reconnect_to_restarted_hub_resyncs(feed):
+    snapshot_id = webapp.app.test_client().get('/fetch_tokens?filtered=1').headers['X-Last-Event-ID']
+    # A restarted worker, or the other worker, with fewer events than the client has seen
+    restarted = EventHub()
+    restarted.publish('remove', {'tokenAddress': 'A'})
+    subscription = restarted.subscribe(snapshot_id)
+    assert next(subscription.events()).type == 'resync'
+    subscription.close()
+
+
+@pytest.mark.parametrize('last_event_id', ['999', 'junk', '-1', 'deadbeef-1'])
+def test_reconnect_with_foreign_id_resyncs(feed, last_event_id):
+    subscription = feed.events.subscribe(last_event_id)
+    assert next(subscription.events()).type == 'resync'
+    subscription.close()
+
+
+def test_reconnect_ahead_of_hub_resyncs(feed):
+    subscription = feed.events.subscribe(f"{feed.events.epoch}-{feed.events.last_id + 5}")
+    assert next(subscription.events()).type == 'resync'
+    subscription.close()
+
+
+def test_stream_ids_carry_the_epoch(feed):
+    subscription = feed.events.subscribe(f"{feed.events.epoch}-1")
+    stream = sse_stream(subscription)
+    next(stream)
+    assert next(stream).startswith(f"id: {feed.events.epoch}-2\n")
+    stream.close()
+
+
+def test_gzip_and_identity_bodies_have_distinct_etags(feed):
+    client = webapp.app.test_client()
+    identity = client.get('/fetch_tokens', headers={'Accept-Encoding': 'identity'})
+    gzipped = client.get('/fetch_tokens', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert identity.headers['ETag'] != gzipped.headers['ETag']
+    revalidated = client.get('/fetch_tokens', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag']})
+    assert revalidated.status_code == 304
+    # An identity body's ETag does not validate the gzip variant
+    mismatched = client.get('/fetch_tokens', headers={'Accept-Encoding': 'gzip', 'If-None-Match': identity.headers['ETag']})
+    assert mismatched.status_code == 200
+
+
+def test_streams_are_capped(feed, monkeypatch):
+    monkeypatch.setattr(webapp, '_stream_slots', threading.BoundedSemaphore(1))
+    client = webapp.app.test_client()
+    first = client.get('/stream')
+    assert first.status_code == 200
+    assert client.get('/stream').status_code == 503
+    first.close()
+    third = client.get('/stream')
+    assert third.status_code == 200
+    third.close()
@@ -0,0 +1,73 @@
+import asyncio
+
+import telegram_monitor
+from telegram_monitor import RecentMessageBackfill
+
+
+class FakeEntity:
+    id = 42
+    title = "Test Group"
+
+
+class FakeMessage:
+    def __init__(self, id):
+        self.id = id
+
+
+class FakeClient:
+    """Serves message ids 1..``newest`` the way Telethon's iter_messages filters them."""
+
+    def __init__(self, newest):
+        self.newest = newest
+        self.calls = 0
+
+    async def get_entity(self, group):
+        return FakeEntity()
+
+    async def iter_messages(self, entity, limit=None, min_id=0, reverse=False):
+        self.calls += 1
+        ids = [id for id in range(1, self.newest + 1) if id > (min_id or 0)]
+        ids = ids[:limit] if reverse else ids[::-1][:limit]
+        for id in ids:
+            yield FakeMessage(id)
+
+
+def backfill(monkeypatch, client, **kwargs):
+    processed = []
+
+    async def process_contract(client, message, group_name, is_new=True):
+        processed.append(message.id)
+
+    monkeypatch.setattr(telegram_monitor, 'process_contract', process_contract)
+    return RecentMessageBackfill(client, ['group'], **kwargs), processed
+
+
+def test_first_cycle_reads_only_the_newest_messages(monkeypatch):
+    client = FakeClient(newest=100)
+    backfill_task, processed = backfill(monkeypatch, client, limit=5)
+    asyncio.run(backfill_task.run_once())
+    assert processed == [96, 97, 98, 99, 100]
+    assert backfill_task.high_water[FakeEntity.id] == 100
+
+
+def test_later_cycles_page_through_every_new_message(monkeypatch):
+    client = FakeClient(newest=10)
+    backfill_task, processed = backfill(monkeypatch, client, limit=5)
+    asyncio.run(backfill_task.run_once())
+    # More than one page arrives between cycles
+    client.newest = 23
+    asyncio.run(backfill_task.run_once())
+    assert processed == list(range(6, 24))
+    assert backfill_task.high_water[FakeEntity.id] == 23
+
+
+def test_page_cap_leaves_the_rest_for_the_next_cycle(monkeypatch):
+    client = FakeClient(newest=5)
+    backfill_task, processed = backfill(monkeypatch, client, limit=5, max_pages=2)
+    asyncio.run(backfill_task.run_once())
+    client.newest = 30
+    asyncio.run(backfill_task.run_once())
+    assert backfill_task.high_water[FakeEntity.id] == 15
+    asyncio.run(backfill_task.run_once())
+    asyncio.run(backfill_task.run_once())
+    assert processed == list(range(1, 31))
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+from contract_writer import ContractWriter
+
+
+class MemoryWriter(ContractWriter):
+    """ContractWriter with the SQLAlchemy calls replaced by a list."""
+
+    def __init__(self, fail_first=0, write_delay=0.0, poison=(), **kwargs):
+        super().__init__(None, None, None, **kwargs)
+        self.rows = []
+        self.fail_first = fail_first
+        self.write_delay = write_delay
+        self.poison = set(poison)
+
+    def _load_known(self):
+        return ['Known1']
+
+    def _write_batch(self, batch):
+        time.sleep(self.write_delay)
+        if self.fail_first:
+            self.fail_first -= 1
+            raise RuntimeError("database unavailable")
+        if any(row['address'] in self.poison for row in batch):
+            raise ValueError("value too long for column address")
+        existing = {row['address'] for row in self.rows}
+        rows = [row for row in batch if row['address'] not in existing]
+        self.rows.extend(rows)
+        return len(rows)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_add_reports_first_sighting_only():
+    async def scenario():
+        writer = MemoryWriter()
+        await writer.start()
+        assert not writer.add('Known1', 'g')
+        assert writer.add('New1', 'g')
+        assert not writer.add('New1', 'g')
+        await writer.stop()
+        return writer
+
+    writer = run(scenario())
+    assert [row['address'] for row in writer.rows] == ['New1']
+
+
+def test_stop_persists_rows_held_in_the_current_batch():
+    async def scenario():
+        # A long flush interval keeps rows in _run's local batch when stop() is called
+        writer = MemoryWriter(batch_size=1000, flush_interval=30.0)
+        await writer.start()
+        for index in range(250):
+            writer.add(f'Addr{index}', 'g')
+            if index % 50 == 0:
+                await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        await writer.stop()
+        return writer
+
+    writer = run(scenario())
+    assert sorted(row['address'] for row in writer.rows) == sorted(f'Addr{index}' for index in range(250))
+
+
+def test_stop_persists_every_row_during_slow_writes():
+    async def scenario():
+        writer = MemoryWriter(batch_size=20, flush_interval=0.01, write_delay=0.005)
+        await writer.start()
+        for index in range(500):
+            writer.add(f'Addr{index}', 'g')
+            await asyncio.sleep(0)
+        await writer.stop()
+        return writer
+
+    writer = run(scenario())
+    assert len(writer.rows) == 500
+    assert writer.stats()['rows_written'] == 500
+
+
+def test_failed_batch_is_retried():
+    async def scenario():
+        writer = MemoryWriter(fail_first=1, batch_size=10, flush_interval=0.01)
+        await writer.start()
+        for index in range(10):
+            writer.add(f'Addr{index}', 'g')
+        await asyncio.sleep(0.1)
+        await writer.stop()
+        return writer
+
+    writer = run(scenario())
+    assert len(writer.rows) == 10
+    assert writer.failures == 1
+
+
+def test_poison_row_is_dropped_after_retries():
+    async def scenario():
+        writer = MemoryWriter(poison={'Bad'}, batch_size=10, flush_interval=0.001, max_retries=3)
+        await writer.start()
+        writer.add('Good1', 'g')
+        writer.add('Bad', 'g')
+        writer.add('Good2', 'g')
+        await asyncio.sleep(0.2)
+        # Later rows are not held up behind the bad one
+        writer.add('Good3', 'g')
+        await asyncio.sleep(0.05)
+        assert writer.queue.empty()
+        await writer.stop()
+        return writer
+
+    writer = run(scenario())
+    assert sorted(row['address'] for row in writer.rows) == ['Good1', 'Good2', 'Good3']
+    assert writer.failures == 4
+    assert writer.stats()['dropped'] == 1
+    assert writer._attempts == {}
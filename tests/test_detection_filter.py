@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+import apebot_v2
+import telegram_monitor
+from tests.test_contract_writer import MemoryWriter
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = MemoryWriter()
+    monkeypatch.setattr(telegram_monitor, '_contract_writer', writer)
+    monkeypatch.setattr(telegram_monitor, '_detection_blacklist', {'Blacklisted1'})
+    return writer
+
+
+def detect(writer, address):
+    # dedupe_stage's claim, then the filter's verdict
+    assert writer.add(address, 'g')
+    item = {'address': address, 'group': 'g', 'is_new': True, 'time': ''}
+    return asyncio.run(telegram_monitor.filter_stage(item))
+
+
+@pytest.mark.parametrize('status, passes, retried', [
+    ('Good', True, False),
+    ('Danger', False, False),
+    (apebot_v2.UNKNOWN_VERDICT, False, True),
+])
+def test_only_unknown_verdicts_are_judged_again(writer, monkeypatch, status, passes, retried):
+    monkeypatch.setattr(apebot_v2, 'check_rugcheck_status', lambda address: status)
+    monkeypatch.setattr(apebot_v2, 'record_failed_rugcheck', lambda token, status: None)
+    assert (detect(writer, 'Token1') is not None) == passes
+    # A later sighting is a first sighting again only when the verdict was unknown
+    assert writer.add('Token1', 'g') == retried
+
+
+def test_blacklisted_address_skips_rugcheck(writer, monkeypatch):
+    lookups = []
+    monkeypatch.setattr(apebot_v2, 'check_rugcheck_status', lambda address: lookups.append(address) or 'Good')
+    assert detect(writer, 'Blacklisted1') is None
+    assert lookups == []
+    assert not writer.add('Blacklisted1', 'g')
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import requests
+
+import apebot_v2
+from poller import FeedSnapshot
+
+
+class FakeResponse:
+    def __init__(self, status_code, tokens=None, etag=None):
+        self.status_code = status_code
+        self._tokens = tokens
+        self.headers = {'ETag': etag} if etag else {}
+
+    def json(self):
+        return self._tokens
+
+
+class FakeHttp:
+    """Serves ``tokens`` once, then 304s; ``fail`` makes every call raise."""
+
+    def __init__(self, tokens=(), delay=0.0, fail=False):
+        self.tokens = list(tokens)
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def get(self, url, headers=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise requests.ConnectionError("upstream down")
+        if headers and headers.get('If-None-Match') == 'v1':
+            return FakeResponse(304)
+        return FakeResponse(200, self.tokens, etag='v1')
+
+
+def token(address):
+    return {'tokenAddress': address, 'chainId': 'solana'}
+
+
+def test_passing_tokens_are_rechecked_every_poll(monkeypatch):
+    expired = set()
+    calls = []
+
+    def filter_tokens(tokens, blacklist, observe=True):
+        calls.append(observe)
+        return [t for t in tokens if t['tokenAddress'] not in expired]
+
+    monkeypatch.setattr(apebot_v2, 'filter_tokens', filter_tokens)
+    feed = FeedSnapshot(set(), http=FakeHttp([token('A'), token('B')]))
+    feed.poller.refresh()
+    assert set(feed.filtered) == {'A', 'B'}
+    subscription = feed.events.subscribe(feed.events.last_event_id)
+
+    # Nothing changed upstream (304), but A no longer passes, e.g. it got too old
+    expired.add('A')
+    feed.poller.refresh()
+    assert set(feed.filtered) == {'B'}
+    event = subscription.queue.get_nowait()
+    assert (event.type, event.data) == ('remove', {'tokenAddress': 'A'})
+    assert subscription.queue.empty()
+    assert b'"A"' not in feed.payload('filtered').body
+    # Re-checks do not add rolling-stats observations
+    assert calls[-1] is False
+
+
+def test_cold_start_waits_briefly_then_serves_warming(monkeypatch):
+    monkeypatch.setattr(apebot_v2, 'filter_tokens', lambda tokens, blacklist, observe=True: list(tokens))
+    http = FakeHttp(delay=1.0, fail=True)
+    feed = FeedSnapshot(set(), http=http, warmup_wait=0.1)
+
+    start = time.perf_counter()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(feed.payload('filtered'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.5
+    assert feed.status == 'warming'
+    assert all(payload.body == b'[]' for payload in results)
+    assert http.calls == 1
+    feed.poller.stop()
+
+
+def test_first_poll_makes_snapshot_ready(monkeypatch):
+    monkeypatch.setattr(apebot_v2, 'filter_tokens', lambda tokens, blacklist, observe=True: list(tokens))
+    feed = FeedSnapshot(set(), http=FakeHttp([token('A')]), warmup_wait=5.0)
+    payload = feed.payload('filtered')
+    assert feed.status == 'ready'
+    assert b'"A"' in payload.body
+    feed.poller.stop()
+
+
+def test_delta_is_redelivered_after_filter_failure(monkeypatch):
+    failures = [RuntimeError("rugcheck down")]
+
+    def filter_tokens(tokens, blacklist, observe=True):
+        if failures:
+            raise failures.pop()
+        return list(tokens)
+
+    monkeypatch.setattr(apebot_v2, 'filter_tokens', filter_tokens)
+    http = FakeHttp([token('A'), token('B')])
+    feed = FeedSnapshot(set(), http=http)
+    feed.poller._safe_refresh()
+    assert feed.filtered == {}
+    assert feed.poller.snapshot == {} and feed.poller.etag is None
+
+    # Not a 304: the failed delta was not committed, so it comes back
+    feed.poller.refresh()
+    assert set(feed.filtered) == {'A', 'B'}
+    assert b'"A"' in feed.payload('raw').body
+    assert feed.poller.etag == 'v1'
+
+
+def test_concurrent_refreshes_apply_in_order(monkeypatch):
+    active, overlaps = [], []
+
+    def filter_tokens(tokens, blacklist, observe=True):
+        active.append(1)
+        overlaps.append(len(active))
+        time.sleep(0.01)
+        active.pop()
+        return list(tokens)
+
+    monkeypatch.setattr(apebot_v2, 'filter_tokens', filter_tokens)
+    feed = FeedSnapshot(set(), http=FakeHttp([token('A')]))
+    threads = [threading.Thread(target=feed.poller.refresh) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(overlaps) == 1
+    assert set(feed.filtered) == {'A'}
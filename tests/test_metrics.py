@@ -0,0 +1,46 @@
+import threading
+import time
+
+import apebot_v2
+import metrics
+from poller import BoostFeedPoller
+from tests.test_feed_snapshot import FakeHttp, token
+
+
+def test_folded_is_safe_while_sampling():
+    stop = threading.Event()
+
+    def busy(depth):
+        if depth:
+            return busy(depth - 1)
+        while not stop.is_set():
+            time.sleep(0.0005)
+
+    threads = [threading.Thread(target=busy, args=(index % 7,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    profiler = metrics.SamplingProfiler(interval=0.0005).start()
+    try:
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            profiler.folded()
+            profiler.reset()
+        while not profiler.samples:
+            time.sleep(0.001)
+    finally:
+        profiler.stop()
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert profiler.folded().strip()
+
+
+def test_poller_fetch_is_timed_and_errors_counted():
+    before = apebot_v2.FETCH_SECONDS.count()
+    poller = BoostFeedPoller(lambda *delta: None, http=FakeHttp([token('A')]))
+    poller.refresh()
+    assert apebot_v2.FETCH_SECONDS.count() == before + 1
+
+    before_errors = apebot_v2.FETCH_ERRORS.value(reason='unavailable')
+    BoostFeedPoller(lambda *delta: None, http=FakeHttp(fail=True)).refresh()
+    assert apebot_v2.FETCH_ERRORS.value(reason='unavailable') == before_errors + 1
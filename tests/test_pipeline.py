@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+from pipeline import LatencyHistogram, Pipeline, Stage
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def gated_pipeline(drop_policy, queue_size=2):
+    """One stage whose single worker holds the first item until ``gate`` is set."""
+    gate = asyncio.Event()
+    seen = []
+
+    async def handler(item):
+        await gate.wait()
+        seen.append(item)
+
+    pipeline = Pipeline([Stage('only', handler, workers=1, queue_size=queue_size, drop_policy=drop_policy)])
+    return pipeline, gate, seen
+
+
+async def fill(pipeline, count):
+    accepted = []
+    for item in range(count):
+        accepted.append(await pipeline.submit(item))
+        # Let the worker take item 0 off the queue before the rest arrive
+        await asyncio.sleep(0)
+    return accepted
+
+
+def test_unknown_drop_policy_is_rejected():
+    with pytest.raises(ValueError):
+        Stage('bad', None, drop_policy='drop_random')
+
+
+def test_drop_newest_refuses_items_once_full():
+    async def scenario():
+        pipeline, gate, seen = gated_pipeline('drop_newest')
+        await pipeline.start()
+        accepted = await fill(pipeline, 5)
+        assert pipeline.stages[0].queue.qsize() == 2
+        gate.set()
+        await pipeline.stop()
+        return accepted, seen, pipeline.stages[0].dropped
+
+    accepted, seen, dropped = run(scenario())
+    assert accepted == [True, True, True, False, False]
+    assert seen == [0, 1, 2]
+    assert dropped == 2
+
+
+def test_drop_oldest_keeps_the_newest_items():
+    async def scenario():
+        pipeline, gate, seen = gated_pipeline('drop_oldest')
+        await pipeline.start()
+        accepted = await fill(pipeline, 5)
+        gate.set()
+        await pipeline.stop()
+        return accepted, seen, pipeline.stages[0].dropped
+
+    accepted, seen, dropped = run(scenario())
+    assert all(accepted)
+    assert seen == [0, 3, 4]
+    assert dropped == 2
+
+
+def test_block_applies_backpressure_without_dropping():
+    async def scenario():
+        pipeline, gate, seen = gated_pipeline('block')
+        await pipeline.start()
+        await fill(pipeline, 3)
+        blocked = asyncio.create_task(pipeline.submit(3))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        assert pipeline.stages[0].queue.qsize() == 2
+        gate.set()
+        assert await blocked
+        await pipeline.stop()
+        return seen, pipeline.stages[0].dropped
+
+    seen, dropped = run(scenario())
+    assert seen == [0, 1, 2, 3]
+    assert dropped == 0
+
+
+def test_items_fan_out_and_errors_do_not_stop_workers():
+    async def split(item):
+        return [item, item + 100]
+
+    async def check(item):
+        if item == 2:
+            raise RuntimeError("bad item")
+        return item
+
+    async def scenario():
+        pipeline = Pipeline([Stage('split', split, workers=2), Stage('check', check, workers=2)])
+        await pipeline.start()
+        for item in range(5):
+            await pipeline.submit(item)
+        await pipeline.stop()
+        return pipeline.stats()
+
+    stats = run(scenario())
+    assert stats['split']['processed'] == 5
+    assert stats['check']['processed'] == 10
+    assert stats['check']['errors'] == 1
+    assert stats['completed'] == 9
+    assert stats['end_to_end']['count'] == 9
+
+
+def test_stop_drains_every_stage_then_cancels_workers():
+    async def slow(item):
+        await asyncio.sleep(0.001)
+        return item
+
+    async def scenario():
+        pipeline = Pipeline([Stage('a', slow, queue_size=5), Stage('b', slow, queue_size=1)])
+        await pipeline.start()
+        for item in range(20):
+            await pipeline.submit(item)
+        tasks = list(pipeline._tasks)
+        await pipeline.stop()
+        return pipeline, tasks
+
+    pipeline, tasks = run(scenario())
+    assert pipeline.completed == 20
+    assert all(task.done() for task in tasks)
+    assert pipeline._tasks == []
+
+
+def test_stop_without_drain_abandons_queued_items():
+    async def scenario():
+        pipeline, gate, seen = gated_pipeline('block', queue_size=10)
+        await pipeline.start()
+        await fill(pipeline, 5)
+        await pipeline.stop(drain=False)
+        return seen
+
+    assert run(scenario()) == []
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram(buckets=(0.001, 0.01, 0.1))
+    for seconds in [0.0005] * 50 + [0.005] * 45 + [0.05] * 4 + [2.0]:
+        histogram.observe(seconds)
+    summary = histogram.summary()
+    assert summary['count'] == 100
+    assert summary['p50'] == 0.001
+    assert summary['p99'] == 0.1
+    assert summary['max'] == 2.0
+    assert histogram.percentile(1.0) == 2.0
+    assert summary['mean'] == pytest.approx((0.025 + 0.225 + 0.2 + 2.0) / 100)
+    assert LatencyHistogram().summary()['p99'] == 0.0
+
+
+def test_stage_histograms_split_queue_wait_from_handling():
+    async def handler(item):
+        await asyncio.sleep(0.02)
+
+    async def scenario():
+        pipeline = Pipeline([Stage('only', handler, workers=1, queue_size=10)])
+        await pipeline.start()
+        for item in range(3):
+            await pipeline.submit(item)
+        await pipeline.stop()
+        return pipeline.stages[0]
+
+    stage = run(scenario())
+    assert stage.handle_latency.count == stage.wait_latency.count == 3
+    assert stage.handle_latency.max >= 0.02
+    # The last item waited behind two handled ones
+    assert stage.wait_latency.max >= 0.04
@@ -0,0 +1,112 @@
+import os
+
+import pytest
+
+from reputation import CREATOR, FUNDER, RUG_CONTRACT, BloomFilter, ReputationIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ReputationIndex(str(tmp_path / 'reputation.db'), capacity=10_000)
+    yield index
+    index.close()
+
+
+def test_round_trip_and_reopen(tmp_path):
+    path = str(tmp_path / 'reputation.db')
+    index = ReputationIndex(path, capacity=10_000)
+    assert index.add('Creator1', CREATOR, 'rugged', 'rugcheck')
+    assert not index.add('Creator1', CREATOR)
+    assert index.add_many([('Funder1', FUNDER, '', ''), ('Rug1', RUG_CONTRACT, '', ''), ('', CREATOR, '', '')]) == 2
+    index.close()
+
+    index = ReputationIndex(path, capacity=10_000)
+    assert len(index) == 3
+    assert 'Creator1' in index and 'Funder1' in index and 'Rug1' in index
+    assert 'Nobody' not in index and '' not in index
+    entry = index.lookup('Creator1')
+    assert (entry['kind'], entry['reason'], entry['source']) == (CREATOR, 'rugged', 'rugcheck')
+    assert sorted(index.addresses(FUNDER)) == ['Funder1']
+    index.remove('Funder1')
+    assert 'Funder1' not in index
+    index.close()
+
+
+def test_bloom_rebuilt_from_database(tmp_path):
+    path = str(tmp_path / 'reputation.db')
+    index = ReputationIndex(path, capacity=10_000)
+    index.add_many((f'Addr{n}', CREATOR, '', '') for n in range(500))
+    index.close()
+    os.remove(path + '.bloom')
+
+    index = ReputationIndex(path, capacity=10_000)
+    assert all(f'Addr{n}' in index.bloom for n in range(500))
+    assert all(f'Addr{n}' in index for n in range(500))
+    index.close()
+
+
+def test_no_false_negatives(index):
+    addresses = [f'Known{n}' for n in range(2_000)]
+    index.add_many((address, CREATOR, '', '') for address in addresses)
+    assert all(address in index for address in addresses)
+    stats = index.stats()
+    assert stats['db_lookups'] >= len(addresses)
+    # Absent keys mostly stop at the bloom filter
+    misses = sum(f'Unknown{n}' in index for n in range(2_000))
+    assert misses == 0
+    assert index.stats()['bloom_negatives'] > 1_900
+
+
+class FailingCommit:
+    """Stands in for the SQLite connection and fails at commit, like a crash would."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def commit(self):
+        raise RuntimeError("crashed before commit")
+
+
+def test_bloom_bits_are_set_before_the_commit(index):
+    index._db = FailingCommit(index._db)
+    with pytest.raises(RuntimeError):
+        index.add('Pending1', CREATOR)
+    assert 'Pending1' in index.bloom
+
+
+def test_bloom_file_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'shared.bloom')
+    writer = BloomFilter(path, capacity=1_000)
+    reader = BloomFilter(path, capacity=1_000)
+    writer.add('SharedKey')
+    assert 'SharedKey' in reader
+    writer.close()
+    reader.close()
+
+
+def _add_keys(path, worker, count):
+    bloom = BloomFilter(path, capacity=1_000)
+    for index in range(count):
+        bloom.add(f'Worker{worker}Key{index}')
+    bloom.close()
+
+
+def test_concurrent_writers_lose_no_bits(tmp_path):
+    import multiprocessing
+
+    path = str(tmp_path / 'shared.bloom')
+    # Small enough that the writers keep hitting the same bytes
+    BloomFilter(path, capacity=1_000).close()
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_add_keys, args=(path, worker, 3_000)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    assert all(process.exitcode == 0 for process in workers)
+    bloom = BloomFilter(path)
+    assert all(f'Worker{worker}Key{index}' in bloom for worker in range(4) for index in range(3_000))
+    bloom.close()
@@ -0,0 +1,98 @@
+import random
+import statistics
+import threading
+
+import pytest
+
+from rolling_stats import RollingStatsStore, TokenStats
+
+
+def naive(values):
+    return statistics.fmean(values), statistics.pstdev(values)
+
+
+def window_stats(stats):
+    mean_v, mean_m = stats.volume_mean, stats.market_cap_mean
+    return (mean_v, (stats.volume_m2 / stats.count) ** 0.5), (mean_m, (stats.market_cap_m2 / stats.count) ** 0.5)
+
+
+@pytest.mark.parametrize('capacity', [1, 10, 240])
+def test_ring_buffer_matches_naive_window(capacity):
+    rng = random.Random(capacity)
+    stats = TokenStats(capacity)
+    samples = []
+    for step in range(1_000):
+        sample = (float(step), 10 ** rng.uniform(2, 7), 10 ** rng.uniform(4, 8))
+        stats.add(*sample)
+        samples.append(sample)
+        window = samples[-capacity:]
+        (volume_mean, volume_std), (cap_mean, cap_std) = window_stats(stats)
+        expected_volume, expected_cap = naive([s[1] for s in window]), naive([s[2] for s in window])
+        assert volume_mean == pytest.approx(expected_volume[0], rel=1e-9)
+        assert volume_std == pytest.approx(expected_volume[1], rel=1e-6, abs=1e-6)
+        assert cap_mean == pytest.approx(expected_cap[0], rel=1e-9)
+        assert cap_std == pytest.approx(expected_cap[1], rel=1e-6, abs=1e-6)
+
+
+def test_time_expiry_matches_naive_window():
+    rng = random.Random(5)
+    stats = TokenStats(1_000)
+    samples = []
+    now = 0.0
+    for _ in range(2_000):
+        now += rng.uniform(0, 60)
+        sample = (now, rng.uniform(0, 1e6), rng.uniform(1e4, 1e7))
+        stats.expire(now - 3_600)
+        stats.add(*sample)
+        samples.append(sample)
+        window = [s for s in samples if s[0] >= now - 3_600]
+        assert stats.count == len(window)
+        (volume_mean, volume_std), _ = window_stats(stats)
+        expected_mean, expected_std = naive([s[1] for s in window])
+        assert volume_mean == pytest.approx(expected_mean, rel=1e-9)
+        assert volume_std == pytest.approx(expected_std, rel=1e-6, abs=1e-6)
+
+
+def test_anomaly_uses_the_window_before_the_sample():
+    store = RollingStatsStore(window=3_600, min_samples=10)
+    for step in range(20):
+        assert not store.observe('Token', 1_000 + step % 3, 50_000, timestamp=step)
+    assert not store.is_anomalous('Token')
+    assert store.observe('Token', 100_000, 50_000, timestamp=21)
+    assert store.is_anomalous('Token')
+
+
+def test_no_verdict_below_min_samples():
+    store = RollingStatsStore(window=3_600, min_samples=10)
+    for step in range(9):
+        store.observe('Token', 1_000, 50_000, timestamp=step)
+    assert not store.observe('Token', 1e9, 1e9, timestamp=10)
+
+
+def test_idle_tokens_are_evicted():
+    store = RollingStatsStore(window=100)
+    store.observe('Old', 1, 1, timestamp=0)
+    store.observe('New', 1, 1, timestamp=150)
+    assert len(store) == 1
+    assert not store.is_anomalous('Old')
+
+
+def test_concurrent_observers_keep_the_store_consistent():
+
+    store = RollingStatsStore(window=50, max_samples=20)
+    errors = []
+
+    def observe(worker):
+        try:
+            for step in range(3_000):
+                store.observe(f'T{(worker * 7 + step) % 40}', step, step, timestamp=step)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=observe, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert set(store._tokens) == set(store._last_seen)
@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+
+from filter_rules import RuleSetLoader
+
+
+def write_rules(path, rules, mtime):
+    path.write_text(rules if isinstance(rules, str) else json.dumps({'strategies': {'default': rules}}))
+    # Distinct mtimes even when the test runs within one filesystem tick
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / 'rules.json'
+    write_rules(path, [{'metric': 'market_cap', 'op': '<=', 'value': 100}], 1_000_000_000)
+    return path
+
+
+def passing(loader, tokens):
+    return [token['market_cap'] for token in loader.engine('default').evaluate(tokens)]
+
+
+TOKENS = [{'market_cap': 50}, {'market_cap': 500}]
+
+
+def test_edit_is_picked_up(rules_file):
+    loader = RuleSetLoader(str(rules_file), {}, {}, check_interval=0)
+    assert passing(loader, TOKENS) == [50]
+    write_rules(rules_file, [{'metric': 'market_cap', 'op': '<=', 'value': 1000}], 2_000_000_000)
+    assert passing(loader, TOKENS) == [50, 500]
+
+
+@pytest.mark.parametrize('broken', [
+    '{"strategies": {"default": [',
+    json.dumps({'strategies': {'default': [{'metric': 'market_cap', 'op': '~=', 'value': 1}]}}),
+    json.dumps({'rules': []}),
+])
+def test_malformed_file_keeps_previous_rules(rules_file, broken):
+    loader = RuleSetLoader(str(rules_file), {}, {}, check_interval=0)
+    engine = loader.engine('default')
+    write_rules(rules_file, broken, 2_000_000_000)
+    assert loader.engine('default') is engine
+    assert passing(loader, TOKENS) == [50]
+
+    # Fixing the file is picked up again
+    write_rules(rules_file, [{'metric': 'market_cap', 'op': '>=', 'value': 100}], 3_000_000_000)
+    assert passing(loader, TOKENS) == [500]
+
+
+def test_check_interval_limits_stats(rules_file):
+    loader = RuleSetLoader(str(rules_file), {}, {}, check_interval=3600)
+    assert passing(loader, TOKENS) == [50]
+    write_rules(rules_file, [{'metric': 'market_cap', 'op': '<=', 'value': 1000}], 2_000_000_000)
+    # Checked moments ago: the edit waits for the next interval
+    assert passing(loader, TOKENS) == [50]
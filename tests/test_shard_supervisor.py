@@ -0,0 +1,173 @@
+import asyncio
+import queue
+import time
+
+import pytest
+
+import shard_supervisor
+from shard_supervisor import ShardFloodWait, ShardSupervisor, shard_groups
+
+GROUPS = [f"group{index}" for index in range(6)]
+
+
+class FakeProcess:
+    def __init__(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.alive = False
+
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    """Three shards whose processes are fakes and whose control queues are plain queues."""
+    spawned = []
+
+    def spawn(self, shard, groups):
+        shard.process = FakeProcess()
+        shard.control = queue.Queue()
+        shard.groups = list(groups)
+        shard.last_heartbeat = time.time()
+        spawned.append(shard.id)
+
+    monkeypatch.setattr(ShardSupervisor, '_spawn', spawn)
+    supervisor = ShardSupervisor(['s0', 's1', 's2'], GROUPS, lambda address, group: None,
+                                 heartbeat_timeout=30.0, restart_delay=60.0)
+    supervisor.start()
+    supervisor.spawned = spawned
+    return supervisor
+
+
+def assigned(supervisor):
+    return {shard_id: shard.groups for shard_id, shard in supervisor.shards.items()}
+
+
+def commands(shard):
+    sent = []
+    while not shard.control.empty():
+        sent.append(shard.control.get_nowait())
+    return sent
+
+
+def test_start_spreads_groups_round_robin(supervisor):
+    assert assigned(supervisor) == shard_groups(GROUPS, [0, 1, 2])
+    assert sorted(group for groups in assigned(supervisor).values() for group in groups) == sorted(GROUPS)
+
+
+def test_dead_shard_groups_move_to_the_others(supervisor):
+    supervisor.shards[1].process.alive = False
+    supervisor.check_health()
+    assert assigned(supervisor) == {1: [], **shard_groups(GROUPS, [0, 2])}
+    assert commands(supervisor.shards[0])[-1] == ('assign', supervisor.shards[0].groups)
+    # Not restarted until restart_delay has passed
+    assert supervisor.spawned == [0, 1, 2]
+
+
+def test_silent_shard_is_terminated(supervisor):
+    shard = supervisor.shards[2]
+    shard.last_heartbeat = time.time() - 31
+    supervisor.check_health()
+    assert not shard.process.is_alive()
+    assert shard.groups == []
+    assert assigned(supervisor) == {2: [], **shard_groups(GROUPS, [0, 1])}
+
+
+def test_restarted_shard_gets_groups_back(supervisor):
+    supervisor.shards[1].process.alive = False
+    supervisor.check_health()
+    supervisor.shards[1].unavailable_until = time.time() - 1
+    supervisor.check_health()
+    assert supervisor.spawned == [0, 1, 2, 1]
+    assert assigned(supervisor) == shard_groups(GROUPS, [0, 1, 2])
+
+
+@pytest.mark.parametrize('event', [('flood', 0, 120), ('error', 0, "watch failed")])
+def test_flood_or_error_sidelines_a_live_shard(supervisor, event):
+    shard = supervisor.shards[0]
+    commands(shard)
+    supervisor.handle(event)
+    assert commands(shard) == [('assign', [])]
+    assert assigned(supervisor) == {0: [], **shard_groups(GROUPS, [1, 2])}
+    # Still sidelined on the next health check
+    supervisor.check_health()
+    assert shard.groups == []
+
+
+def test_rebalance_without_healthy_shards_keeps_assignment(supervisor):
+    before = assigned(supervisor)
+    for shard in supervisor.shards.values():
+        shard.unavailable_until = time.time() + 60
+    supervisor.rebalance()
+    assert assigned(supervisor) == before
+
+
+def test_detections_are_deduplicated_across_shards(supervisor):
+    found = []
+    supervisor.on_detection = lambda address, group: found.append(address)
+    supervisor.handle(('detection', 0, 'Addr1', 'group0', time.time()))
+    supervisor.handle(('detection', 1, 'Addr1', 'group1', time.time()))
+    assert found == ['Addr1']
+    assert supervisor.duplicates == 1
+
+
+class FailingClient:
+    """Shard client whose second watch raises, then stops on command."""
+
+    def __init__(self, session_name):
+        self.watches = 0
+        self.stopped = asyncio.Event()
+
+    async def start(self):
+        pass
+
+    async def watch(self, groups, on_message):
+        self.watches += 1
+        if self.watches == 2:
+            raise RuntimeError("entity lookup failed")
+        if self.watches == 3:
+            raise ShardFloodWait(5)
+
+    async def run(self):
+        await self.stopped.wait()
+
+    async def stop(self):
+        self.stopped.set()
+
+
+def test_control_loop_survives_watch_errors():
+    events, control = queue.Queue(), queue.Queue()
+    control.put(('assign', ['group0']))
+    control.put(('assign', ['group1']))
+    control.put(('stop', None))
+    asyncio.run(asyncio.wait_for(
+        shard_supervisor._shard_main(0, 's0', ['group0'], FailingClient, events, control, heartbeat=0.1), 5
+    ))
+    kinds = []
+    while not events.empty():
+        kinds.append(events.get_nowait()[0])
+    assert 'error' in kinds and 'flood' in kinds
+    assert kinds.index('flood') > kinds.index('error')
+
+
+class FakeMedia:
+    def __init__(self, url):
+        self.webpage = type('WebPage', (), {'url': url})()
+
+
+class FakeMessage:
+    def __init__(self, raw_text='', media=None):
+        self.raw_text = raw_text
+        self.text = raw_text
+        self.message = raw_text
+        self.media = media
+
+
+def test_message_text_falls_back_to_the_link_preview():
+    from telegram_messages import message_text
+
+    assert asyncio.run(message_text(None, FakeMessage('gem Addr1'), 'g')) == 'gem Addr1'
+    assert asyncio.run(message_text(None, FakeMessage(media=FakeMedia('https://pump.fun/Addr2')), 'g')) == 'https://pump.fun/Addr2'
+    assert asyncio.run(message_text(None, FakeMessage(), 'g')) == ''
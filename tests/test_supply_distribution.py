@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from apebot_v2 import METRICS, check_bundled_supply, check_supply_distribution, largest_balance_cluster
+
+bundled_distribution = METRICS['bundled_distribution'][0]
+
+
+def random_holders(count, seed):
+    # Log-uniform balances, as in a real holder list with no bundle
+    rng = random.Random(seed)
+    return [{'balance': round(10 ** rng.uniform(2, 9), 6)} for _ in range(count)]
+
+
+def with_bundle(holders, size, balance, position):
+    bundle = [{'balance': balance} for _ in range(size)]
+    return holders[:position] + bundle + holders[position:]
+
+
+@pytest.mark.parametrize('count', [1_000, 2_000, 5_000, 10_000])
+def test_random_holder_lists_pass(count):
+    flagged = sum(bundled_distribution({'holders_data': random_holders(count, seed)}, {}) for seed in range(20))
+    assert flagged == 0
+
+
+@pytest.mark.parametrize('position', [0, 2_500, 9_999])
+def test_planted_bundle_is_caught(position):
+    holders = with_bundle(random_holders(10_000, seed=1), 5, 25_000_000.0, position)
+    assert bundled_distribution({'holders_data': holders}, {})
+
+
+def test_bundle_below_threshold_passes():
+    holders = with_bundle(random_holders(5_000, seed=2), 4, 25_000_000.0, 100)
+    assert not bundled_distribution({'holders_data': holders}, {})
+
+
+def test_tolerant_check_catches_dust_differences():
+    holders = [{'balance': 25_000_000 + index * 10} for index in range(5)]
+    assert not check_supply_distribution(holders)
+    assert check_supply_distribution(holders, tolerance=0.001)
+
+
+def test_dust_bundle_holding_supply_is_caught():
+    holders = random_holders(5_000, seed=3)
+    supply = sum(holder['balance'] for holder in holders)
+    # Six wallets a few units apart, together about 10% of the supply
+    holders = holders[:50] + [{'balance': supply / 60 + index * 3} for index in range(6)] + holders[50:]
+    assert not check_supply_distribution(holders)
+    assert bundled_distribution({'holders_data': holders}, {})
+
+
+def test_dust_bundle_with_small_share_passes():
+    holders = random_holders(5_000, seed=4)
+    holders = holders[:50] + [{'balance': 1_000 + index * 0.1} for index in range(6)] + holders[50:]
+    assert not check_bundled_supply(holders)
+    assert check_bundled_supply(holders, min_share=0)
+
+
+def test_bundled_supply_share_uses_total_supply():
+    holders = [{'balance': 100.0 + index * 0.01} for index in range(5)]
+    assert check_bundled_supply(holders)
+    assert not check_bundled_supply(holders, total_supply=100_000)
+
+
+def test_largest_cluster_reports_bundle_share():
+    holders = with_bundle([{'balance': float(10 ** index)} for index in range(2, 8)], 6, 1_000.5, 3)
+    cluster = largest_balance_cluster(holders)
+    assert cluster.size == 6
+    assert cluster.balance == pytest.approx(6 * 1_000.5)
+    assert cluster.supply_share == pytest.approx(cluster.balance / sum(holder['balance'] for holder in holders))
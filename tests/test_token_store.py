@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from token_store import TokenStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TokenStore(str(tmp_path / 'tokens.db'))
+    yield store
+    store.close()
+
+
+def test_round_trip_across_reopen(tmp_path):
+    path = str(tmp_path / 'tokens.db')
+    store = TokenStore(path)
+    first = {'tokenAddress': 'A', 'market_cap': 1, 'links': [{'type': 'twitter'}]}
+    assert store.append([first, {'contract_address': 'B', 'market_cap': 2}], recorded_at=100.0) == 2
+    store.append([{'tokenAddress': 'A', 'market_cap': 3}], recorded_at=200.0)
+    store.close()
+
+    store = TokenStore(path)
+    assert store.count() == 3
+    assert store.latest('A') == {'tokenAddress': 'A', 'market_cap': 3}
+    assert store.latest('Missing') is None
+    assert store.history('A') == [(100.0, first), (200.0, {'tokenAddress': 'A', 'market_cap': 3})]
+    assert store.last_recorded_at() == 200.0
+    store.close()
+
+
+def test_window_and_addresses(store):
+    for at in range(5):
+        store.append([{'tokenAddress': f'T{at}'}, {'tokenAddress': 'Same'}], recorded_at=float(at))
+    assert [token['tokenAddress'] for _, token in store.window(1.0, 3.0)] == ['T1', 'Same', 'T2', 'Same']
+    assert len(store.window(limit=3)) == 3
+    assert store.addresses() == ['T0', 'Same', 'T1', 'T2', 'T3', 'T4']
+    assert store.addresses(start=4.0) == ['T4', 'Same']
+
+
+def test_export_addresses(store, tmp_path):
+    store.append([{'tokenAddress': 'A'}, {'tokenAddress': 'B'}, {'tokenAddress': 'A'}], recorded_at=1.0)
+    out = tmp_path / 'contract_addresses.txt'
+    assert store.export_addresses(str(out)) == 2
+    assert out.read_text().splitlines() == ['A', 'B']
+
+
+def test_tokens_without_address_are_skipped(store, tmp_path):
+    assert store.append([{'tokenAddress': 'A'}, {'market_cap': 1}, {'contract_address': ''}], recorded_at=1.0) == 1
+    out = tmp_path / 'contract_addresses.txt'
+    store.export_addresses(str(out))
+    assert out.read_text() == 'A\n'
+
+
+def test_save_to_file_keeps_filename_dumps(store, tmp_path):
+    import apebot_v2
+
+    dump = tmp_path / 'filtered.json'
+    apebot_v2.save_to_file([{'tokenAddress': 'A'}], str(dump))
+    assert json.loads(dump.read_text()) == [{'tokenAddress': 'A'}]
+    assert store.count() == 0
+    apebot_v2.save_to_file([{'tokenAddress': 'B'}], store=store)
+    assert store.addresses() == ['B']
+
+
+def test_import_json_dump(store, tmp_path):
+    dump = tmp_path / 'filtered_tokens_2.json'
+    dump.write_text(json.dumps([{'tokenAddress': 'A'}, 'not a token', {'tokenAddress': 'B'}]))
+    assert store.import_json_dump(str(dump), recorded_at=5.0) == 2
+    assert store.addresses() == ['A', 'B']
+    assert store.last_recorded_at() == 5.0
+
+
+def test_empty_store(store):
+    assert store.count() == 0
+    assert store.last_recorded_at() is None
+    assert store.window() == []
@@ -0,0 +1,120 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class TokenStore:
+    """Append-only SQLite history of filtered tokens.
+
+    Every ``append`` adds one row per token (address, time, compact JSON)
+    in a single transaction, so writes cost the size of the batch rather
+    than the size of the history. Address and time are indexed, and
+    exporting contract addresses never touches the token JSON.
+    """
+
+    def __init__(self, path='tokens.db'):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tokens ("
+                "id INTEGER PRIMARY KEY, address TEXT NOT NULL, recorded_at REAL NOT NULL, data TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS tokens_address ON tokens (address, recorded_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS tokens_recorded_at ON tokens (recorded_at)")
+            self._db.commit()
+
+    def append(self, tokens, recorded_at=None):
+        """Record ``tokens`` as seen at ``recorded_at`` (default now); returns the count.
+
+        Tokens without an address are skipped.
+        """
+        recorded_at = time.time() if recorded_at is None else recorded_at
+        rows = []
+        for token in tokens:
+            address = token.get('tokenAddress') or token.get('contract_address')
+            if address:
+                rows.append((address, recorded_at, json.dumps(token, separators=(',', ':'))))
+        with self._lock:
+            self._db.executemany("INSERT INTO tokens (address, recorded_at, data) VALUES (?, ?, ?)", rows)
+            self._db.commit()
+        return len(rows)
+
+    def latest(self, address):
+        """Most recent record of ``address``, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM tokens WHERE address = ? ORDER BY recorded_at DESC, id DESC LIMIT 1", (address,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def history(self, address):
+        """Every record of ``address`` as ``(recorded_at, token)``, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT recorded_at, data FROM tokens WHERE address = ? ORDER BY recorded_at, id", (address,)
+            ).fetchall()
+        return [(recorded_at, json.loads(data)) for recorded_at, data in rows]
+
+    def window(self, start=None, end=None, limit=None):
+        """Tokens recorded in ``[start, end)`` as ``(recorded_at, token)``, oldest first."""
+        query, params = "SELECT recorded_at, data FROM tokens", []
+        query, params = self._where(query, params, start, end)
+        query += " ORDER BY recorded_at, id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [(recorded_at, json.loads(data)) for recorded_at, data in rows]
+
+    def addresses(self, start=None, end=None):
+        """Distinct addresses recorded in ``[start, end)``, in first-seen order."""
+        query, params = self._where("SELECT address, MIN(id) AS first FROM tokens", [], start, end)
+        query += " GROUP BY address ORDER BY first"
+        with self._lock:
+            return [address for address, _ in self._db.execute(query, params)]
+
+    @staticmethod
+    def _where(query, params, start, end):
+        conditions = []
+        if start is not None:
+            conditions.append("recorded_at >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("recorded_at < ?")
+            params.append(end)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return query, params
+
+    def export_addresses(self, path, start=None, end=None):
+        """Write the distinct addresses, one per line, to ``path``; returns the count."""
+        addresses = self.addresses(start, end)
+        with open(path, 'w') as f:
+            for address in addresses:
+                f.write(address + '\n')
+        return len(addresses)
+
+    def import_json_dump(self, path, recorded_at=None):
+        """Append the tokens of an old ``save_to_file`` JSON dump."""
+        with open(path, 'r') as f:
+            tokens = json.load(f)
+        return self.append([token for token in tokens if isinstance(token, dict)], recorded_at)
+
+    def last_recorded_at(self):
+        """Time of the most recent append, or None when empty."""
+        with self._lock:
+            return self._db.execute("SELECT MAX(recorded_at) FROM tokens").fetchone()[0]
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()